@@ -1,12 +1,24 @@
 import os
-import json
+import asyncio
+import argparse
+import logging
 from dotenv import load_dotenv
 from supabase import create_client
-from zep_cloud.client import Zep
+from config import UPLOAD_MAX_DOCUMENTS, UPLOAD_MAX_REQUESTS
+from rate_limiter import RateLimiter
+from supabase_reader import iter_rows
+from ingest_journal import IngestJournal
+from envelope import encode_envelope
+from ordered_upload import upload_ordered
+from search_cache import note_group_write
+from metrics import METRICS, metrics_run, add_metrics_argument
+from logging_setup import add_logging_arguments, setup_logging
 
 # Load environment variables from .env file
 load_dotenv()
 
+log = logging.getLogger("add_from_supabase")
+
 def get_supabase_client():
     supabase_url = os.getenv('SUPABASE_URL')
     supabase_key = os.getenv('SUPABASE_KEY')
@@ -16,16 +28,8 @@ def get_supabase_client():
     
     return create_client(supabase_url, supabase_key)
 
-def get_zep_client():
-    api_key = os.getenv('ZEP_API_KEY')
-    
-    if not api_key:
-        raise ValueError("Missing ZEP_API_KEY in environment variables")
-    
-    return Zep(api_key=api_key)
-
 def format_content_with_metadata(chunk):
-    """Format content with metadata as a header"""
+    """Format content with its metadata as a compact envelope"""
     metadata = {
         "batch_name": chunk.get("batch_name"),
         "chunk_number": chunk.get("chunk_number"),
@@ -34,73 +38,45 @@ def format_content_with_metadata(chunk):
         "document_id": chunk.get("id")
     }
     
-    # Create a header with metadata
-    header = f"[METADATA]\n{json.dumps(metadata, indent=2)}\n[CONTENT]\n"
-    
-    # Get the content
-    content = chunk.get("content", "").strip()
-    
-    # Combine header and content
-    return f"{header}{content}"
+    return encode_envelope("document", metadata, chunk.get("content", "").strip())
 
-def process_chunks(table_name="mip_training_data", group_id="some-group-id"):
+def process_chunks(table_name="mip_training_data", group_id="some-group-id", force=False,
+                   max_documents=UPLOAD_MAX_DOCUMENTS, max_requests=UPLOAD_MAX_REQUESTS):
     try:
         # Initialize clients
         supabase = get_supabase_client()
-        zep_client = get_zep_client()
-        
-        # Fetch all records from the specified table
-        response = supabase.table(table_name).select("*").order('chunk_number').execute()
-        chunks = response.data
+        if not os.getenv('ZEP_API_KEY'):
+            raise ValueError("Missing ZEP_API_KEY in environment variables")
         
-        if not chunks:
-            print(f"No records found in table '{table_name}'")
-            return
+        # Every uploaded chunk is journaled; unchanged chunks are skipped unless forced
+        journal = IngestJournal()
+        completed = set() if force else journal.completed_hashes(group_id)
         
-        print(f"Found {len(chunks)} chunks to process...")
+        # Stream records ordered by batch_name, then chunk_number, so each
+        # batch arrives contiguously and already in order
+        chunks = METRICS.timed_iter("supabase_fetch", iter_rows(
+            supabase, table_name, "id, batch_name, chunk_number, title, summary, content",
+            order_by=("batch_name", "chunk_number", "id")
+        ))
         
-        # Group chunks by batch_name to maintain document context
-        chunks_by_batch = {}
-        for chunk in chunks:
-            batch_name = chunk.get('batch_name', 'unknown')
-            if batch_name not in chunks_by_batch:
-                chunks_by_batch[batch_name] = []
-            chunks_by_batch[batch_name].append(chunk)
+        # Batches upload concurrently; each batch's chunks are sent in chunk_number order
+        stats = asyncio.run(upload_ordered(
+            chunks, key=lambda x: x.get('batch_name', 'unknown'), format_chunk=format_content_with_metadata,
+            source=lambda x: f"{table_name}:{x.get('id')}", group_id=group_id,
+            completed=completed, journal=journal, max_documents=max_documents, max_requests=max_requests,
+            limiter=RateLimiter(), label="batch"
+        ))
         
-        # Process each batch's chunks in order
-        for batch_name, batch_chunks in chunks_by_batch.items():
-            print(f"\nProcessing batch: {batch_name}")
-            
-            # Sort chunks by chunk_number
-            batch_chunks.sort(key=lambda x: x.get('chunk_number', 0))
-            
-            for i, chunk in enumerate(batch_chunks, 1):
-                try:
-                    if not chunk.get('content'):
-                        print(f"Warning: Empty content in chunk {chunk.get('chunk_number')} of {batch_name}")
-                        continue
-                    
-                    # Format content with metadata
-                    formatted_content = format_content_with_metadata(chunk)
-                    
-                    # Add to Zep
-                    response = zep_client.graph.add(
-                        group_id=group_id,
-                        data=formatted_content,
-                        type="text"
-                    )
-                    print(f"Chunk {i}/{len(batch_chunks)} from {batch_name} added to group '{group_id}'")
-                    print(f"Chunk size: {len(formatted_content)} characters")
-                    
-                except Exception as e:
-                    print(f"Error processing chunk {i}/{len(batch_chunks)} from {batch_name}: {str(e)}")
-                    print(f"Failed chunk details: ID={chunk.get('id')}, chunk_number={chunk.get('chunk_number')}")
-                    raise
+        if not stats["chunks"]:
+            log.info("No records found in table '%s'", table_name)
+            return
         
-        print(f"\nCompleted! All chunks from {len(chunks_by_batch)} batches have been processed.")
+        note_group_write(group_id, force=True)
+        log.info("Completed! All %d chunks from %d batches have been processed.", stats["chunks"], stats["documents"])
+        log.info("Skipped %d unchanged chunks (%d bytes not re-uploaded).", stats["skipped"], stats["skipped_bytes"])
         
     except Exception as e:
-        print(f"Error: {str(e)}")
+        log.error("Error: %s", e)
         raise
 
 if __name__ == "__main__":
@@ -108,4 +84,15 @@ if __name__ == "__main__":
     TABLE_NAME = "mip_training_data"  # Using the correct table name from the schema
     GROUP_ID = "mip_group"  # The group ID we want to use
     
-    process_chunks(TABLE_NAME, GROUP_ID)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Upload mip_training_data chunks to Zep.")
+    parser.add_argument("--force", action="store_true", help="Re-upload chunks that are already in the dedup index")
+    parser.add_argument("--max-documents", "--concurrency", dest="max_documents", type=int, default=UPLOAD_MAX_DOCUMENTS, help=f"Batches to upload at once (default: {UPLOAD_MAX_DOCUMENTS})")
+    parser.add_argument("--max-requests", type=int, default=UPLOAD_MAX_REQUESTS, help=f"Add requests in flight at once (default: {UPLOAD_MAX_REQUESTS})")
+    add_metrics_argument(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(args.log_format, args.log_level)
+    
+    with metrics_run(args.metrics, "add_from_supabase"):
+        process_chunks(TABLE_NAME, GROUP_ID, force=args.force,
+                       max_documents=args.max_documents, max_requests=args.max_requests)
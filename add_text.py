@@ -1,61 +1,92 @@
 import os
 import sys
-import json
+import time
+import logging
+import queue
+import asyncio
+import argparse
+import threading
+import httpx
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
-from zep_cloud.client import Zep
-from datetime import datetime
-from config import ZEP_BASE_URL, DEFAULT_GROUP_ID, MAX_CHUNK_SIZE
+from zep_cloud.client import AsyncZep
+from config import DEFAULT_GROUP_ID, FILE_BLOCK_SIZE, FILE_PREFETCH_BLOCKS, FILE_POOL_MAX_BYTES, ZEP_TIMEOUT_SECONDS
+from chunker import chunk_text, iter_chunks
+from rate_limiter import RateLimiter, create_zep_client
+from ingest_journal import IngestJournal, content_hash
+from search_cache import note_group_write
+from metrics import METRICS, metrics_run, add_metrics_argument
+from logging_setup import Progress, add_logging_arguments, setup_logging
 
 # Load environment variables from .env file
 load_dotenv()
 
-def chunk_text(text, chunk_size=MAX_CHUNK_SIZE):
-    """Split text into chunks of specified size, trying to break at sentence boundaries."""
-    chunks = []
-    current_chunk = ""
-    
-    # Split text into sentences (roughly)
-    sentences = text.replace('\n', ' ').split('.')
-    
-    for sentence in sentences:
-        sentence = sentence.strip() + '.'  # Add back the period
-        if len(current_chunk) + len(sentence) <= chunk_size:
-            current_chunk += ' ' + sentence if current_chunk else sentence
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    return chunks
+log = logging.getLogger("add_text")
+
+def iter_file_blocks(file, block_size=FILE_BLOCK_SIZE):
+    """Yield an open file's text in blocks of block_size characters"""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            return
+        yield block
 
-def read_file_content(file_path):
+def read_file_blocks(file_path, block_size=FILE_BLOCK_SIZE, prefetch=FILE_PREFETCH_BLOCKS):
+    """
+    Yield a file's text in blocks of block_size characters.
+
+    A background thread reads up to `prefetch` blocks ahead, so the file is read
+    while earlier chunks are uploading and memory stays bounded by a few blocks.
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            return file.read()
+        file = open(file_path, 'r', encoding='utf-8')
     except FileNotFoundError:
-        print(f"Error: File '{file_path}' not found.")
+        log.error("Error: File '%s' not found.", file_path)
         sys.exit(1)
     except Exception as e:
-        print(f"Error reading file: {str(e)}")
+        log.error("Error reading file: %s", e)
         sys.exit(1)
 
-def format_content_with_metadata(chunk, chunk_number, file_path=None):
-    """Format content with metadata as a header"""
-    metadata = {
-        "file_path": file_path if file_path else "direct_input",
-        "chunk_number": chunk_number,
-        "title": os.path.basename(file_path) if file_path else "Direct Input",
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
-    
-    # Create a header with metadata
-    header = f"[METADATA]\n{json.dumps(metadata, indent=2)}\n[CONTENT]\n"
-    
-    # Combine header and content
-    return f"{header}{chunk}"
+    blocks = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def reader():
+        try:
+            with file:
+                for block in iter_file_blocks(file, block_size):
+                    if stop.is_set():
+                        return
+                    blocks.put(block)
+            blocks.put("")
+        except Exception as e:
+            blocks.put(e)
+
+    threading.Thread(target=reader, daemon=True).start()
+    try:
+        while True:
+            block = blocks.get()
+            if isinstance(block, Exception):
+                log.error("Error reading file: %s", block)
+                raise block
+            if not block:
+                return
+            yield block
+    finally:
+        # Let the reader exit if the caller stops early
+        stop.set()
+        while not blocks.empty():
+            blocks.get_nowait()
+
+def chunk_file(file_path):
+    """
+    Read and chunk one file; runs in a worker process during directory ingest.
+
+    The chunks are pickled back whole, so this is only used for files up to
+    FILE_POOL_MAX_BYTES; larger ones are streamed by iter_file_chunks_async.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return list(iter_chunks(iter_file_blocks(file)))
 
 def format_youtube_content(chunk, source_url, timestamp=None):
     """Format content from YouTube with source information."""
@@ -67,30 +98,68 @@ def format_youtube_content(chunk, source_url, timestamp=None):
         f"SOURCE: {source_url}"
     )
 
-def add_text_to_graph(text_content, group_id=DEFAULT_GROUP_ID, file_path=None, source_url=None, timestamp=None):
+def add_text_to_graph(text_content, group_id=DEFAULT_GROUP_ID, file_path=None, source_url=None, timestamp=None, resume=False):
+    """
+    Upload text to a Zep group in chunks.
+
+    text_content is either a string or an iterable of text blocks (see
+    read_file_blocks); blocks are chunked and uploaded as they arrive.
+    """
     # Get API key from environment variables
     api_key = os.getenv('ZEP_API_KEY')
     
     if not api_key:
-        print("Error: ZEP_API_KEY not found in environment variables")
+        log.error("Error: ZEP_API_KEY not found in environment variables")
         sys.exit(1)
 
-    print(f"\n=== ZEP UPLOAD DETAILS ===")
-    print(f"Group ID: {group_id}")
-    print(f"API Key: {api_key[:5]}...{api_key[-5:] if len(api_key) > 10 else ''}")
-    print(f"File: {file_path}")
-    print(f"Source URL: {source_url}")
-    print(f"==========================\n")
+    log.info("=== ZEP UPLOAD DETAILS ===")
+    log.info("Group ID: %s", group_id)
+    log.info("API Key: %s...%s", api_key[:5], api_key[-5:] if len(api_key) > 10 else '')
+    log.info("File: %s", file_path)
+    log.info("Source URL: %s", source_url)
+    log.info("==========================")
 
-    client = Zep(
-        api_key=api_key
-    )
+    limiter = RateLimiter()
+    client = create_zep_client(api_key, limiter)
     
-    # Split content into chunks
-    chunks = chunk_text(text_content)
-    total_chunks = len(chunks)
+    # Every uploaded chunk is journaled so a --resume run can skip it
+    journal = IngestJournal()
+    completed = journal.completed_hashes(group_id) if resume else set()
+    source = source_url or file_path or "direct_input"
     
-    print(f"Processing {total_chunks} chunks...")
+    def upload_chunk(data):
+        """Add data to the graph unless a previous run already did; returns None if skipped"""
+        chunk_hash = content_hash(data)
+        if chunk_hash in completed:
+            METRICS.count("chunks_skipped")
+            return None
+        with METRICS.stage("zep_add"):
+            response = limiter.call(
+                client.graph.add,
+                group_id=group_id,
+                data=data,
+                type="text"
+            )
+        if METRICS.enabled:
+            METRICS.count("episodes")
+            METRICS.count("bytes", len(data.encode("utf-8")))
+        journal.record(group_id, chunk_hash, source, response.uuid_)
+        note_group_write(group_id)
+        return response
+    
+    # Split content into chunks; streamed input is chunked while it is read
+    if isinstance(text_content, str):
+        with METRICS.stage("chunk"):
+            chunks = chunk_text(text_content)
+        total_chunks = len(chunks)
+        log.info("Processing %d chunks...", total_chunks)
+    else:
+        # Each chunk's time includes waiting for the file blocks it needs
+        chunks = METRICS.timed_iter("chunk", iter_chunks(text_content))
+        total_chunks = "?"
+        log.info("Processing chunks as the file is read...")
+    processed = 0
+    progress = Progress(log, "Chunks processed", total=None if total_chunks == "?" else total_chunks)
 
     # If this is YouTube content, first add the source as a searchable node
     if source_url and "youtube.com" in source_url:
@@ -103,75 +172,203 @@ def add_text_to_graph(text_content, group_id=DEFAULT_GROUP_ID, file_path=None, s
                 f"To watch this video, visit: {source_url}"
             )
             
-            response = client.graph.add(
-                group_id=group_id,
-                data=url_node,
-                type="text"
-            )
-            print(f"Added URL reference node. Response: {response}")
+            response = upload_chunk(url_node)
+            if response is None:
+                log.info("URL reference node already uploaded, skipping")
+            else:
+                log.info("Added URL reference node %s", response.uuid_)
+                log.debug("Response data: %r", response)
             
             # Add chunks with embedded source information
             for i, chunk in enumerate(chunks, 1):
+                processed = i
                 try:
-                    formatted_chunk = format_youtube_content(chunk, source_url, timestamp)
-                    response = client.graph.add(
-                        group_id=group_id,
-                        data=formatted_chunk,
-                        type="text"
-                    )
-                    print(f"Chunk {i}/{total_chunks} added successfully with source reference")
-                    print(f"Response data: {response}")
+                    with METRICS.stage("format"):
+                        formatted_chunk = format_youtube_content(chunk, source_url, timestamp)
+                    response = upload_chunk(formatted_chunk)
+                    if response is None:
+                        log.debug("Chunk %d/%s already uploaded, skipping", i, total_chunks)
+                        progress.update()
+                        continue
+                    log.debug("Chunk %d/%s added successfully with source reference", i, total_chunks)
+                    log.debug("Response data: %r", response)
+                    progress.update()
                     
                 except Exception as e:
-                    print(f"Error processing chunk {i}/{total_chunks}: {str(e)}")
+                    log.error("Error processing chunk %d/%s: %s", i, total_chunks, e)
                     raise
                     
         except Exception as e:
-            print(f"Error adding source information: {str(e)}")
-            print(f"Group ID used: {group_id}")
+            log.error("Error adding source information: %s", e)
+            log.error("Group ID used: %s", group_id)
             raise
             
     else:
         # For non-YouTube content, just add the chunks normally
         for i, chunk in enumerate(chunks, 1):
+            processed = i
             try:
-                response = client.graph.add(
-                    group_id=group_id,
-                    data=chunk,
-                    type="text"
-                )
-                print(f"Chunk {i}/{total_chunks} added successfully")
-                print(f"Response data: {response}")
+                response = upload_chunk(chunk)
+                if response is None:
+                    log.debug("Chunk %d/%s already uploaded, skipping", i, total_chunks)
+                    progress.update()
+                    continue
+                log.debug("Chunk %d/%s added successfully", i, total_chunks)
+                log.debug("Response data: %r", response)
+                progress.update()
                 
             except Exception as e:
-                print(f"Error processing chunk {i}/{total_chunks}: {str(e)}")
-                print(f"Group ID used: {group_id}")
-                print(f"Chunk size: {len(chunk)} characters")
+                log.error("Error processing chunk %d/%s: %s", i, total_chunks, e)
+                log.error("Group ID used: %s", group_id)
+                log.error("Chunk size: %d characters", len(chunk))
                 raise
 
-    print(f"\nCompleted! All {total_chunks} chunks have been processed.")
-    print(f"Content uploaded to group: {group_id}")
-    print(f"You can check your content at Zep dashboard using this group ID")
+    progress.done()
+    note_group_write(group_id, force=True)
+    log.info("Completed! All %d chunks have been processed.", processed)
+    log.info("Content uploaded to group: %s", group_id)
+    log.info("You can check your content at Zep dashboard using this group ID")
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python3 add_text.py <path_to_text_file> [source_url] [timestamp] [group_id]")
+async def iter_file_chunks_async(file_path):
+    """
+    Yield a file's chunks as they are read, chunking one at a time in a thread
+    so memory stays bounded by a few blocks and the event loop is never blocked.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        chunks = iter_chunks(iter_file_blocks(file))
+        while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield chunk
+
+async def upload_files_async(api_key, file_paths, group_id, workers, resume):
+    """
+    Chunk files in a process pool and upload them over one pooled AsyncZep client.
+
+    Up to `workers` files are in progress at once; chunks within a file are sent
+    in order so Zep sees each document sequentially. Files larger than
+    FILE_POOL_MAX_BYTES are streamed instead of chunked in the pool.
+    """
+    limiter = RateLimiter()
+    journal = IngestJournal()
+    completed = journal.completed_hashes(group_id) if resume else set()
+    file_slots = asyncio.Semaphore(workers)
+    loop = asyncio.get_running_loop()
+    stats = {"files": 0, "chunks": 0, "skipped": 0, "failed": 0}
+    progress = Progress(log, "Files uploaded", total=len(file_paths), every=10)
+    limits = httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+
+    async with httpx.AsyncClient(
+        timeout=ZEP_TIMEOUT_SECONDS, limits=limits, event_hooks=limiter.async_event_hooks()
+    ) as httpx_client:
+        client = AsyncZep(api_key=api_key, timeout=ZEP_TIMEOUT_SECONDS, httpx_client=httpx_client)
+
+        async def pooled_chunks(pool, file_path):
+            with METRICS.stage("chunk"):
+                chunks = await loop.run_in_executor(pool, chunk_file, file_path)
+            for chunk in chunks:
+                yield chunk
+
+        async def upload_file(pool, file_path):
+            async with file_slots:
+                try:
+                    if os.path.getsize(file_path) > FILE_POOL_MAX_BYTES:
+                        chunks = iter_file_chunks_async(file_path)
+                    else:
+                        chunks = pooled_chunks(pool, file_path)
+                    chunk_count = 0
+                    async for chunk in chunks:
+                        chunk_count += 1
+                        chunk_hash = content_hash(chunk)
+                        if chunk_hash in completed:
+                            stats["skipped"] += 1
+                            METRICS.count("chunks_skipped")
+                            continue
+                        with METRICS.stage("zep_add"):
+                            response = await limiter.call_async(
+                                client.graph.add,
+                                group_id=group_id,
+                                data=chunk,
+                                type="text"
+                            )
+                        if METRICS.enabled:
+                            METRICS.count("episodes")
+                            METRICS.count("bytes", len(chunk.encode("utf-8")))
+                        journal.record(group_id, chunk_hash, str(file_path), response.uuid_)
+                        note_group_write(group_id)
+                        stats["chunks"] += 1
+                    stats["files"] += 1
+                    log.debug("File %s added (%d chunks)", file_path, chunk_count)
+                    progress.update()
+                except Exception as e:
+                    stats["failed"] += 1
+                    log.error("Error processing file %s: %s", file_path, e)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            await asyncio.gather(*(upload_file(pool, path) for path in file_paths))
+        progress.done()
+    note_group_write(group_id, force=True)
+
+    return stats
+
+def add_directory_to_graph(directory, pattern="*.txt", group_id=DEFAULT_GROUP_ID, workers=4, resume=False):
+    """Upload every file in a directory matching a glob pattern, reusing one client"""
+    api_key = os.getenv('ZEP_API_KEY')
+    
+    if not api_key:
+        log.error("Error: ZEP_API_KEY not found in environment variables")
+        sys.exit(1)
+
+    file_paths = sorted(path for path in Path(directory).glob(pattern) if path.is_file())
+    if not file_paths:
+        log.info("No files matching '%s' found in %s", pattern, directory)
+        return
+
+    log.info("Uploading %d files from %s to group %s with %d workers...", len(file_paths), directory, group_id, workers)
+    started = time.perf_counter()
+    stats = asyncio.run(upload_files_async(api_key, file_paths, group_id, workers, resume))
+    elapsed = time.perf_counter() - started
+
+    log.info("Completed! %d files and %d chunks uploaded in %.1fs", stats['files'], stats['chunks'], elapsed)
+    log.info("Throughput: %.2f files/sec, %.2f chunks/sec", stats['files'] / elapsed, stats['chunks'] / elapsed)
+    if stats["skipped"]:
+        log.info("Skipped %d chunks already uploaded by a previous run", stats['skipped'])
+    if stats["failed"]:
+        log.error("%d files failed", stats['failed'])
         sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload text files to a Zep group.")
+    parser.add_argument("file_path", nargs="?", help="Path to the text file to upload")
+    parser.add_argument("source_url", nargs="?", help="Source URL of the text (YouTube URLs get a link node)")
+    parser.add_argument("timestamp", nargs="?", help="Timestamp within the source")
+    parser.add_argument("group_id", nargs="?", help=f"The Zep group ID to use (default: {DEFAULT_GROUP_ID})")
+    parser.add_argument("--resume", action="store_true", help="Skip chunks a previous run already uploaded")
+    parser.add_argument("--dir", help="Upload every matching file in this directory instead of one file")
+    parser.add_argument("--glob", default="*.txt", help="File pattern to match with --dir (default: *.txt)")
+    parser.add_argument("--workers", type=int, default=4, help="Files chunked and uploaded in parallel with --dir (default: 4)")
+    add_metrics_argument(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(args.log_format, args.log_level)
     
-    file_path = sys.argv[1]
-    source_url = sys.argv[2] if len(sys.argv) > 2 else None
-    timestamp = sys.argv[3] if len(sys.argv) > 3 else None
+    if not args.file_path and not args.dir:
+        parser.print_usage()
+        sys.exit(1)
     
     # Get group_id from command line arg or use default, ensuring it's not empty
-    input_group_id = sys.argv[4] if len(sys.argv) > 4 else None
+    input_group_id = args.group_id
     group_id = input_group_id if input_group_id and input_group_id.strip() else DEFAULT_GROUP_ID
     
     # Validate group_id
     if not group_id or group_id.strip() == "":
-        print(f"Warning: Empty group ID provided. Using default group ID: {DEFAULT_GROUP_ID}")
+        log.warning("Empty group ID provided. Using default group ID: %s", DEFAULT_GROUP_ID)
         group_id = DEFAULT_GROUP_ID
     
-    print(f"Using group ID: {group_id}")
+    log.info("Using group ID: %s", group_id)
     
-    content = read_file_content(file_path)
-    add_text_to_graph(content, group_id=group_id, file_path=file_path, source_url=source_url, timestamp=timestamp)
+    with metrics_run(args.metrics, "add_text"):
+        if args.dir:
+            add_directory_to_graph(args.dir, args.glob, group_id=group_id, workers=args.workers, resume=args.resume)
+        else:
+            # Stream the file so uploads start before it has been read completely
+            content = read_file_blocks(args.file_path)
+            add_text_to_graph(content, group_id=group_id, file_path=args.file_path, source_url=args.source_url, timestamp=args.timestamp, resume=args.resume)
@@ -0,0 +1,219 @@
+"""
+Run many graph searches from one process.
+
+Queries are read from a file or stdin, one per line. A line is either the
+query text or a JSON object with a "query" key and optional "id", "group_id",
+"limit" and "scope" overrides. Each query is searched in every --group_id, with
+up to --concurrency searches in flight over one pooled AsyncZep client under
+the shared rate limiter.
+
+Results are streamed out as JSON lines in input order (a query's groups in
+the order given), each with the query, group, latency and flattened results,
+or an error. A malformed input line becomes an error record; the rest of the
+batch still runs. Completed searches wait in a bounded reorder window, so a slow
+search never lets the buffer grow past a few times --concurrency. QPS and
+latency percentiles are logged at the end.
+
+Usage:
+    python3 batch_search.py queries.txt --group_id demo_group --output results.jsonl
+    cat queries.txt | python3 batch_search.py - --group_id g1 --group_id g2 --concurrency 32
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import httpx
+from itertools import count
+from dotenv import load_dotenv
+from zep_cloud.client import AsyncZep
+from config import DEFAULT_GROUP_ID, ZEP_TIMEOUT_SECONDS, SEARCH_CONCURRENCY, SEARCH_MAX_REQUESTS_PER_SECOND
+from rate_limiter import RateLimiter
+from search_cache import SearchCache, cached_search_async
+from search_graph import result_records
+from metrics import METRICS, metrics_run, add_metrics_argument, percentile
+from logging_setup import Progress, add_logging_arguments, setup_logging
+
+# Load environment variables from .env file
+load_dotenv()
+
+log = logging.getLogger("batch_search")
+
+REORDER_WINDOW = 4  # Searches allowed in flight or waiting to be written, per unit of concurrency
+
+def parse_query_line(line):
+    """Query dict for one input line; raises ValueError if the line is malformed"""
+    if not line.startswith("{"):
+        return {"query": line}
+    query = json.loads(line)
+    if not isinstance(query, dict) or not isinstance(query.get("query"), str) or not query["query"].strip():
+        raise ValueError('expected a JSON object with a non-empty "query" string')
+    return query
+
+def iter_queries(path):
+    """
+    Query dicts from a file or stdin ('-'); blank lines and # comments are skipped.
+
+    A malformed line is yielded as {"invalid": reason} so it can be reported
+    in its place in the output.
+    """
+    file = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                yield parse_query_line(line)
+            except ValueError as e:
+                yield {"invalid": f"line {line_number}: {e}"}
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+def iter_searches(queries, group_ids, limit=10, scope=None):
+    """Yield (index, query dict, group_id, limit, scope) for every query in every group"""
+    index = count()
+    for query in queries:
+        if "invalid" in query:
+            yield next(index), query, None, None, None
+            continue
+        for group_id in ([query["group_id"]] if query.get("group_id") else group_ids):
+            yield next(index), query, group_id, query.get("limit", limit), query.get("scope", scope)
+
+async def run_searches(api_key, searches, write, concurrency=SEARCH_CONCURRENCY, limiter=None, cache=None):
+    """
+    Run searches concurrently and pass each result record to write() in input order.
+
+    Returns (latencies in seconds, number of failed searches).
+    """
+    limiter = limiter or RateLimiter(max_rate=SEARCH_MAX_REQUESTS_PER_SECOND)
+    window = asyncio.Semaphore(concurrency * REORDER_WINDOW)
+    read_lock = asyncio.Lock()
+    finished = {}  # index -> record, until every earlier record is written
+    next_index = 0
+    latencies = []
+    failed = 0
+    progress = Progress(log, "Searches completed", every=1000)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        timeout=ZEP_TIMEOUT_SECONDS, limits=limits, event_hooks=limiter.async_event_hooks()
+    ) as httpx_client:
+        client = AsyncZep(api_key=api_key, timeout=ZEP_TIMEOUT_SECONDS, httpx_client=httpx_client)
+
+        def finish(index, record):
+            """Write this record and any later ones it was holding back, in input order"""
+            nonlocal next_index
+            finished[index] = record
+            while next_index in finished:
+                write(finished.pop(next_index))
+                next_index += 1
+                window.release()
+
+        async def worker():
+            nonlocal failed
+            while True:
+                # Take a slot before the next search, so finished records can't pile up
+                await window.acquire()
+                # Workers share one iterator, so each search runs once. Reading
+                # it can block (e.g. on stdin), so it runs off the event loop
+                async with read_lock:
+                    search = await asyncio.to_thread(next, searches, None)
+                if search is None:
+                    window.release()
+                    return
+                index, query, group_id, limit, scope = search
+
+                record = {"index": index, "query": query.get("query"), "group_id": group_id}
+                if "id" in query:
+                    record["id"] = query["id"]
+                if "invalid" in query:
+                    failed += 1
+                    record["error"] = query["invalid"]
+                    finish(index, record)
+                    continue
+                started = time.perf_counter()
+                try:
+                    with METRICS.stage("zep_search"):
+                        results = await cached_search_async(
+                            client, cache, group_id, query["query"], limit, scope, limiter
+                        )
+                    record["results"] = result_records(results)
+                except Exception as e:
+                    failed += 1
+                    record["error"] = str(e)
+                elapsed = time.perf_counter() - started
+                latencies.append(elapsed)
+                record["latency_ms"] = round(elapsed * 1000, 3)
+                progress.update()
+
+                finish(index, record)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    if latencies:
+        progress.done()
+    return latencies, failed
+
+def main(input_path, group_ids, output="-", limit=10, scope=None, concurrency=SEARCH_CONCURRENCY,
+         max_rate=SEARCH_MAX_REQUESTS_PER_SECOND, use_cache=False):
+    api_key = os.getenv("ZEP_API_KEY")
+    if not api_key:
+        raise ValueError("ZEP_API_KEY not found in environment variables.")
+
+    searches = iter_searches(iter_queries(input_path), group_ids, limit, scope)
+    cache = SearchCache() if use_cache else None
+    out = sys.stdout if output == "-" else open(output, "w", encoding="utf-8")
+
+    def write(record):
+        out.write(json.dumps(record, default=str) + "\n")
+
+    started = time.perf_counter()
+    try:
+        latencies, failed = asyncio.run(
+            run_searches(api_key, searches, write, concurrency, RateLimiter(max_rate=max_rate), cache)
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    elapsed = time.perf_counter() - started
+
+    total = len(latencies)
+    log.info("=== BATCH SEARCH SUMMARY ===")
+    log.info("Searches: %d (%d failed) across %d group(s)", total, failed, len(group_ids))
+    log.info("Elapsed: %.2fs, %.1f QPS", elapsed, total / elapsed if elapsed else 0.0)
+    log.info("Latency ms: p50=%.1f p90=%.1f p99=%.1f max=%.1f",
+             percentile(latencies, 0.50) * 1000, percentile(latencies, 0.90) * 1000,
+             percentile(latencies, 0.99) * 1000, max(latencies, default=0.0) * 1000)
+    if cache:
+        log.info("Cache: %s", cache.stats())
+        cache.close()
+    return not failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many graph searches concurrently and write the results as JSON lines.")
+    parser.add_argument("input", help="File of queries, one per line ('-' for stdin)")
+    parser.add_argument("--group_id", action="append", help=f"Group to search; repeat to search several (default: {DEFAULT_GROUP_ID})")
+    parser.add_argument("--output", default="-", help="Write results to this file (default: stdout)")
+    parser.add_argument("--limit", type=int, default=10, help="Results per search (default: 10)")
+    parser.add_argument("--scope", choices=("edges", "nodes", "episodes"), help="Search scope (default: the API's)")
+    parser.add_argument("--concurrency", type=int, default=SEARCH_CONCURRENCY, help=f"Searches to keep in flight (default: {SEARCH_CONCURRENCY})")
+    parser.add_argument("--max-rate", type=float, default=SEARCH_MAX_REQUESTS_PER_SECOND, help=f"Highest searches per second (default: {SEARCH_MAX_REQUESTS_PER_SECOND:g})")
+    parser.add_argument("--cache", action="store_true", help="Answer repeated searches from the local search cache")
+    add_metrics_argument(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    # Keep stdout clean for the results when they are written there
+    setup_logging(args.log_format, args.log_level, stream=sys.stderr if args.output == "-" else None)
+
+    with metrics_run(args.metrics, "batch_search"):
+        ok = main(args.input, args.group_id or [DEFAULT_GROUP_ID], args.output, args.limit, args.scope,
+                  args.concurrency, args.max_rate, args.cache)
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,49 @@
+"""
+Benchmark for chunker.iter_chunks on synthetic multi-megabyte transcripts.
+
+Prints throughput per input size; time per MB should stay flat as the input
+grows if chunking is O(n).
+
+Usage: python3 bench_chunker.py [size_mb ...] [--overlap N]
+"""
+
+import sys
+import time
+from chunker import iter_chunks
+from config import MAX_CHUNK_SIZE
+from benchmarks.corpora import make_transcript
+
+def bench(size_mb, overlap=0, repeats=3):
+    text = make_transcript(int(size_mb * 1024 * 1024))
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        count = 0
+        largest = 0
+        for chunk in iter_chunks(text, MAX_CHUNK_SIZE, overlap):
+            count += 1
+            largest = max(largest, len(chunk))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    assert largest <= MAX_CHUNK_SIZE
+    return best, count
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    overlap = 0
+    if "--overlap" in args:
+        index = args.index("--overlap")
+        overlap = int(args[index + 1])
+        del args[index:index + 2]
+    sizes = [float(a) for a in args] or [1, 2, 4, 8, 16]
+
+    print(f"{'Size (MB)':>10} {'Chunks':>8} {'Seconds':>9} {'MB/s':>8} {'ms per MB':>10}")
+    per_mb = []
+    for size in sizes:
+        elapsed, count = bench(size, overlap)
+        per_mb.append(elapsed / size)
+        print(f"{size:>10g} {count:>8} {elapsed:>9.3f} {size / elapsed:>8.1f} {elapsed / size * 1000:>10.1f}")
+
+    growth = per_mb[-1] / per_mb[0]
+    print(f"\nTime per MB grew {growth:.2f}x from {sizes[0]:g} MB to {sizes[-1]:g} MB "
+          f"({'linear' if growth < 1.5 else 'NOT linear'})")
@@ -0,0 +1,14 @@
+"""
+Benchmarks for the ingest and search hot paths.
+
+Each case runs in a fresh process against synthetic corpora (and, for the
+upload path, the local mock_server) and reports throughput, p50/p99 latency
+and peak RSS. Results can be saved as a baseline and later runs fail when
+they regress past it.
+
+Usage:
+    python3 -m benchmarks                     # quick profile, print JSON
+    python3 -m benchmarks --profile full      # 1 KB - 500 MB, up to 10^6 rows
+    python3 -m benchmarks --save-baseline     # store results in benchmarks/baseline.json
+    python3 -m benchmarks --check             # exit 1 if results regress past the baseline
+"""
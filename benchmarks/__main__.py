@@ -0,0 +1,52 @@
+import argparse
+import json
+import os
+import sys
+from benchmarks.cases import PROFILES, case_name
+from benchmarks.harness import run_isolated, compare, load_json, save_json
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingest and search hot paths.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="Corpus sizes to run (default: quick)")
+    parser.add_argument("--only", action="append", default=[], help="Only run cases whose name starts with this (repeatable)")
+    parser.add_argument("--output", help="Also write the results JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if results regress past the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed throughput/latency regression (default: 0.2)")
+    parser.add_argument("--memory-threshold", type=float, default=0.1, help="Allowed peak RSS growth (default: 0.1)")
+    args = parser.parse_args()
+
+    results = {}
+    for case, params in PROFILES[args.profile]:
+        name = case_name(case, params)
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = run_isolated(case, params)
+
+    print(json.dumps(results, indent=2, sort_keys=True))
+    if args.output:
+        save_json(args.output, results)
+
+    if args.save_baseline:
+        baseline = load_json(args.baseline) if os.path.exists(args.baseline) else {}
+        baseline.update(results)
+        save_json(args.baseline, baseline)
+        print(f"Saved {len(results)} results to {args.baseline}", file=sys.stderr)
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            sys.exit(1)
+        regressions = compare(results, load_json(args.baseline), args.threshold, args.memory_threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark cases. Each function builds its own corpus, runs one hot path and
+returns a result record from harness.summarize. They are run by name in a
+fresh process (see harness.run_isolated).
+"""
+
+import contextlib
+import io
+import os
+import time
+from benchmarks.corpora import make_transcript, make_youtube_chunks, make_search_payloads
+from benchmarks.harness import summarize, time_calls
+
+MB = 1024 * 1024
+
+def chunk_text(size_bytes, repeats=3):
+    """chunker.chunk_text over one transcript of size_bytes"""
+    from chunker import chunk_text as chunk
+
+    text = make_transcript(size_bytes)
+    return time_calls(chunk, [text] * repeats, "MB", units_per_input=lambda t: len(t) / MB)
+
+def format_youtube_content(segments):
+    """add_from_youtube.format_youtube_content over a transcript split into segments"""
+    from add_from_youtube import format_youtube_content as format_chunk
+
+    rows = make_youtube_chunks(segments)
+    return time_calls(format_chunk, rows, "segments")
+
+def extract_metadata(payloads):
+    """search_graph.extract_metadata over a mix of search result payloads"""
+    from search_graph import extract_metadata as extract
+
+    contents = make_search_payloads(payloads)
+    return time_calls(extract, contents, "payloads")
+
+def extract_metadata_reference(payloads):
+    """The previous search_graph.extract_metadata, for comparison with extract_metadata"""
+    from benchmarks.reference import extract_metadata as extract
+
+    contents = make_search_payloads(payloads)
+    return time_calls(extract, contents, "payloads")
+
+def parse_metadata_many(payloads, batch=1000, envelope=False):
+    """content_metadata.parse_metadata_many over the same payloads, batch contents per call"""
+    from content_metadata import parse_metadata_many as parse
+
+    contents = make_search_payloads(payloads, envelope=envelope)
+    batches = [contents[i:i + batch] for i in range(0, len(contents), batch)]
+    return time_calls(parse, batches, "payloads", units_per_input=len)
+
+def timed_rate_limiter(max_rate, latencies):
+    """
+    A RateLimiter class capped at max_rate that appends how long each Zep
+    call takes, including throttle waits, to latencies
+    """
+    from rate_limiter import RateLimiter
+
+    class TimedRateLimiter(RateLimiter):
+        def __init__(self):
+            super().__init__(max_rate=max_rate)
+
+        def call(self, func, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().call(func, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+        async def call_async(self, func, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await super().call_async(func, *args, **kwargs)
+            finally:
+                latencies.append(time.perf_counter() - started)
+
+    return TimedRateLimiter
+
+def supa_zep_add(rows, concurrency=1, latency=0.0, content_size=800, max_rate=1000.0):
+    """
+    supa_zep_add.main uploading rows from the mock Supabase to the mock Zep.
+
+    max_rate replaces the client-side Zep rate limit so the run measures the
+    uploader rather than the production request budget.
+    """
+    from mock_server import MockServer
+
+    latencies = []
+    with MockServer(latency=latency) as mock:
+        mock.seed_embeddings(rows, agent_id="bench", content_size=content_size)
+        os.environ.update(mock.environ())
+        import supa_zep_add as uploader
+
+        uploader.RateLimiter = timed_rate_limiter(max_rate, latencies)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            uploader.main("bench", "bench-group", concurrency)
+        elapsed = time.perf_counter() - started
+
+        missing = sum(1 for row in mock.table("embeddings") if row["zep_uuid"] is None)
+        if missing:
+            raise RuntimeError(f"{missing} rows were not written back")
+    return summarize(latencies, rows, elapsed, "rows")
+
+def add_from_youtube(segments, max_documents=1, max_requests=None, latency=0.0, max_rate=1000.0):
+    """
+    add_from_youtube.process_youtube_chunks uploading segments from the mock
+    Supabase to the mock Zep, with max_documents videos in progress at once
+    and max_requests (default: max_documents) adds in flight.
+    """
+    from mock_server import MockServer
+
+    latencies = []
+    with MockServer(latency=latency) as mock:
+        mock.table("youtube_video_chunks").extend(make_youtube_chunks(segments, video_count=20))
+        os.environ.update(mock.environ())
+        import add_from_youtube as uploader
+
+        uploader.RateLimiter = timed_rate_limiter(max_rate, latencies)
+        started = time.perf_counter()
+        uploader.process_youtube_chunks("youtube_video_chunks", "bench-group", force=True,
+                                        max_documents=max_documents, max_requests=max_requests or max_documents)
+        elapsed = time.perf_counter() - started
+
+        uploaded = len(mock.episodes("bench-group"))
+        if uploaded != segments:
+            raise RuntimeError(f"{uploaded} of {segments} segments were uploaded")
+    return summarize(latencies, segments, elapsed, "segments")
+
+# name -> (case function, params) for each profile
+PROFILES = {
+    "quick": [
+        ("chunk_text", {"size_bytes": 1024}),
+        ("chunk_text", {"size_bytes": 1 * MB}),
+        ("chunk_text", {"size_bytes": 8 * MB}),
+        ("format_youtube_content", {"segments": 5000}),
+        ("extract_metadata", {"payloads": 10000}),
+        ("extract_metadata_reference", {"payloads": 10000}),
+        ("parse_metadata_many", {"payloads": 10000}),
+        ("parse_metadata_many", {"payloads": 10000, "envelope": True}),
+        ("supa_zep_add", {"rows": 1000}),
+        ("supa_zep_add", {"rows": 1000, "concurrency": 4, "latency": 0.005}),
+        ("add_from_youtube", {"segments": 400, "latency": 0.02}),
+        ("add_from_youtube", {"segments": 400, "max_documents": 4, "latency": 0.02}),
+    ],
+    "full": [
+        ("chunk_text", {"size_bytes": 1024}),
+        ("chunk_text", {"size_bytes": 1 * MB}),
+        ("chunk_text", {"size_bytes": 32 * MB}),
+        ("chunk_text", {"size_bytes": 500 * MB, "repeats": 1}),
+        ("format_youtube_content", {"segments": 5000}),
+        ("format_youtube_content", {"segments": 100000}),
+        ("extract_metadata", {"payloads": 100000}),
+        ("extract_metadata_reference", {"payloads": 100000}),
+        ("parse_metadata_many", {"payloads": 100000}),
+        ("parse_metadata_many", {"payloads": 100000, "envelope": True}),
+        ("supa_zep_add", {"rows": 1000}),
+        ("supa_zep_add", {"rows": 100000, "concurrency": 8}),
+        ("supa_zep_add", {"rows": 1000000, "concurrency": 8}),
+        ("add_from_youtube", {"segments": 5000, "max_documents": 8, "latency": 0.02}),
+    ],
+}
+
+def case_name(case, params):
+    """Stable result key, e.g. chunk_text[size_bytes=1048576]"""
+    return f"{case}[{','.join(f'{k}={v}' for k, v in sorted(params.items()))}]"
@@ -0,0 +1,69 @@
+"""Synthetic inputs for the benchmarks"""
+
+import json
+import random
+
+WORDS = (
+    "lead nurturing client follow up script call email pipeline offer close "
+    "objection value budget timeline Dr. Mr. e.g. 3.5 percent conversion rate"
+).split()
+
+def make_transcript(size_bytes, seed=42):
+    """Build transcript-like text: sentences, paragraphs and long run-on stretches"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+        end = rng.choice([". ", "? ", "! ", ".\n\n", " "])
+        parts.append(sentence.capitalize() + end)
+        total += len(sentence) + len(end)
+    return "".join(parts)[:size_bytes]
+
+def make_youtube_chunks(count, video_count=10, seed=42):
+    """Rows shaped like youtube_video_chunks, count segments spread over video_count videos"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        video = i % video_count
+        start = (i // video_count) * 30.0
+        rows.append({
+            "id": i + 1,
+            "video_id": f"vid{video:07d}",
+            "chunk_number": i // video_count,
+            "title": f"Training call {video}",
+            "summary": make_transcript(rng.randint(80, 200), seed=seed + i),
+            "start_time": start,
+            "end_time": start + 30.0,
+            "content": make_transcript(rng.randint(300, 1500), seed=seed + i),
+            "metadata": {"channel": "sales", "language": "en"},
+        })
+    return rows
+
+def make_search_payloads(count, seed=42, envelope=False):
+    """
+    Episode contents as returned by search: YouTube, document and bare text
+    payloads, with compact envelopes instead of the old headers if envelope is set
+    """
+    from envelope import encode_envelope
+
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(count):
+        body = make_transcript(rng.randint(200, 2000), seed=seed + i)
+        kind = i % 3
+        if kind == 0:
+            metadata = {"video_id": f"vid{i:07d}", "title": "Training call", "start_time": i * 30}
+            if envelope:
+                payloads.append(encode_envelope("youtube", metadata, body))
+            else:
+                payloads.append(f"[YOUTUBE_METADATA]\n{json.dumps(metadata, indent=2)}\n[CONTENT]\n{body}")
+        elif kind == 1:
+            metadata = {"file_path": f"files/doc{i}.txt", "title": f"doc{i}.txt", "chunk_number": i}
+            if envelope:
+                payloads.append(encode_envelope("document", metadata, body))
+            else:
+                payloads.append(f"[METADATA]\n{json.dumps(metadata, indent=2)}\n[CONTENT]\n{body}")
+        else:
+            payloads.append(body)
+    return payloads
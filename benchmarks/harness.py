@@ -0,0 +1,85 @@
+"""Timing, memory and baseline comparison helpers for the benchmarks"""
+
+import json
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from metrics import percentile
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def summarize(latencies, items, elapsed, unit):
+    """Build the result record for one benchmark run"""
+    return {
+        "items": items,
+        "unit": unit,
+        "seconds": round(elapsed, 6),
+        "throughput": round(items / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+def time_calls(func, inputs, unit, units_per_input=None):
+    """Call func once per input, timing each call"""
+    latencies = []
+    started = time.perf_counter()
+    for value in inputs:
+        call_started = time.perf_counter()
+        func(value)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    items = sum(units_per_input(v) for v in inputs) if units_per_input else len(inputs)
+    return summarize(latencies, items, elapsed, unit)
+
+def _run_case(case, params):
+    from benchmarks import cases
+    return getattr(cases, case)(**params)
+
+def run_isolated(case, params):
+    """Run one case in a fresh process so its peak RSS is its own"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run_case, case, params).result()
+
+# Metrics where a larger value is a regression, and the opposite
+HIGHER_IS_WORSE = ("p50_ms", "p99_ms", "peak_rss_mb")
+LOWER_IS_WORSE = ("throughput",)
+
+def compare(results, baseline, threshold=0.2, memory_threshold=0.1):
+    """
+    Return a list of regressions of results against baseline.
+
+    Throughput may drop and latencies may grow by at most threshold (a fraction);
+    peak RSS may grow by at most memory_threshold. Cases missing from the
+    baseline are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in LOWER_IS_WORSE:
+            if base.get(metric) and result[metric] < base[metric] * (1 - threshold):
+                regressions.append(f"{name}: {metric} {result[metric]} < baseline {base[metric]}")
+        for metric in HIGHER_IS_WORSE:
+            limit = memory_threshold if metric == "peak_rss_mb" else threshold
+            # Sub-millisecond latencies are too noisy to compare
+            floor = 0.05 if metric.endswith("_ms") else 0
+            if base.get(metric) is not None and result[metric] > max(base[metric] * (1 + limit), floor):
+                regressions.append(f"{name}: {metric} {result[metric]} > baseline {base[metric]}")
+    return regressions
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
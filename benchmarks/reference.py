@@ -0,0 +1,82 @@
+"""
+Superseded implementations kept as benchmark references, so cases can report
+the speedup of their replacements on the same corpus.
+"""
+
+import json
+import os
+
+def extract_metadata(content):
+    """search_graph.extract_metadata before content_metadata.parse_metadata replaced it"""
+    try:
+        # Find metadata section
+        if "[YOUTUBE_METADATA]" in content:
+            start = content.find("[YOUTUBE_METADATA]") + len("[YOUTUBE_METADATA]")
+            end = content.find("[CONTENT]", start)
+            if end > start:
+                metadata_str = content[start:end].strip()
+                try:
+                    metadata = json.loads(metadata_str)
+                    return "youtube", metadata
+                except json.JSONDecodeError:
+                    # Try to extract from content if JSON parsing fails
+                    if "youtube.com/watch?v=" in content:
+                        video_id = content.split("youtube.com/watch?v=")[1].split("&")[0]
+                        return "youtube", {
+                            "video_id": video_id,
+                            "title": "YouTube Video",
+                            "start_time": 0
+                        }
+        elif "[METADATA]" in content:
+            start = content.find("[METADATA]") + len("[METADATA]")
+            end = content.find("[CONTENT]", start)
+            if end > start:
+                metadata_str = content[start:end].strip()
+                try:
+                    metadata = json.loads(metadata_str)
+                    return "document", metadata
+                except json.JSONDecodeError:
+                    pass
+        
+        # Try to identify YouTube content without metadata section
+        if "youtube.com/watch?v=" in content:
+            video_id = content.split("youtube.com/watch?v=")[1].split("&")[0]
+            # Try to extract timestamp if available
+            start_time = 0
+            if "&t=" in content:
+                try:
+                    start_time = int(content.split("&t=")[1].split("&")[0])
+                except ValueError:
+                    pass
+            return "youtube", {
+                "video_id": video_id,
+                "title": "YouTube Video",
+                "start_time": start_time
+            }
+        
+        # Extract file path and title from content if available
+        file_path = None
+        for line in content.split('\n'):
+            if line.startswith("files/") or "/files/" in line:
+                file_path = line.strip()
+                break
+        
+        if file_path:
+            return "document", {
+                "file_path": file_path,
+                "title": os.path.basename(file_path),
+                "chunk_number": 0
+            }
+        
+        return "document", {
+            "file_path": "unknown",
+            "title": "",
+            "chunk_number": 0
+        }
+    except Exception as e:
+        print(f"Metadata extraction error: {str(e)}")
+        return "document", {
+            "file_path": "unknown",
+            "title": "",
+            "chunk_number": 0
+        }
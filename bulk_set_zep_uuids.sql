@@ -0,0 +1,15 @@
+-- Bulk zep_uuid write-back used by supabase_writer.ZepUuidWriter.
+-- Run once in the Supabase SQL editor. Takes a JSON array of
+-- {"id": ..., "zep_uuid": ...} objects and updates them in one statement.
+-- It only updates the embeddings table (WRITEBACK_RPC_TABLE in config.py);
+-- ZepUuidWriter refuses to use it for any other table.
+
+create or replace function bulk_set_zep_uuids(updates jsonb)
+returns void
+language sql
+as $$
+  update embeddings as e
+  set zep_uuid = u.zep_uuid
+  from jsonb_to_recordset(updates) as u(id bigint, zep_uuid text)
+  where e.id = u.id;
+$$;
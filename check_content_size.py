@@ -1,11 +1,16 @@
 import os
 import argparse
+import logging
 from dotenv import load_dotenv
 from supabase import create_client
+from supabase_reader import iter_rows
+from logging_setup import add_logging_arguments, setup_logging
 
 # 1. Load environment variables
 load_dotenv()
 
+log = logging.getLogger("check_content_size")
+
 # 2. Connect to Supabase
 def get_supabase_client():
     url = os.getenv("SUPABASE_URL")
@@ -18,37 +23,38 @@ def main(agent_id):
 
     supabase = get_supabase_client()
 
-    # Fetch rows for the specified agent_id
-    response = (
-        supabase.table(TABLE_NAME)
-        .select("id, content")
-        .eq("agent_id", agent_id)
-        .execute()
+    # Stream rows for the specified agent_id
+    rows = iter_rows(
+        supabase, TABLE_NAME, "id, content",
+        filters=lambda query: query.eq("agent_id", agent_id)
     )
-    rows = response.data
-
-    if not rows:
-        print(f"No rows found for agent_id {agent_id}.")
-        return
 
     # Count rows with content exceeding 10,000 characters
+    total_rows = 0
     large_content_rows = []
     for row in rows:
+        total_rows += 1
         content = row.get("content", "")
         if content and len(content) > 10000:
             large_content_rows.append((row["id"], len(content)))
 
+    if not total_rows:
+        log.info("No rows found for agent_id %s.", agent_id)
+        return
+
     # Print results
-    print(f"Total rows for agent_id {agent_id}: {len(rows)}")
-    print(f"Rows with content exceeding 10,000 characters: {len(large_content_rows)}")
+    log.info("Total rows for agent_id %s: %d", agent_id, total_rows)
+    log.info("Rows with content exceeding 10,000 characters: %d", len(large_content_rows))
     
     if large_content_rows:
-        print("\nDetails of rows with large content:")
+        log.info("Details of rows with large content:")
         for row_id, content_length in large_content_rows:
-            print(f"Row ID: {row_id}, Content length: {content_length} characters")
+            log.info("Row ID: %s, Content length: %d characters", row_id, content_length)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Check for rows with content exceeding 10,000 characters.")
     parser.add_argument("agent_id", help="The agent_id to check rows for")
+    add_logging_arguments(parser)
     args = parser.parse_args()
+    setup_logging(args.log_format, args.log_level)
     main(args.agent_id)
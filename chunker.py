@@ -0,0 +1,105 @@
+"""
+Shared text chunker for everything that uploads text to Zep.
+
+iter_chunks streams over its input and yields chunks that never exceed the
+size limit. Each chunk is cut at the best boundary inside its window, in order
+of preference: paragraph break, sentence end, whitespace, and only as a last
+resort a hard cut. Sentence ends skip common abbreviations ("Dr.", "e.g.") and
+decimals ("3.14"). Chunks may optionally overlap by a number of characters.
+
+Every boundary search only looks at the current window and the input is never
+re-copied as a whole, so chunking is O(n) in the size of the input.
+"""
+
+import re
+from config import MAX_CHUNK_SIZE, CHUNK_OVERLAP
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+WHITESPACE = re.compile(r"\s+")
+
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "inc", "ltd",
+    "co", "no", "fig", "approx", "e.g", "i.e", "a.m", "p.m", "u.s",
+}
+
+def _is_abbreviation(text, dot):
+    """True if the period at text[dot] ends an abbreviation or an initial"""
+    space = max(text.rfind(" ", max(dot - 16, 0), dot), text.rfind("\n", max(dot - 16, 0), dot))
+    # Without a space in the window, space is -1; never copy more than the window
+    word = text[max(space + 1, dot - 16):dot].lstrip("\"'([").lower()
+    return word in ABBREVIATIONS or (len(word) == 1 and word.isalpha())
+
+def _last_match(pattern, text, start, end, accept=None):
+    last = None
+    for match in pattern.finditer(text, start, end):
+        if accept is None or accept(match):
+            last = match
+    return last
+
+def find_cut(text, start, chunk_size):
+    """Return the end of the chunk that starts at text[start], at most chunk_size long"""
+    end = start + chunk_size
+    # Never cut so early that chunks become much smaller than the limit
+    floor = start + chunk_size // 2
+
+    match = _last_match(PARAGRAPH_BREAK, text, floor, end)
+    if match:
+        return match.end()
+
+    match = _last_match(
+        SENTENCE_END, text, floor, end,
+        accept=lambda m: text[m.start()] != "." or not _is_abbreviation(text, m.start())
+    )
+    if match:
+        return match.end()
+
+    match = _last_match(WHITESPACE, text, floor, end)
+    if match:
+        return match.end()
+
+    return end
+
+def iter_chunks(text, chunk_size=MAX_CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Yield chunks of at most chunk_size characters.
+
+    Args:
+        text: A string, or an iterable of string blocks (e.g. read from a file)
+        chunk_size: Maximum characters per chunk
+        overlap: Characters of the previous chunk repeated at the start of the next
+    """
+    if overlap >= chunk_size // 2:
+        raise ValueError("overlap must be less than half of chunk_size")
+
+    blocks = (text,) if isinstance(text, str) else text
+    buffer = ""
+    start = 0  # Start of the next chunk in buffer
+    emitted = 0  # End of the text already yielded, so overlap is never yielded alone
+
+    for block in blocks:
+        # Only the unconsumed tail (less than one chunk) is copied
+        buffer = buffer[start:] + block
+        emitted = max(emitted - start, 0)
+        start = 0
+
+        while len(buffer) - start > chunk_size:
+            cut = find_cut(buffer, start, chunk_size)
+            chunk = buffer[start:cut].strip()
+            if chunk:
+                yield chunk
+            emitted = cut
+
+            start = cut
+            if overlap:
+                # Begin the overlap at a word boundary
+                match = WHITESPACE.search(buffer, cut - overlap, cut)
+                if match:
+                    start = match.end()
+
+    if buffer[emitted:].strip():
+        yield buffer[start:].strip()
+
+def chunk_text(text, chunk_size=MAX_CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Split text into a list of chunks of at most chunk_size characters"""
+    return list(iter_chunks(text, chunk_size, overlap))
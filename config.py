@@ -7,4 +7,49 @@ ZEP_BASE_URL = "https://api.getzep.com"
 DEFAULT_GROUP_ID = "demo_group"
 
 # Content processing settings
-MAX_CHUNK_SIZE = 9000  # Setting slightly below 10000 to be safe 
\ No newline at end of file
+MAX_CHUNK_SIZE = 9000  # Setting slightly below 10000 to be safe 
+CHUNK_OVERLAP = 0  # Characters repeated between consecutive chunks
+FILE_BLOCK_SIZE = 64 * 1024  # Characters read from a file at a time when streaming
+FILE_PREFETCH_BLOCKS = 4  # Blocks read ahead of the uploader
+FILE_POOL_MAX_BYTES = 4 * 1024 * 1024  # Larger files are streamed and chunked in the uploader, not a worker process
+
+# Rate limiting settings for scripts that write to Zep
+ZEP_TIMEOUT_SECONDS = 60
+ZEP_MAX_REQUESTS_PER_SECOND = 10.0  # Starting (and highest) send rate
+ZEP_MIN_REQUESTS_PER_SECOND = 0.2  # Never back off below this rate
+ZEP_MAX_THROTTLE_RETRIES = 8  # Throttled attempts per request before giving up
+ZEP_MAX_RETRY_AFTER_SECONDS = 60  # Cap on how long a Retry-After header can pause us
+
+# Supabase read settings
+SUPABASE_PAGE_SIZE = 1000  # Rows fetched per request when streaming a table
+
+# Supabase write-back settings
+WRITEBACK_BATCH_SIZE = 500  # Rows per bulk zep_uuid update
+WRITEBACK_FLUSH_SECONDS = 2.0  # Flush pending updates at least this often
+WRITEBACK_RPC_NAME = "bulk_set_zep_uuids"  # Postgres function from bulk_set_zep_uuids.sql
+WRITEBACK_RPC_TABLE = "embeddings"  # The only table that function updates
+WRITEBACK_RETRY_MAX_SECONDS = 60  # Longest backoff between background flush retries
+
+# Ordered document upload settings (add_from_supabase.py, add_from_youtube.py)
+UPLOAD_MAX_DOCUMENTS = 4  # Documents uploaded at once; chunks within a document stay in order
+UPLOAD_MAX_REQUESTS = 4  # Add calls in flight at once, across all documents
+UPLOAD_QUEUE_DOCUMENTS = 4  # Documents buffered between pipeline stages, per stage
+
+# Local journal of uploaded chunks, used to resume interrupted uploads
+INGEST_JOURNAL_PATH = "ingest_journal.sqlite3"
+
+# Opt-in local cache of graph.search results
+SEARCH_CACHE_PATH = "search_cache.sqlite3"  # On-disk tier, also holds the group versions uploaders bump
+SEARCH_CACHE_TTL_SECONDS = 300  # Cached results expire after this long
+SEARCH_CACHE_MAX_ENTRIES = 1024  # Size of the in-memory LRU tier
+SEARCH_CACHE_INVALIDATE_SECONDS = 1.0  # Uploaders bump a group's version at most this often
+
+# Batch search settings
+SEARCH_CONCURRENCY = 16  # Searches kept in flight by batch_search.py
+SEARCH_MAX_REQUESTS_PER_SECOND = 50.0  # Starting (and highest) search rate
+
+# Resident search server (search_server.py) and its client (search_client.py)
+SEARCH_SERVER_HOST = "127.0.0.1"
+SEARCH_SERVER_PORT = 8750
+SEARCH_SERVER_POOL_SIZE = 16  # Warm connections kept open to Zep
+SEARCH_SERVER_KEEPALIVE_SECONDS = 300  # Idle time before a warm connection is dropped
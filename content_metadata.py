@@ -0,0 +1,136 @@
+"""
+Fast parsing of the metadata embedded in episode content.
+
+Uploaded episodes start with a compact envelope (see envelope.py) or, if
+uploaded before envelopes, a [YOUTUBE_METADATA] or [METADATA] JSON header
+followed by [CONTENT]. Older or hand-added episodes may only carry a bare
+YouTube URL or a files/ path line. Envelopes are decoded by
+envelope.decode_envelope, so the version check and the rebuilt YouTube urls
+match the uploaders'. parse_metadata reads the older headers with
+precompiled patterns in a single pass over the header: the tag is matched in
+place at the start of the content (where the uploaders put it), the JSON is
+decoded straight out of the content string without slicing it, and the
+[CONTENT] marker is matched where the JSON ends. Only content without a
+header is scanned further, with str.find doing the scanning before any regex
+runs. The result is a small slotted record instead of a guessed-at dict.
+
+Usage:
+    meta = parse_metadata(episode.content)
+    if meta.source_type == "youtube":
+        print(meta.video_id, meta.start_time)
+
+    records = parse_metadata_many(contents)  # e.g. over an exported group
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from envelope import ENVELOPE_TAG_RE, decode_envelope
+
+HEADER_TAG_RE = re.compile(r"\s*\[(YOUTUBE_METADATA|METADATA)\]\s*")
+CONTENT_TAG_RE = re.compile(r"\s*\[CONTENT\]")
+DECODER = json.JSONDecoder()
+YOUTUBE_URL = "youtube.com/watch?v="
+YOUTUBE_URL_RE = re.compile(r"youtube\.com/watch\?v=([\w-]*)(\S*)")
+START_TIME_RE = re.compile(r"[?&]t=(\d+)")
+
+HEADER_SOURCE_TYPES = {"YOUTUBE_METADATA": "youtube", "METADATA": "document"}
+
+@dataclass(slots=True)
+class ContentMetadata:
+    """What an episode's content says about its source"""
+
+    source_type: str  # "youtube" or "document"
+    title: str = ""
+    video_id: str = None
+    start_time: float = 0
+    file_path: str = None
+    chunk_number: int = 0
+    metadata: dict = None  # The parsed header, when the content had one
+
+    def as_dict(self):
+        """The header dict if there was one, else the fields a header would have held"""
+        if self.metadata is not None:
+            return self.metadata
+        if self.source_type == "youtube":
+            return {"video_id": self.video_id, "title": self.title, "start_time": self.start_time}
+        return {"file_path": self.file_path, "title": self.title, "chunk_number": self.chunk_number}
+
+def _from_header(source_type, metadata):
+    if not isinstance(metadata, dict):
+        return ContentMetadata(source_type, metadata=metadata)
+    return ContentMetadata(
+        source_type,
+        title=metadata.get("title") or "",
+        video_id=metadata.get("video_id"),
+        start_time=metadata.get("start_time") or 0,
+        file_path=metadata.get("file_path"),
+        chunk_number=metadata.get("chunk_number") or 0,
+        metadata=metadata,
+    )
+
+def _from_youtube_url(match):
+    start = START_TIME_RE.search(match.group(2))
+    return ContentMetadata(
+        "youtube", title="YouTube Video", video_id=match.group(1),
+        start_time=int(start.group(1)) if start else 0
+    )
+
+def _find_file_line(content):
+    """The first line that starts with files/ or contains /files/, or None"""
+    index = content.find("files/")
+    while index >= 0:
+        if index == 0 or content[index - 1] in "\n/":
+            start = content.rfind("\n", 0, index) + 1
+            end = content.find("\n", index)
+            return content[start:end if end >= 0 else len(content)]
+        index = content.find("files/", index + 1)
+    return None
+
+def _parse_header(content):
+    """ContentMetadata from an envelope or a [*METADATA] JSON [CONTENT] header, or None if there isn't a valid one"""
+    if ENVELOPE_TAG_RE.match(content) is not None:
+        # Envelopes share envelope.py's version check and derived fields
+        envelope = decode_envelope(content)
+        if envelope is None:
+            return None
+        return _from_header("youtube" if envelope.kind == "youtube" else "document", envelope.metadata)
+
+    tag = HEADER_TAG_RE.match(content)
+    if tag is None:
+        # Headers are normally first; look further only if a tag is there at all
+        if "METADATA]" not in content:
+            return None
+        tag = HEADER_TAG_RE.search(content)
+        if tag is None:
+            return None
+    try:
+        metadata, end = DECODER.raw_decode(content, tag.end())
+    except ValueError:
+        return None  # Malformed header: fall back to what the text itself says
+    if CONTENT_TAG_RE.match(content, end) is None:
+        return None
+    return _from_header(HEADER_SOURCE_TYPES[tag.group(1)], metadata)
+
+def parse_metadata(content):
+    """Parse one episode's content into a ContentMetadata record"""
+    header = _parse_header(content)
+    if header is not None:
+        return header
+
+    index = content.find(YOUTUBE_URL)
+    if index >= 0:
+        return _from_youtube_url(YOUTUBE_URL_RE.match(content, index))
+
+    line = _find_file_line(content)
+    if line is not None:
+        file_path = line.strip()
+        return ContentMetadata("document", title=os.path.basename(file_path), file_path=file_path)
+
+    return ContentMetadata("document", file_path="unknown")
+
+def parse_metadata_many(contents):
+    """Parse a list (or any iterable) of contents; returns a list of ContentMetadata"""
+    parse = parse_metadata
+    return [parse(content) for content in contents]
@@ -0,0 +1,132 @@
+"""
+Compact, versioned envelope for the metadata sent with each episode.
+
+The uploaders used to prefix every episode with an indented JSON header
+([METADATA] / [YOUTUBE_METADATA] ... [CONTENT]), and the YouTube one also
+carried three URLs and a [TIMESTAMP]/[URL] trailer that can all be rebuilt
+from video_id and the start and end times. An envelope is a short tag, the
+metadata as compact JSON on the same line, then the content:
+
+    [ZEP/1 youtube]{"video_id":"abc","chunk_number":3,"start_time":30.0,...}
+    <content>
+
+encode_envelope writes one. decode_envelope reads envelopes and the older
+headers alike, rebuilding the derivable fields, so episodes uploaded before
+the switch keep working. legacy_payload renders an envelope in the old
+layout; ingest_journal.stable_hash hashes envelopes through it, so the dedup
+index still recognises chunks that were uploaded in the old format.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+
+ENVELOPE_VERSION = 1
+ENVELOPE_TAG_RE = re.compile(r"\[ZEP/(\d+) (\w+)\]")
+DECODER = json.JSONDecoder()
+
+# Header markers of the format used before envelopes, by kind
+LEGACY_MARKERS = {"youtube": "[YOUTUBE_METADATA]", "document": "[METADATA]"}
+
+@dataclass(slots=True)
+class Envelope:
+    """Decoded episode payload; version is 0 for the old header format"""
+
+    kind: str  # "youtube" or "document"
+    metadata: dict
+    body: str
+    version: int = ENVELOPE_VERSION
+
+def format_timestamp(seconds):
+    """Convert seconds to HH:MM:SS format"""
+    if seconds is None:
+        return "00:00:00"
+
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    seconds = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+def youtube_urls(video_id, start_time=None, end_time=None):
+    """Generate YouTube URLs with optional timestamps"""
+    base_url = f"https://www.youtube.com/watch?v={video_id}"
+
+    if start_time is None:
+        return {
+            "video_url": base_url
+        }
+
+    # Convert float timestamps to integers for URL
+    start_seconds = int(start_time)
+
+    urls = {
+        "video_url": base_url,
+        "timestamped_url": f"{base_url}&t={start_seconds}"
+    }
+
+    if end_time is not None:
+        end_seconds = int(end_time)
+        urls["clip_url"] = f"{base_url}&start={start_seconds}&end={end_seconds}"
+
+    return urls
+
+def encode_envelope(kind, metadata, body):
+    """Prefix body with kind and metadata as a compact envelope"""
+    if kind == "youtube" and "urls" in metadata:
+        metadata = {key: value for key, value in metadata.items() if key != "urls"}
+    header = json.dumps(metadata, separators=(",", ":"), ensure_ascii=False)
+    return f"[ZEP/{ENVELOPE_VERSION} {kind}]{header}\n{body}"
+
+def decode_envelope(payload):
+    """
+    Decode an envelope, or an old-format header, into an Envelope.
+
+    Returns None for payloads with neither, with malformed metadata, or from
+    a newer envelope version than this code understands.
+    """
+    tag = ENVELOPE_TAG_RE.match(payload)
+    if tag is not None:
+        version = int(tag.group(1))
+        if version > ENVELOPE_VERSION:
+            return None
+        try:
+            metadata, end = DECODER.raw_decode(payload, tag.end())
+        except ValueError:
+            return None
+        kind = tag.group(2)
+        if kind == "youtube" and isinstance(metadata, dict):
+            metadata["urls"] = youtube_urls(metadata.get("video_id"), metadata.get("start_time"), metadata.get("end_time"))
+        body = payload[end + 1:] if payload.startswith("\n", end) else payload[end:]
+        return Envelope(kind, metadata, body, version)
+
+    for kind, marker in LEGACY_MARKERS.items():
+        if payload.startswith(marker):
+            header, separator, body = payload[len(marker):].partition("[CONTENT]")
+            if not separator:
+                return None
+            try:
+                metadata = json.loads(header)
+            except ValueError:
+                return None
+            return Envelope(kind, metadata, body[1:] if body.startswith("\n") else body, 0)
+    return None
+
+def legacy_body(envelope):
+    """The body as the old format wrote it; YouTube bodies ended with a timestamp and URL trailer"""
+    if envelope.version == 0 or envelope.kind != "youtube":
+        return envelope.body
+    metadata = envelope.metadata
+    urls = metadata["urls"]
+    return (
+        f"{envelope.body}\n[TIMESTAMP] {format_timestamp(metadata.get('start_time'))} - {format_timestamp(metadata.get('end_time'))}\n"
+        f"[URL] {urls.get('timestamped_url', urls['video_url'])}"
+    )
+
+def legacy_payload(envelope):
+    """Render an envelope in the old [METADATA]/[YOUTUBE_METADATA] layout"""
+    if envelope.kind not in LEGACY_MARKERS:
+        raise ValueError(f"Envelope kind {envelope.kind!r} has no legacy layout (known: {', '.join(LEGACY_MARKERS)})")
+    return (
+        f"{LEGACY_MARKERS[envelope.kind]}\n{json.dumps(envelope.metadata, indent=2)}\n"
+        f"[CONTENT]\n{legacy_body(envelope)}"
+    )
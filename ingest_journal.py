@@ -0,0 +1,101 @@
+"""
+Crash-safe journal of chunks that have already been uploaded to Zep.
+
+Each successful graph.add is recorded in a local SQLite database (WAL mode)
+with the chunk's content hash, its source and the episode UUID Zep returned.
+A --resume run loads the finished hashes for the group into a set once, so
+checking each chunk is O(1), and only uploads what is missing.
+
+The same table is the deduplication index for the Supabase uploaders: they
+hash each formatted payload with stable_hash, which ignores volatile metadata
+such as upload timestamps, and only send chunks that are new or have changed.
+Compact envelopes (see envelope.py) hash the same as the old header layout of
+the same chunk, so switching formats does not re-upload anything.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from config import INGEST_JOURNAL_PATH
+from envelope import decode_envelope, legacy_payload
+
+# Metadata fields that change on every run without the chunk itself changing
+VOLATILE_METADATA_FIELDS = ("timestamp",)
+METADATA_MARKERS = ("[METADATA]", "[YOUTUBE_METADATA]")
+
+def content_hash(data):
+    """Stable hash of the exact data sent to Zep"""
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def stable_hash(payload):
+    """Hash of a formatted payload that ignores volatile metadata fields"""
+    if payload.startswith("[ZEP/"):
+        envelope = decode_envelope(payload)
+        if envelope is not None and isinstance(envelope.metadata, dict):
+            # Hash the old layout of the same chunk (raises ValueError for an unknown kind)
+            payload = legacy_payload(envelope)
+    for marker in METADATA_MARKERS:
+        if payload.startswith(marker):
+            header, separator, content = payload[len(marker):].partition("[CONTENT]")
+            try:
+                metadata = json.loads(header)
+            except ValueError:
+                break
+            for field in VOLATILE_METADATA_FIELDS:
+                metadata.pop(field, None)
+            payload = f"{marker}{json.dumps(metadata, sort_keys=True)}{separator}{content}"
+            break
+    return content_hash(payload)
+
+class IngestJournal:
+    """Append-only record of uploaded chunks, keyed by (group_id, content_hash)"""
+
+    def __init__(self, path=INGEST_JOURNAL_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # With WAL, NORMAL keeps committed rows safe if the process crashes
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS uploaded_chunks (
+                    group_id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    source TEXT,
+                    episode_uuid TEXT,
+                    uploaded_at TEXT NOT NULL,
+                    PRIMARY KEY (group_id, content_hash)
+                )
+                """
+            )
+            self.conn.commit()
+
+    def completed_hashes(self, group_id):
+        """Return the set of content hashes already uploaded to a group"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT content_hash FROM uploaded_chunks WHERE group_id = ?", (group_id,)
+            )
+            return {row[0] for row in rows}
+
+    def record(self, group_id, chunk_hash, source, episode_uuid):
+        """Durably record one uploaded chunk"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO uploaded_chunks VALUES (?, ?, ?, ?, ?)",
+                (group_id, chunk_hash, source, episode_uuid, datetime.utcnow().isoformat() + "Z")
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,176 @@
+"""
+Shared logging setup for the scripts: --log-format text|json and --log-level.
+
+Records are handed to a background thread through a queue and written to
+stdout in buffered batches, so a tight upload loop never waits on terminal or
+pipe I/O. The buffer is flushed when it fills up, when no records have
+arrived for a short while, and at exit.
+
+Per-chunk detail is logged at DEBUG with lazy %-style arguments, so reprs of
+SDK response objects are only built when DEBUG is enabled. Progress replaces
+per-chunk INFO lines with at most one line per N items or per interval.
+
+Usage:
+    log = logging.getLogger("add_text")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(args.log_format, args.log_level)
+
+    progress = Progress(log, "Uploaded chunks", total=len(chunks))
+    for chunk in chunks:
+        ...
+        progress.update()
+    progress.done()
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+LOG_FORMATS = ("text", "json")
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+# Fields every LogRecord has; anything else was passed through extra=
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any extra= fields included"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat().replace("+00:00", "Z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class BufferedLogWriter(logging.Handler):
+    """
+    Handler that queues records for a background thread, which formats them and
+    writes them to the stream in batches.
+
+    Args:
+        stream: File object to write to
+        capacity: Write once this many formatted lines are buffered
+        flush_interval: Write buffered lines after this many idle seconds
+    """
+
+    def __init__(self, stream, capacity=256, flush_interval=0.5):
+        super().__init__()
+        self.stream = stream
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.records = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def emit(self, record):
+        # Resolve the message now so later mutation of the arguments can't change it
+        record.msg = record.getMessage()
+        record.args = None
+        self.records.put(record)
+
+    def close(self):
+        """Write everything still queued and stop the writer thread"""
+        if self.thread.is_alive():
+            self.records.put(None)
+            self.thread.join()
+        super().close()
+
+    def _run(self):
+        lines = []
+        while True:
+            try:
+                record = self.records.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._write(lines)
+                continue
+            if record is None:
+                self._write(lines)
+                return
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+            if len(lines) >= self.capacity:
+                self._write(lines)
+
+    def _write(self, lines):
+        if not lines:
+            return
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+        lines.clear()
+
+def add_logging_arguments(parser):
+    parser.add_argument("--log-format", choices=LOG_FORMATS, default="text", help="Log output format (default: text)")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="INFO", type=str.upper,
+                        help="Minimum level to log; DEBUG includes per-chunk details (default: INFO)")
+
+def setup_logging(log_format="text", level="INFO", stream=None):
+    """Route all logging through one buffered background writer"""
+    handler = BufferedLogWriter(stream or sys.stdout)
+    if log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    # Keep HTTP client chatter out of debug runs
+    logging.getLogger("httpx").setLevel(max(logging.WARNING, root.level))
+    logging.getLogger("httpcore").setLevel(max(logging.WARNING, root.level))
+    atexit.register(handler.close)
+    return handler
+
+class Progress:
+    """
+    Rate-limited progress lines: logs at most once every `every` items or
+    `interval` seconds, whichever comes first, plus a final line from done().
+    """
+
+    def __init__(self, log, label, total=None, every=100, interval=1.0):
+        self.log = log
+        self.label = label
+        self.total = total
+        self.every = every
+        self.interval = interval
+        self.count = 0
+        self.started = time.monotonic()
+        self.next_at = self.started + interval
+        self.next_count = every
+
+    def update(self, n=1, **fields):
+        self.count += n
+        if self.count >= self.next_count or time.monotonic() >= self.next_at:
+            self._emit(fields)
+
+    def done(self, **fields):
+        self._emit(fields, final=True)
+
+    def _emit(self, fields, final=False):
+        now = time.monotonic()
+        elapsed = now - self.started
+        rate = self.count / elapsed if elapsed else 0.0
+        of_total = f"/{self.total}" if self.total is not None else ""
+        self.log.info(
+            "%s: %d%s (%.1f/s)%s", self.label, self.count, of_total, rate, " done" if final else "",
+            extra={"progress": self.label, "count": self.count, "total": self.total,
+                   "rate": round(rate, 2), "final": final, **fields}
+        )
+        self.next_at = now + self.interval
+        self.next_count = self.count + self.every
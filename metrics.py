@@ -0,0 +1,226 @@
+"""
+Per-stage timings and counters for the uploaders.
+
+Stages (Supabase fetch, chunking, formatting, Zep calls, write-back) are timed
+into fixed-bucket histograms and counters track bytes, episodes and retries.
+Recording is off by default: a disabled stage is a shared no-op context
+manager and timed_iter returns its input unchanged, so the hot loops pay
+almost nothing unless a script is run with --metrics.
+
+Usage:
+    with METRICS.stage("zep_add"):
+        client.graph.add(...)
+    METRICS.count("episodes")
+
+    with metrics_run(args.metrics, "add_text"):
+        ...  # prints a summary and writes Prometheus text or JSON lines at the end
+"""
+
+import bisect
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+
+# Upper bounds in seconds, roughly 2.5x apart from 0.5 ms to 60 s
+BUCKET_BOUNDS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0,
+)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers: the smallest value with at least fraction of them at or below it"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+class Histogram:
+    """Count, sum and bucket counts of observed durations"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class _Stage:
+    """Times one pass through a stage"""
+
+    __slots__ = ("metrics", "name", "started")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.started)
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+_NULL_STAGE = _NullStage()
+
+class Metrics:
+    """Registry of stage histograms and counters, shared by a whole run"""
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.started_at = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.started_at = time.perf_counter()
+
+    def stage(self, name):
+        """Context manager that times a stage (a no-op when disabled)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def timed_iter(self, name, iterable):
+        """Yield from iterable, timing how long each item takes to arrive"""
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iterable)
+
+    def _timed_iter(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(name, time.perf_counter() - started)
+            yield item
+
+    def summary(self):
+        """Human-readable end-of-run summary; concurrent stages can add up to more than 100%"""
+        elapsed = time.perf_counter() - self.started_at
+        lines = [f"\n=== METRICS ({elapsed:.1f}s) ==="]
+        with self.lock:
+            for name, h in sorted(self.histograms.items(), key=lambda item: -item[1].sum):
+                lines.append(
+                    f"{name:<18} n={h.count:<8} total={h.sum:8.2f}s "
+                    f"({h.sum / elapsed * 100 if elapsed else 0:5.1f}%) "
+                    f"p50<={h.percentile(0.5) * 1000:.1f}ms p99<={h.percentile(0.99) * 1000:.1f}ms "
+                    f"max={h.max * 1000:.1f}ms"
+                )
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<18} {value}")
+        return "\n".join(lines)
+
+    def to_prometheus(self, prefix="zep_uploader"):
+        """Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            if self.histograms:
+                lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKET_BOUNDS + ("+Inf",), h.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {h.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {h.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self, run=None):
+        """One JSON object per histogram and counter"""
+        timestamp = datetime.utcnow().isoformat() + "Z"
+        records = []
+        with self.lock:
+            for name, h in sorted(self.histograms.items()):
+                records.append({
+                    "run": run, "timestamp": timestamp, "type": "histogram", "name": name,
+                    "count": h.count, "sum": h.sum, "max": h.max,
+                    "p50": h.percentile(0.5), "p99": h.percentile(0.99),
+                    "buckets": dict(zip([str(b) for b in BUCKET_BOUNDS] + ["+Inf"], h.buckets)),
+                })
+            for name, value in sorted(self.counters.items()):
+                records.append({"run": run, "timestamp": timestamp, "type": "counter", "name": name, "value": value})
+        return "".join(json.dumps(record) + "\n" for record in records)
+
+    def write(self, path, run=None):
+        """Write Prometheus text if path ends in .prom, JSON lines otherwise"""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_jsonl(run)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+# Shared by every module in the process
+METRICS = Metrics()
+
+class metrics_run:
+    """Enable METRICS for a run and report them when it ends (does nothing if path is None)"""
+
+    def __init__(self, path, run=None):
+        self.path = path
+        self.run = run
+
+    def __enter__(self):
+        if self.path:
+            METRICS.enable()
+        return METRICS
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.path:
+            log = logging.getLogger("metrics")
+            log.info(METRICS.summary())
+            METRICS.write(self.path, self.run)
+            log.info("Metrics written to %s", self.path)
+
+def add_metrics_argument(parser):
+    parser.add_argument(
+        "--metrics", metavar="PATH",
+        help="Record per-stage timings and counters and write them to PATH (.prom for Prometheus text, otherwise JSON lines)"
+    )
@@ -0,0 +1,549 @@
+"""
+Local stand-in for the Zep API and Supabase's PostgREST API, for offline load
+testing and benchmarks.
+
+One in-process HTTP server answers both:
+
+- Zep (/api/v2): graph, graph-batch, graph/search, graph/episodes/group/{id},
+  graph/episodes/{uuid} (GET/DELETE), groups, groups/{id}, groups-ordered
+- PostgREST (/rest/v1): select with column lists, filters (eq, neq, gt, gte,
+  lt, lte, is, in, not.*, or/and trees), order, limit, offset and exact counts;
+  PATCH updates, inserts/upserts, and the bulk_set_zep_uuids RPC
+
+Zep requests can be slowed down, failed at random with 503s and rate limited
+with 429 + Retry-After, so uploaders and searchers can be benchmarked
+reproducibly with no network access.
+
+Usage:
+    with MockServer(latency=0.02, rate_limit=50) as mock:
+        mock.seed_embeddings(10000, agent_id="agent-1")
+        os.environ.update(mock.environ())
+        ...  # run any script; its Zep and Supabase clients now talk to the mock
+
+    python3 mock_server.py --port 8765 --latency 0.05 --rate-limit 20 --embeddings 10000
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+# Any JWT-shaped string passes supabase-py's key validation
+MOCK_SUPABASE_KEY = "mock.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.signature"
+MOCK_ZEP_API_KEY = "mock-zep-api-key"
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+def _split_top_level(text):
+    """Split on commas that are not inside parentheses or double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "\\" and quoted and i + 1 < len(text):
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current))
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+    if current:
+        parts.append("".join(current))
+    return parts
+
+def _unquote_value(value):
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+def _coerce(raw, sample):
+    """Convert a filter value from the URL to the type of the stored value"""
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return float(raw)
+    if isinstance(sample, float):
+        return float(raw)
+    return raw
+
+def _compare(op, value, raw):
+    """Evaluate one PostgREST operator against a stored value"""
+    if op == "is":
+        return {"null": value is None, "true": value is True, "false": value is False}[raw]
+    if value is None:
+        return False
+    if op == "in":
+        options = [_unquote_value(v) for v in _split_top_level(raw.strip("()"))]
+        return value in [_coerce(o, value) for o in options]
+    other = _coerce(_unquote_value(raw), value)
+    if op == "eq":
+        return value == other
+    if op == "neq":
+        return value != other
+    if op == "gt":
+        return value > other
+    if op == "gte":
+        return value >= other
+    if op == "lt":
+        return value < other
+    if op == "lte":
+        return value <= other
+    if op == "like":
+        return re.fullmatch(re.escape(other).replace("\\*", ".*").replace("%", ".*"), str(value)) is not None
+    raise ValueError(f"Unsupported operator: {op}")
+
+def _column_filter(column, expression):
+    """Build a predicate for `column=op.value` (optionally prefixed with not.)"""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[len("not."):]
+    op, _, raw = expression.partition(".")
+    return lambda row: _compare(op, row.get(column), raw) != negate
+
+def _logical_filter(kind, body):
+    """Build a predicate for or=(...) / and=(...) trees"""
+    predicates = []
+    for term in _split_top_level(body):
+        match = re.match(r"^(not\.)?(or|and)\((.*)\)$", term)
+        if match:
+            inner = _logical_filter(match.group(2), match.group(3))
+            predicates.append((lambda p: lambda row: not p(row))(inner) if match.group(1) else inner)
+        else:
+            column, _, expression = term.partition(".")
+            predicates.append(_column_filter(column, expression))
+    combine = any if kind == "or" else all
+    return lambda row: combine(p(row) for p in predicates)
+
+def _sort_rows(rows, order):
+    """Apply a PostgREST order parameter (col.asc,col2.desc.nullsfirst,...)"""
+    for term in reversed(order.split(",")):
+        column, *modifiers = term.split(".")
+        desc = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or (desc and "nullslast" not in modifiers)
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: r[column], reverse=desc)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+class MockState:
+    """Data and behaviour shared by every request the mock server handles"""
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit=None, supabase_latency=0.0, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.supabase_latency = supabase_latency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.groups = {}
+        self.episodes = {}  # uuid -> episode dict (with group_id)
+        self.tables = {}  # table name -> list of row dicts
+        self.stats = {}
+
+        self.tokens = float(rate_limit or 0)
+        self.tokens_at = time.monotonic()
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def take_token(self):
+        """Token bucket for the Zep rate limit; returns seconds to wait, or 0"""
+        if not self.rate_limit:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.tokens_at) * self.rate_limit)
+            self.tokens_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate_limit
+
+    def should_fail(self):
+        with self.lock:
+            return self.error_rate and self.random.random() < self.error_rate
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so pooled clients reuse connections
+    disable_nagle_algorithm = True  # Headers and body are separate writes; avoid 40 ms delayed-ACK stalls
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_HEAD(self):
+        self.dispatch("HEAD")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        state = self.server.state
+        url = urlsplit(self.path)
+        self.query = parse_qsl(url.query, keep_blank_values=True)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        self.body = json.loads(raw_body) if raw_body else None
+
+        try:
+            if url.path.startswith("/api/v2/"):
+                self.handle_zep(state, method, unquote(url.path[len("/api/v2/"):]))
+            elif url.path.startswith("/rest/v1/"):
+                if state.supabase_latency:
+                    time.sleep(state.supabase_latency)
+                self.handle_postgrest(state, method, unquote(url.path[len("/rest/v1/"):]))
+            else:
+                self.respond(404, {"message": "not found"})
+        except Exception as e:
+            self.respond(500, {"message": str(e)})
+
+    def respond(self, status, payload=None, headers=None):
+        data = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    # ---- Zep ----
+
+    def handle_zep(self, state, method, path):
+        state.count(f"zep {method} {path.split('/')[0]}")
+        wait = state.take_token()
+        if wait:
+            state.count("zep throttled")
+            retry_after = max(1, round(wait))
+            return self.respond(429, {"message": "rate limit exceeded"}, {"Retry-After": str(retry_after)})
+        if state.should_fail():
+            state.count("zep failed")
+            return self.respond(503, {"message": "service unavailable"})
+        if state.latency:
+            time.sleep(state.latency)
+
+        if method == "POST" and path == "graph":
+            return self.respond(200, self.add_episode(state, self.body["group_id"], self.body["data"]))
+        if method == "POST" and path == "graph-batch":
+            episodes = [self.add_episode(state, self.body["group_id"], e["data"]) for e in self.body["episodes"]]
+            return self.respond(200, episodes)
+        if method == "POST" and path == "graph/search":
+            return self.respond(200, self.search(state, self.body))
+        if method == "GET" and path.startswith("graph/episodes/group/"):
+            group_id = path[len("graph/episodes/group/"):]
+            with state.lock:
+                episodes = [e for e in state.episodes.values() if e["group_id"] == group_id]
+            lastn = dict(self.query).get("lastn")
+            if lastn:
+                episodes = episodes[-int(lastn):]
+            return self.respond(200, {"episodes": [self.public_episode(e) for e in episodes]})
+        if path.startswith("graph/episodes/"):
+            episode_uuid = path[len("graph/episodes/"):]
+            with state.lock:
+                episode = state.episodes.get(episode_uuid)
+                if episode and method == "DELETE":
+                    del state.episodes[episode_uuid]
+            if not episode:
+                return self.respond(404, {"message": "episode not found"})
+            if method == "DELETE":
+                return self.respond(200, {"message": "Episode deleted"})
+            return self.respond(200, self.public_episode(episode))
+        if method == "POST" and path == "groups":
+            group_id = self.body["group_id"]
+            with state.lock:
+                exists = group_id in state.groups
+                if not exists:
+                    state.groups[group_id] = {**self.body, "created_at": _now(), "uuid": str(uuid.uuid4())}
+            if exists:
+                return self.respond(400, {"message": "group already exists"})
+            return self.respond(201, state.groups[group_id])
+        if method == "GET" and path == "groups-ordered":
+            with state.lock:
+                groups = list(state.groups.values())
+            return self.respond(200, {"groups": groups, "row_count": len(groups), "total_count": len(groups)})
+        if path.startswith("groups/"):
+            group_id = path[len("groups/"):]
+            with state.lock:
+                group = state.groups.get(group_id)
+                if group and method == "DELETE":
+                    del state.groups[group_id]
+            if not group:
+                return self.respond(404, {"message": "group not found"})
+            if method == "DELETE":
+                return self.respond(200, {"message": "Group deleted"})
+            return self.respond(200, group)
+        return self.respond(404, {"message": f"unknown Zep endpoint {method} {path}"})
+
+    def add_episode(self, state, group_id, data):
+        episode = {"uuid": str(uuid.uuid4()), "content": data, "created_at": _now(),
+                   "source": "text", "processed": True, "group_id": group_id}
+        with state.lock:
+            state.episodes[episode["uuid"]] = episode
+        return self.public_episode(episode)
+
+    def public_episode(self, episode):
+        return {k: v for k, v in episode.items() if k != "group_id"}
+
+    def search(self, state, body):
+        """Rank the group's episodes by how many query words they contain"""
+        words = [w for w in re.findall(r"\w+", body.get("query", "").lower()) if len(w) > 2]
+        limit = body.get("limit") or 10
+        with state.lock:
+            episodes = [e for e in state.episodes.values() if e["group_id"] == body.get("group_id")]
+        scored = []
+        for episode in episodes:
+            content = episode["content"].lower()
+            score = sum(content.count(w) for w in words)
+            if score:
+                scored.append((score, episode))
+        scored.sort(key=lambda item: -item[0])
+        top = scored[:limit]
+
+        scope = body.get("scope") or "edges"
+        if scope == "episodes":
+            return {"episodes": [{**self.public_episode(e), "score": s} for s, e in top]}
+        if scope == "nodes":
+            return {"nodes": [
+                {"uuid": e["uuid"], "name": e["content"][:40], "summary": e["content"][:500],
+                 "created_at": e["created_at"], "score": s}
+                for s, e in top
+            ]}
+        return {"edges": [
+            {"uuid": e["uuid"], "name": "MENTIONS", "fact": e["content"][:500], "created_at": e["created_at"],
+             "source_node_uuid": e["uuid"], "target_node_uuid": e["uuid"], "episodes": [e["uuid"]], "score": s}
+            for s, e in top
+        ]}
+
+    # ---- PostgREST ----
+
+    def handle_postgrest(self, state, method, path):
+        state.count(f"supabase {method} {path}")
+        prefer = self.headers.get("Prefer", "")
+
+        if path.startswith("rpc/"):
+            return self.handle_rpc(state, path[len("rpc/"):])
+
+        with state.lock:
+            rows = state.tables.setdefault(path, [])
+            if method in ("GET", "HEAD"):
+                return self.select(rows, prefer)
+            if method == "PATCH":
+                matched = [r for r in rows if self.matches(r)]
+                for row in matched:
+                    row.update(self.body)
+                return self.write_result(matched, prefer)
+            if method == "DELETE":
+                matched = [r for r in rows if self.matches(r)]
+                state.tables[path] = [r for r in rows if not self.matches(r)]
+                return self.write_result(matched, prefer)
+            if method == "POST":
+                return self.insert(rows, prefer)
+        return self.respond(405, {"message": "method not allowed"})
+
+    def matches(self, row):
+        for key, value in self.query:
+            if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            if key in ("or", "and"):
+                if not _logical_filter(key, value[1:-1])(row):
+                    return False
+            elif key in ("not.or", "not.and"):
+                if _logical_filter(key[4:], value[1:-1])(row):
+                    return False
+            elif not _column_filter(key, value)(row):
+                return False
+        return True
+
+    def select(self, rows, prefer):
+        params = dict(self.query)
+        matched = [r for r in rows if self.matches(r)]
+        total = len(matched)
+        if "order" in params:
+            matched = _sort_rows(matched, params["order"])
+        offset = int(params.get("offset", 0))
+        limit = int(params["limit"]) if "limit" in params else None
+        matched = matched[offset:offset + limit if limit is not None else None]
+
+        columns = params.get("select", "*")
+        if columns != "*":
+            names = [c.strip() for c in columns.split(",")]
+            matched = [{name: row.get(name) for name in names} for row in matched]
+        else:
+            matched = [dict(row) for row in matched]
+
+        headers = {}
+        if "count=" in prefer:
+            end = offset + len(matched) - 1
+            span = f"{offset}-{end}" if matched else "*"
+            headers["Content-Range"] = f"{span}/{total}"
+        return self.respond(200, matched, headers)
+
+    def insert(self, rows, prefer):
+        new_rows = self.body if isinstance(self.body, list) else [self.body]
+        conflict = dict(self.query).get("on_conflict") or "id"
+        merge = "resolution=merge-duplicates" in prefer
+        index = {row.get(conflict): row for row in rows}
+        written = []
+        for new_row in new_rows:
+            existing = index.get(new_row.get(conflict))
+            if existing is not None and merge:
+                existing.update(new_row)
+                written.append(existing)
+            elif existing is not None:
+                return self.respond(409, {"message": "duplicate key value violates unique constraint"})
+            else:
+                row = dict(new_row)
+                if "id" not in row:
+                    row["id"] = max((r.get("id", 0) for r in rows), default=0) + 1
+                rows.append(row)
+                index[row.get(conflict)] = row
+                written.append(row)
+        return self.write_result(written, prefer, status=201)
+
+    def write_result(self, rows, prefer, status=200):
+        headers = {}
+        if "count=" in prefer:
+            headers["Content-Range"] = f"*/{len(rows)}"
+        if "return=minimal" in prefer:
+            return self.respond(204 if status == 200 else status, None, headers)
+        return self.respond(status, [dict(r) for r in rows], headers)
+
+    def handle_rpc(self, state, name):
+        if name == "bulk_set_zep_uuids":
+            updates = {u["id"]: u["zep_uuid"] for u in self.body["updates"]}
+            with state.lock:
+                for row in state.tables.get("embeddings", []):
+                    if row["id"] in updates:
+                        row["zep_uuid"] = updates[row["id"]]
+            return self.respond(200, None)
+        return self.respond(404, {"message": f"function {name} not found", "code": "PGRST202"})
+
+class MockServer:
+    """
+    Run the mock Zep + Supabase server on a background thread.
+
+    Args:
+        latency: Seconds added to every Zep request
+        error_rate: Fraction of Zep requests answered with a 503
+        rate_limit: Zep requests per second allowed before answering 429
+        supabase_latency: Seconds added to every PostgREST request
+        port: Port to listen on (0 picks a free one)
+        seed: Seed for the random error injection
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit=None, supabase_latency=0.0, port=0, seed=0):
+        self.state = MockState(latency, error_rate, rate_limit, supabase_latency, seed)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), MockHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def environ(self):
+        """Environment variables that point the repo's scripts at this server"""
+        return {
+            "ZEP_API_URL": self.url,
+            "ZEP_API_KEY": MOCK_ZEP_API_KEY,
+            "SUPABASE_URL": self.url,
+            "SUPABASE_KEY": MOCK_SUPABASE_KEY,
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def stats(self):
+        with self.state.lock:
+            return dict(self.state.stats)
+
+    def episodes(self, group_id):
+        with self.state.lock:
+            return [e for e in self.state.episodes.values() if e["group_id"] == group_id]
+
+    def table(self, name):
+        """The live row list of a mock table (create it by assigning rows)"""
+        with self.state.lock:
+            return self.state.tables.setdefault(name, [])
+
+    def seed_embeddings(self, count, agent_id="agent-1", content_size=800, seed=0):
+        """Fill the embeddings table with synthetic rows that have no zep_uuid yet"""
+        rng = random.Random(seed)
+        words = "lead client follow up call email offer value budget close pipeline nurture".split()
+        rows = self.table("embeddings")
+        start = len(rows)
+        for i in range(start + 1, start + count + 1):
+            size = max(1, int(rng.expovariate(1 / content_size)))
+            text = " ".join(rng.choice(words) for _ in range(size // 6 + 1))[:size]
+            rows.append({"id": i, "agent_id": agent_id, "content": text, "zep_uuid": None})
+        return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local mock of the Zep and Supabase APIs.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each Zep request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of Zep requests that fail with 503")
+    parser.add_argument("--rate-limit", type=float, default=None, help="Zep requests per second before 429s")
+    parser.add_argument("--supabase-latency", type=float, default=0.0, help="Seconds added to each PostgREST request")
+    parser.add_argument("--embeddings", type=int, default=0, help="Synthetic embeddings rows to seed")
+    parser.add_argument("--agent_id", default="agent-1", help="agent_id for seeded rows (default: agent-1)")
+    args = parser.parse_args()
+
+    server = MockServer(args.latency, args.error_rate, args.rate_limit, args.supabase_latency, args.port)
+    if args.embeddings:
+        server.seed_embeddings(args.embeddings, agent_id=args.agent_id)
+
+    print(f"Mock Zep + Supabase listening on {server.url}")
+    print("Point the scripts at it with:")
+    for key, value in server.environ().items():
+        print(f"  export {key}={value}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
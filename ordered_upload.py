@@ -0,0 +1,234 @@
+"""
+Concurrent upload of documents whose chunks must reach Zep in order.
+
+Zep builds its temporal graph from episodes in the order they arrive, so a
+document's chunks have to be sent one after another. Different documents
+don't depend on each other. upload_ordered runs three stages joined by
+bounded queues:
+
+    reader     a thread that groups the streamed rows into documents
+    formatter  builds each chunk's payload and drops already-uploaded chunks
+    uploaders  max_documents workers, each sending one document's chunks in order
+
+so up to max_documents documents are in progress at once, with at most
+max_requests add calls in flight between them. The queues hold a few
+documents each and the reader blocks when they are full, so memory stays
+flat however large the table is. Each finished document is logged with its
+counts and time.
+
+When a stage fails it records the error and sets stop: the reader stops at
+the next document and queued documents are skipped, but add calls already in
+flight finish and are journaled before the first error is raised, so a rerun
+doesn't upload them twice.
+
+Usage:
+    stats = asyncio.run(upload_ordered(
+        rows, key=lambda row: row["batch_name"], format_chunk=format_content_with_metadata,
+        source=lambda row: f"table:{row['id']}", group_id=group_id, completed=completed, journal=journal
+    ))
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import httpx
+from itertools import groupby
+from zep_cloud.client import AsyncZep
+from config import ZEP_TIMEOUT_SECONDS, UPLOAD_MAX_DOCUMENTS, UPLOAD_MAX_REQUESTS, UPLOAD_QUEUE_DOCUMENTS
+from rate_limiter import RateLimiter
+from ingest_journal import stable_hash
+from search_cache import note_group_write
+from metrics import METRICS
+from logging_setup import Progress
+
+log = logging.getLogger("ordered_upload")
+
+def read_documents(rows, key, documents, loop, stop):
+    """
+    Reader stage: group rows by key and queue each document's chunks.
+
+    Runs in a thread. Rows must arrive ordered by key, then chunk order, so
+    each document is contiguous and already in order. Blocks while the queue
+    is full, so reading never runs more than a few documents ahead.
+    """
+    for name, chunks in groupby(rows, key=key):
+        if stop.is_set():
+            return
+        asyncio.run_coroutine_threadsafe(documents.put((name, list(chunks))), loop).result()
+
+def format_document(name, chunks, format_chunk, completed, stats, progress, label):
+    """Build one document's (chunk, payload, hash) episodes, dropping chunks that are already uploaded"""
+    stats["chunks"] += len(chunks)
+    stats["documents"] += 1
+    episodes = []
+    skipped = 0
+    for chunk in chunks:
+        if not chunk.get('content'):
+            log.warning("Empty content in chunk %s of %s %s", chunk.get('chunk_number'), label, name)
+            continue
+
+        with METRICS.stage("format"):
+            formatted_content = format_chunk(chunk)
+            chunk_hash = stable_hash(formatted_content)
+        if chunk_hash in completed:
+            skipped += 1
+            stats["skipped_bytes"] += len(formatted_content.encode("utf-8"))
+            METRICS.count("chunks_skipped")
+            progress.update()
+            continue
+        episodes.append((chunk, formatted_content, chunk_hash))
+    stats["skipped"] += skipped
+    return episodes, skipped
+
+async def format_documents(documents, uploads, format_chunk, completed, stats, progress, label, stop, errors):
+    """Formatting stage: format each document; after a failure, keep draining without formatting"""
+    while (item := await documents.get()) is not None:
+        if stop.is_set():
+            continue
+        name, chunks = item
+        try:
+            episodes, skipped = format_document(name, chunks, format_chunk, completed, stats, progress, label)
+        except Exception as e:
+            log.error("Error formatting %s %s: %s", label, name, e)
+            errors.append(e)
+            stop.set()
+            continue
+        if episodes:
+            await uploads.put((name, episodes, skipped))
+        elif skipped:
+            log.debug("%s %s unchanged, all %d chunks skipped", label.capitalize(), name, skipped)
+
+async def upload_documents(client, limiter, requests, journal, group_id, uploads, source, stats, progress, label,
+                           stop, errors):
+    """
+    Upload stage: send one document's chunks at a time, in order.
+
+    After a failure anywhere, the current add finishes and is journaled, the
+    rest of the document and any queued documents are skipped, and the queue
+    is drained up to this worker's sentinel.
+    """
+    while (item := await uploads.get()) is not None:
+        if stop.is_set():
+            continue
+        name, episodes, skipped = item
+        log.debug("Processing %s: %s", label, name)
+        started = time.perf_counter()
+        uploaded = 0
+        for i, (chunk, formatted_content, chunk_hash) in enumerate(episodes, 1):
+            if stop.is_set():
+                break
+            try:
+                async with requests:
+                    with METRICS.stage("zep_add"):
+                        response = await limiter.call_async(
+                            client.graph.add,
+                            group_id=group_id,
+                            data=formatted_content,
+                            type="text"
+                        )
+                if METRICS.enabled:
+                    METRICS.count("episodes")
+                    METRICS.count("bytes", len(formatted_content.encode("utf-8")))
+                journal.record(group_id, chunk_hash, source(chunk), response.uuid_)
+                note_group_write(group_id)
+                uploaded += 1
+                log.debug("Chunk %d/%d from %s added to group '%s' (%d characters)",
+                          i, len(episodes), name, group_id, len(formatted_content))
+                progress.update()
+
+            except Exception as e:
+                log.error("Error processing chunk %d/%d from %s %s: %s", i, len(episodes), label, name, e)
+                log.error("Failed chunk details: ID=%s, chunk_number=%s", chunk.get('id'), chunk.get('chunk_number'))
+                errors.append(e)
+                stop.set()
+                break
+
+        stats["uploaded"] += uploaded
+        if uploaded < len(episodes):
+            log.warning("Stopped %s %s after %d of %d chunks", label, name, uploaded, len(episodes))
+            continue
+        elapsed = time.perf_counter() - started
+        METRICS.observe("document_upload", elapsed)
+        log.info("Finished %s %s: %d chunks uploaded, %d unchanged skipped in %.1fs",
+                 label, name, len(episodes), skipped, elapsed)
+
+async def upload_ordered(rows, key, format_chunk, source, group_id, completed, journal,
+                         max_documents=UPLOAD_MAX_DOCUMENTS, max_requests=UPLOAD_MAX_REQUESTS,
+                         queue_documents=UPLOAD_QUEUE_DOCUMENTS, limiter=None, label="document"):
+    """
+    Upload rows grouped into documents, several documents at a time, each in order.
+
+    Args:
+        rows: Iterable of chunk rows, ordered by key and then by chunk order
+        key: Function giving a row's document name
+        format_chunk: Function building a row's episode payload
+        source: Function giving a row's source for the ingest journal
+        group_id: Zep group to add the episodes to
+        completed: Hashes already uploaded; matching chunks are skipped
+        journal: IngestJournal recording each uploaded chunk
+        max_documents: Documents in progress at once
+        max_requests: Add calls in flight at once, across all documents
+        queue_documents: Documents buffered between stages
+        limiter: RateLimiter shared by every request
+        label: What a document is called in log messages
+
+    Returns a dict of chunks, documents, uploaded, skipped and skipped_bytes.
+    If a stage fails, raises its first error once in-flight adds are journaled.
+    """
+    limiter = limiter or RateLimiter()
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    errors = []
+    documents = asyncio.Queue(maxsize=queue_documents)
+    uploads = asyncio.Queue(maxsize=queue_documents)
+    requests = asyncio.Semaphore(max_requests)
+    stats = {"chunks": 0, "documents": 0, "uploaded": 0, "skipped": 0, "skipped_bytes": 0}
+    progress = Progress(log, "Chunks processed")
+    limits = httpx.Limits(max_connections=max_requests, max_keepalive_connections=max_requests)
+
+    async with httpx.AsyncClient(
+        timeout=ZEP_TIMEOUT_SECONDS, limits=limits, event_hooks=limiter.async_event_hooks()
+    ) as httpx_client:
+        client = AsyncZep(api_key=os.getenv('ZEP_API_KEY'), timeout=ZEP_TIMEOUT_SECONDS, httpx_client=httpx_client)
+
+        async def reader():
+            try:
+                await asyncio.to_thread(read_documents, rows, key, documents, loop, stop)
+            except Exception as e:
+                log.error("Error reading %ss: %s", label, e)
+                errors.append(e)
+                stop.set()
+            await documents.put(None)
+
+        async def formatter():
+            await format_documents(documents, uploads, format_chunk, completed, stats, progress, label, stop, errors)
+            for _ in range(max_documents):
+                await uploads.put(None)
+
+        tasks = [asyncio.create_task(reader()), asyncio.create_task(formatter())]
+        tasks += [
+            asyncio.create_task(upload_documents(
+                client, limiter, requests, journal, group_id, uploads, source, stats, progress, label, stop, errors
+            ))
+            for _ in range(max_documents)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Cancelled or interrupted (stage errors don't get here). Stop the
+            # reader thread: it checks stop between documents, and draining
+            # the queue releases it if it is waiting to put one
+            stop.set()
+            for task in tasks:
+                task.cancel()
+            while not documents.empty():
+                documents.get_nowait()
+            raise
+
+    if errors:
+        raise errors[0]
+    if stats["chunks"]:
+        progress.done()
+    return stats
@@ -0,0 +1,209 @@
+"""
+Adaptive token-bucket rate limiter shared by the scripts that write to Zep.
+
+Every graph.add / graph.add_batch call goes through RateLimiter.call (or
+call_async), which waits for a token before sending. A 429/503 response halves
+the send rate and is retried after any Retry-After delay the server asked for;
+each success nudges the rate back up towards the configured maximum. This keeps
+long ingests running close to the allowed rate instead of failing on the first
+throttle or backing off blindly.
+"""
+
+import asyncio
+import email.utils
+import logging
+import threading
+import time
+import httpx
+from zep_cloud.client import Zep
+from zep_cloud.core.api_error import ApiError
+from metrics import METRICS
+from config import (
+    ZEP_TIMEOUT_SECONDS,
+    ZEP_MAX_REQUESTS_PER_SECOND,
+    ZEP_MIN_REQUESTS_PER_SECOND,
+    ZEP_MAX_THROTTLE_RETRIES,
+    ZEP_MAX_RETRY_AFTER_SECONDS,
+)
+
+log = logging.getLogger("rate_limiter")
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+def parse_retry_after(headers):
+    """Return the delay in seconds requested by Retry-After / Retry-After-Ms, or None"""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(float(retry_after_ms) / 1000, 0.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+
+    # Retry-After may also be an HTTP date
+    retry_date = email.utils.parsedate_tz(retry_after)
+    if retry_date is None:
+        return None
+    return max(email.utils.mktime_tz(retry_date) - time.time(), 0.0)
+
+class NoRetryRequestOptions(dict):
+    """
+    Request options that switch off the SDK's built-in retries.
+
+    zep_cloud.client patches every request to retry with its own backoff unless the
+    request options carry a max_retries *attribute*, so a plain {"max_retries": 0}
+    dict would be overridden.
+    """
+
+    max_retries = 0
+
+    def __init__(self):
+        super().__init__(max_retries=0)
+
+def is_throttle_error(error):
+    """True if the error is a Zep API error caused by rate limiting or overload"""
+    return isinstance(error, ApiError) and error.status_code in THROTTLE_STATUS_CODES
+
+class RateLimiter:
+    """
+    Token bucket whose refill rate adapts to throttling responses (AIMD).
+
+    Args:
+        max_rate: Highest send rate in requests per second (also the starting rate)
+        min_rate: Lowest rate the limiter will back off to
+        burst: Number of requests that may be sent back to back
+        increase: Requests per second added to the rate after each success
+        decrease: Factor applied to the rate after a throttling response
+        max_retries: Throttled attempts to retry before giving up
+    """
+
+    def __init__(self, max_rate=ZEP_MAX_REQUESTS_PER_SECOND, min_rate=ZEP_MIN_REQUESTS_PER_SECOND,
+                 burst=1, increase=0.1, decrease=0.5, max_retries=ZEP_MAX_THROTTLE_RETRIES):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.max_retries = max_retries
+
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.resume_at = 0.0  # Set from Retry-After; nothing is sent before this
+        self.last_decrease_at = 0.0
+        self.lock = threading.Lock()
+
+        self.requests = 0
+        self.throttled = 0
+
+    def _reserve(self):
+        """Take a token and return how long the caller must wait before sending"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            # A negative balance queues the caller behind earlier reservations
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.requests += 1
+            return max(wait, self.resume_at - now)
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a request may be sent"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Additively raise the rate after a successful request"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        """Multiplicatively lower the rate after a throttling response"""
+        with self.lock:
+            now = time.monotonic()
+            self.throttled += 1
+            METRICS.count("retries")
+            # Concurrent requests rejected by the same overload only count once
+            if now - self.last_decrease_at >= 1 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self.last_decrease_at = now
+            self.tokens = min(self.tokens, 0.0)
+
+    def pause(self, seconds):
+        """Hold back every request for the given number of seconds"""
+        with self.lock:
+            seconds = min(seconds, ZEP_MAX_RETRY_AFTER_SECONDS)
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def observe_response(self, response):
+        """httpx response hook: pick up Retry-After from throttling responses"""
+        if response.status_code in THROTTLE_STATUS_CODES:
+            retry_after = parse_retry_after(response.headers)
+            if retry_after is not None:
+                self.pause(retry_after)
+
+    async def observe_response_async(self, response):
+        """Async variant of observe_response for httpx.AsyncClient"""
+        self.observe_response(response)
+
+    def event_hooks(self):
+        return {"response": [self.observe_response]}
+
+    def async_event_hooks(self):
+        return {"response": [self.observe_response_async]}
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call a Zep SDK method under the rate limit, retrying throttled attempts.
+
+        The SDK's own retries are disabled so that backoff is decided here.
+        """
+        kwargs.setdefault("request_options", NoRetryRequestOptions())
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except ApiError as e:
+                if not is_throttle_error(e) or attempt == self.max_retries:
+                    raise
+                self.on_throttle()
+                log.warning("Throttled by Zep (status %s), retrying at %.2f req/s", e.status_code, self.rate)
+                continue
+            self.on_success()
+            return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """Async variant of call for AsyncZep methods"""
+        kwargs.setdefault("request_options", NoRetryRequestOptions())
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async()
+            try:
+                result = await func(*args, **kwargs)
+            except ApiError as e:
+                if not is_throttle_error(e) or attempt == self.max_retries:
+                    raise
+                self.on_throttle()
+                log.warning("Throttled by Zep (status %s), retrying at %.2f req/s", e.status_code, self.rate)
+                continue
+            self.on_success()
+            return result
+
+def create_zep_client(api_key, limiter, base_url=None):
+    """Create a Zep client whose responses feed Retry-After into the limiter"""
+    httpx_client = httpx.Client(timeout=ZEP_TIMEOUT_SECONDS, event_hooks=limiter.event_hooks())
+    return Zep(api_key=api_key, base_url=base_url, timeout=ZEP_TIMEOUT_SECONDS, httpx_client=httpx_client)
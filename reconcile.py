@@ -0,0 +1,260 @@
+"""
+Reconcile embeddings.zep_uuid in Supabase against the episodes of a Zep group.
+
+Finds two kinds of drift left by partial failures and resets:
+
+- missing: rows whose zep_uuid (a UUID, or a JSON array for split rows) names
+  an episode that is not in the group
+- orphans: episodes in the group that no row of the agent refers to
+
+The Zep side is reduced to a set of 16-byte UUID keys (the API returns the
+group in one response, which is dropped once the keys are taken); the
+Supabase side is then streamed with keyset pagination and probed against that
+set, so rows are never held. A row
+with any missing part counts as not uploaded, so its surviving parts are
+reported as orphans too.
+
+With --fix, missing rows get zep_uuid cleared in bulk (supa_zep_add.py will
+re-upload them) and, with --delete-orphans, orphan episodes are deleted
+concurrently. The surviving parts of a partly missing row are deleted before
+its zep_uuid is cleared, even without --delete-orphans, so the re-upload
+doesn't leave duplicates; if one can't be deleted the row is left for the
+next run. Only use --delete-orphans when the group belongs to this agent
+alone.
+
+Exits 1 while drift remains: always without --fix, and with --fix when
+orphans are left (no --delete-orphans) or a delete failed.
+
+Usage:
+    python3 reconcile.py agent-1 --group_id supa_zep_poc --report drift.jsonl
+    python3 reconcile.py agent-1 --group_id supa_zep_poc --fix --delete-orphans
+"""
+
+import os
+import sys
+import json
+import uuid
+import argparse
+import logging
+from dotenv import load_dotenv
+from supabase import create_client
+from rate_limiter import RateLimiter, create_zep_client
+from supabase_reader import iter_rows
+from supabase_writer import ZepUuidWriter
+from zep_episodes import group_exists, iter_episode_pages, parse_zep_uuid_value, delete_episodes
+from logging_setup import Progress, add_logging_arguments, setup_logging
+
+# Load environment variables from .env file
+load_dotenv()
+
+log = logging.getLogger("reconcile")
+
+TABLE_NAME = "embeddings"
+
+def get_supabase_client():
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    return create_client(url, key)
+
+def get_zep_client(limiter):
+    api_key = os.getenv("ZEP_API_KEY")
+    return create_zep_client(api_key, limiter)
+
+def uuid_key(value):
+    """Compact set key for a UUID string; raises ValueError if malformed"""
+    return uuid.UUID(value).bytes
+
+class Report:
+    """Writes one JSON object per finding, or nothing if path is None"""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8") if path else None
+
+    def write(self, kind, **fields):
+        if self.file:
+            self.file.write(json.dumps({"kind": kind, **fields}) + "\n")
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+def load_episode_keys(zep, group_id):
+    """The group's episode UUIDs as a set of 16-byte keys"""
+    keys = set()
+    progress = Progress(log, "Zep episodes listed", every=50000)
+    for page in iter_episode_pages(zep, group_id):
+        for episode in page:
+            keys.add(uuid_key(episode.uuid_))
+        progress.update(len(page))
+    progress.done()
+    return keys
+
+def reconcile(supabase, zep, agent_id, group_id, report, writer=None):
+    """
+    Diff the agent's rows against the group's episodes.
+
+    Returns (stats, orphan_keys, partial). If writer is given, rows with
+    missing episodes are queued on it to have zep_uuid cleared, except rows
+    with surviving episodes: those are returned in partial as
+    (row_id, surviving_keys), to be cleared once the survivors are deleted.
+    """
+    unclaimed = load_episode_keys(zep, group_id)
+    claimed = set()
+    partial = []
+    stats = {
+        "episodes": len(unclaimed), "rows": 0, "rows_ok": 0, "rows_missing": 0,
+        "missing_refs": 0, "malformed": 0, "shared_refs": 0, "orphans": 0,
+    }
+
+    rows = iter_rows(
+        supabase, TABLE_NAME, "id, zep_uuid",
+        filters=lambda query: query.eq("agent_id", agent_id).not_.is_("zep_uuid", None)
+    )
+    progress = Progress(log, "Supabase rows checked", every=50000)
+    for row in rows:
+        stats["rows"] += 1
+        progress.update()
+        try:
+            keys = [uuid_key(u) for u in parse_zep_uuid_value(row["zep_uuid"])]
+        except ValueError:
+            stats["malformed"] += 1
+            report.write("malformed", row_id=row["id"], zep_uuid=row["zep_uuid"])
+            if writer:
+                writer.add(row["id"], None)
+            continue
+
+        missing = [k for k in keys if k not in unclaimed and k not in claimed]
+        if missing:
+            stats["rows_missing"] += 1
+            stats["missing_refs"] += len(missing)
+            report.write(
+                "missing", row_id=row["id"], zep_uuid=row["zep_uuid"],
+                missing=[str(uuid.UUID(bytes=k)) for k in missing]
+            )
+            if writer:
+                survivors = [k for k in keys if k in unclaimed]
+                if survivors:
+                    partial.append((row["id"], survivors))
+                else:
+                    writer.add(row["id"], None)
+            continue
+
+        for key in keys:
+            if key in claimed:
+                stats["shared_refs"] += 1
+                report.write("shared", row_id=row["id"], episode_uuid=str(uuid.UUID(bytes=key)))
+            else:
+                unclaimed.discard(key)
+                claimed.add(key)
+        stats["rows_ok"] += 1
+    progress.done()
+
+    stats["orphans"] = len(unclaimed)
+    for key in unclaimed:
+        report.write("orphan", episode_uuid=str(uuid.UUID(bytes=key)))
+    return stats, unclaimed, partial
+
+def clear_partial_rows(writer, partial, orphans, concurrency, limiter):
+    """
+    Delete the surviving episodes of partly missing rows, then clear those rows.
+
+    Survivors another row has since claimed are kept. A row whose survivors
+    could not all be deleted keeps its zep_uuid. Deleted keys are removed
+    from orphans. Returns the number of rows left uncleared.
+    """
+    stale = {k for _, survivors in partial for k in survivors if k in orphans}
+    failed = set()
+    if stale:
+        log.info("Deleting %d surviving episodes of %d partly missing rows...", len(stale), len(partial))
+
+        def on_result(episode_uuid, error):
+            if error is not None:
+                failed.add(uuid_key(episode_uuid))
+
+        result = delete_episodes(
+            os.getenv("ZEP_API_KEY"), (str(uuid.UUID(bytes=k)) for k in stale), concurrency, limiter, on_result
+        )
+        log.info("Deleted %d surviving episodes (%d already gone, %d failed)",
+                 result["deleted"], result["not_found"], result["failed"])
+        orphans -= stale - failed
+
+    kept = 0
+    for row_id, survivors in partial:
+        if failed.isdisjoint(survivors):
+            writer.add(row_id, None)
+        else:
+            kept += 1
+    return kept
+
+def main(agent_id, group_id, report_path=None, fix=False, delete_orphans=False, concurrency=8):
+    supabase = get_supabase_client()
+    limiter = RateLimiter()
+    zep = get_zep_client(limiter)
+
+    if not group_exists(zep, group_id):
+        log.error("Group does not exist: %s", group_id)
+        return False
+
+    report = Report(report_path)
+    kept = 0
+    try:
+        if fix:
+            with ZepUuidWriter(supabase, TABLE_NAME) as writer:
+                stats, orphans, partial = reconcile(supabase, zep, agent_id, group_id, report, writer)
+                kept = clear_partial_rows(writer, partial, orphans, concurrency, limiter)
+        else:
+            stats, orphans, _ = reconcile(supabase, zep, agent_id, group_id, report)
+    finally:
+        report.close()
+
+    log.info("=== RECONCILE %s <-> %s ===", agent_id, group_id)
+    log.info("Zep episodes: %d", stats["episodes"])
+    log.info("Rows with zep_uuid: %d (%d ok)", stats["rows"], stats["rows_ok"])
+    log.info("Rows referring to missing episodes: %d (%d missing UUIDs)", stats["rows_missing"], stats["missing_refs"])
+    log.info("Rows with malformed zep_uuid: %d", stats["malformed"])
+    log.info("Episodes referred to by more than one row: %d", stats["shared_refs"])
+    log.info("Orphan episodes: %d", stats["orphans"])
+    if report_path:
+        log.info("Findings written to %s", report_path)
+
+    if fix:
+        log.info("Cleared zep_uuid on %d rows so they will be re-uploaded", stats["rows_missing"] + stats["malformed"] - kept)
+        if kept:
+            log.warning("Left zep_uuid on %d rows whose surviving episodes could not be deleted", kept)
+    if fix and delete_orphans and orphans:
+        log.info("Deleting %d orphan episodes with %d concurrent requests...", len(orphans), concurrency)
+        result = delete_episodes(
+            os.getenv("ZEP_API_KEY"), (str(uuid.UUID(bytes=k)) for k in orphans), concurrency, limiter
+        )
+        log.info("Deleted %d orphan episodes (%d already gone, %d failed)",
+                 result["deleted"], result["not_found"], result["failed"])
+        if result["failed"]:
+            return False
+
+    if not fix:
+        return not (stats["rows_missing"] + stats["malformed"] + stats["orphans"])
+    if kept:
+        return False
+    if orphans and not delete_orphans:
+        log.warning("%d orphan episodes remain; rerun with --delete-orphans to remove them", len(orphans))
+        return False
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff Supabase zep_uuid values against the episodes of a Zep group.")
+    parser.add_argument("agent_id", help="The agent_id whose rows to check")
+    parser.add_argument("--group_id", default="supa_zep_poc", help="The Zep group the rows were uploaded to (default: supa_zep_poc)")
+    parser.add_argument("--report", help="Write every finding to this JSONL file")
+    parser.add_argument("--fix", action="store_true", help="Clear zep_uuid on rows whose episodes are missing")
+    parser.add_argument("--delete-orphans", action="store_true", help="With --fix, also delete episodes no row refers to")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent deletes with --delete-orphans (default: 8)")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(args.log_format, args.log_level)
+
+    if args.delete_orphans and not args.fix:
+        parser.error("--delete-orphans requires --fix")
+
+    # Exit 1 when drift was found and not fixed, so the check can gate a pipeline
+    if not main(args.agent_id, args.group_id, args.report, args.fix, args.delete_orphans, args.concurrency):
+        sys.exit(1)
@@ -1,58 +1,94 @@
 import os
 import argparse
+import logging
+from itertools import islice
 from dotenv import load_dotenv
 from supabase import create_client
+from config import SUPABASE_PAGE_SIZE
+from supabase_reader import iter_rows
+from supabase_writer import ZepUuidWriter
+from logging_setup import Progress, add_logging_arguments, setup_logging
 
 # 1. Load environment variables
 load_dotenv()
 
+log = logging.getLogger("reset_zep_uuids")
+
+TABLE_NAME = "embeddings"  # Change this to your table
+DEFAULT_LIMIT = 10  # Rows reset when neither --limit nor --all is given
+
 # 2. Connect to Supabase
 def get_supabase_client():
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     return create_client(url, key)
 
-def main(agent_id, reset_all=False):
-    # Table info
-    TABLE_NAME = "embeddings"  # Change this to your table
+def uploaded_rows(query, agent_id):
+    """Filter a query to the agent's rows that have a zep_uuid"""
+    return query.eq("agent_id", agent_id).not_.is_("zep_uuid", None)
+
+def count_uploaded_rows(supabase, agent_id):
+    """Count the agent's rows with a zep_uuid without transferring any rows (HEAD + count=exact)"""
+    response = uploaded_rows(
+        supabase.table(TABLE_NAME).select("id", count="exact", head=True), agent_id
+    ).execute()
+    return response.count or 0
+
+def reset_zep_uuids(supabase, agent_id, limit=None):
+    """
+    Clear zep_uuid on up to `limit` of the agent's rows (all of them if None).
+
+    Clearing every row is one server-side `UPDATE ... WHERE agent_id = ...
+    AND zep_uuid IS NOT NULL` with return=minimal, so no row ids cross the
+    wire. PostgREST can't limit an UPDATE, so with a limit only row ids are
+    read, page by page, and cleared as set-based `UPDATE ... WHERE id IN (...)`
+    batches. Returns the number of rows reset.
+    """
+    if limit is None:
+        response = uploaded_rows(
+            supabase.table(TABLE_NAME).update({"zep_uuid": None}, count="exact", returning="minimal"), agent_id
+        ).execute()
+        return response.count or 0
+
+    rows = islice(iter_rows(
+        supabase, TABLE_NAME, "id",
+        filters=lambda query: uploaded_rows(query, agent_id),
+        page_size=min(limit, SUPABASE_PAGE_SIZE)
+    ), limit)
+
+    reset = 0
+    progress = Progress(log, "Rows reset", total=limit, every=10000)
+    with ZepUuidWriter(supabase, TABLE_NAME) as writer:
+        for row in rows:
+            writer.add(row["id"], None)
+            reset += 1
+            progress.update()
+    if reset:
+        progress.done()
+    return reset
 
+def main(agent_id, reset_all=False, limit=DEFAULT_LIMIT):
     supabase = get_supabase_client()
 
-    # Fetch rows that have been uploaded (zep_uuid is not null)
-    query = (
-        supabase.table(TABLE_NAME)
-        .select("id, zep_uuid")
-        .eq("agent_id", agent_id)
-        .not_.is_("zep_uuid", None)
-    )
-    
-    # Apply limit if not resetting all
-    if not reset_all:
-        query = query.limit(10)
-    
-    response = query.execute()
-    rows = response.data
-
-    if not rows:
-        print(f"No rows with zep_uuid found for agent_id {agent_id}.")
+    total = count_uploaded_rows(supabase, agent_id)
+    if not total:
+        log.info("No rows with zep_uuid found for agent_id %s.", agent_id)
         return
 
-    print(f"Found {len(rows)} rows with zep_uuid for agent_id {agent_id}.")
-    
-    # Reset zep_uuid to null for these rows
-    for row in rows:
-        row_id = row["id"]
-        old_uuid = row["zep_uuid"]
-        
-        # Update the row in Supabase, setting zep_uuid to null
-        supabase.table(TABLE_NAME).update({"zep_uuid": None}).eq("id", row_id).execute()
-        print(f"Reset zep_uuid for row {row_id} (was: {old_uuid})")
+    to_reset = total if reset_all else min(limit, total)
+    log.info("Found %d rows with zep_uuid for agent_id %s; resetting %d.", total, agent_id, to_reset)
 
-    print(f"Reset zep_uuid for {len(rows)} rows.")
+    reset = reset_zep_uuids(supabase, agent_id, None if reset_all else limit)
+    log.info("Reset zep_uuid for %d rows.", reset)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Reset zep_uuid values for a specific agent_id.")
     parser.add_argument("agent_id", help="The agent_id to reset zep_uuid values for")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help=f"Number of rows to reset (default: {DEFAULT_LIMIT})")
     parser.add_argument("--all", action="store_true", help="Reset ALL zep_uuid values for this agent_id")
+    add_logging_arguments(parser)
     args = parser.parse_args()
-    main(args.agent_id, args.all)
+    if args.limit < 1:
+        parser.error("--limit must be at least 1")
+    setup_logging(args.log_format, args.log_level)
+    main(args.agent_id, args.all, args.limit)
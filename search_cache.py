@@ -0,0 +1,304 @@
+"""
+Opt-in local cache for graph.search results.
+
+Results are keyed on (group_id, query, limit, scope) and kept in two tiers:
+an in-memory LRU, which answers repeated lookups in microseconds, and an
+optional SQLite tier that survives between processes. Entries expire after a
+TTL.
+
+Every entry also records the version of its group at the time it was cached.
+The uploaders call note_group_write() whenever they add or delete episodes,
+which bumps the group's version in the same SQLite file, so any cached result
+for that group in any process stops being served. Deletes by UUID, where the
+group is unknown, bump a global version instead, which invalidates everything.
+
+Usage:
+    cache = SearchCache()
+    results = cached_search(client, cache, group_id, query, limit=10)
+    print(cache.stats())
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from zep_cloud.types import GraphSearchResults
+from config import (
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_INVALIDATE_SECONDS,
+)
+
+ALL_GROUPS = "*"  # Version row bumped when the affected group is unknown
+VERSION_CHECK_SECONDS = 0.1  # Group versions are re-read from SQLite at most this often
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS group_versions (
+            group_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS search_results (
+            cache_key TEXT PRIMARY KEY,
+            group_id TEXT NOT NULL,
+            group_version INTEGER NOT NULL,
+            global_version INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            results TEXT NOT NULL
+        )
+        """
+    )
+    conn.commit()
+    return conn
+
+def _bump(conn, group_id):
+    conn.execute(
+        "INSERT INTO group_versions VALUES (?, 1) "
+        "ON CONFLICT(group_id) DO UPDATE SET version = version + 1",
+        (group_id,)
+    )
+    conn.commit()
+
+class SearchCache:
+    """
+    Two-tier TTL cache of search results.
+
+    Args:
+        path: SQLite file holding group versions (and the on-disk tier), or
+            None for a cache that only sees invalidations from this process
+        ttl: Seconds a cached result stays valid
+        max_entries: Entries kept in the in-memory LRU
+        disk: Also keep results in the SQLite file, so they outlive the process
+        version_check: Seconds a group version read from SQLite is trusted;
+            writes from other processes are seen within this long
+    """
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL_SECONDS, max_entries=SEARCH_CACHE_MAX_ENTRIES,
+                 disk=True, version_check=VERSION_CHECK_SECONDS):
+        self.path = path
+        self.disk = bool(path) and disk
+        self.version_check = version_check
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = OrderedDict()  # key -> (expires_at, group_version, global_version, results)
+        self.versions = {}  # Used instead of SQLite when path is None
+        self.versions_read = {}  # group_id -> (monotonic time read, versions)
+        self.lock = threading.Lock()
+        self.conn = _connect(path) if path else None
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "invalidated": 0}
+
+    def _current_versions(self, group_id):
+        if self.conn is None:
+            return self.versions.get(group_id, 0), self.versions.get(ALL_GROUPS, 0)
+        now = time.monotonic()
+        read = self.versions_read.get(group_id)
+        if read is not None and now - read[0] < self.version_check:
+            return read[1]
+        rows = dict(self.conn.execute(
+            "SELECT group_id, version FROM group_versions WHERE group_id IN (?, ?)", (group_id, ALL_GROUPS)
+        ).fetchall())
+        versions = rows.get(group_id, 0), rows.get(ALL_GROUPS, 0)
+        self.versions_read[group_id] = (now, versions)
+        return versions
+
+    def current_versions(self, group_id):
+        """The (group, global) versions a result fetched now would be cached under"""
+        with self.lock:
+            return self._current_versions(group_id)
+
+    def get(self, group_id, query, limit=10, scope=None):
+        """Return cached GraphSearchResults, or None on a miss"""
+        key = (group_id, query, limit, scope)
+        now = time.time()
+        with self.lock:
+            versions = self._current_versions(group_id)
+            entry = self.memory.get(key)
+            if entry is not None:
+                stale = self._stale(entry, versions, now)
+                if not stale:
+                    self.memory.move_to_end(key)
+                    self.counts["memory_hits"] += 1
+                    return entry[3]
+                # The disk row was written with the same entry, so it is stale too
+                del self.memory[key]
+                self.counts[stale] += 1
+                self.counts["misses"] += 1
+                return None
+
+            if self.disk:
+                disk_key = json.dumps(key)
+                row = self.conn.execute(
+                    "SELECT expires_at, group_version, global_version, results FROM search_results WHERE cache_key = ?",
+                    (disk_key,)
+                ).fetchone()
+                if row is not None:
+                    stale = self._stale(row, versions, now)
+                    if not stale:
+                        results = GraphSearchResults.parse_obj(json.loads(row[3]))
+                        self._remember(key, (row[0], row[1], row[2], results))
+                        self.counts["disk_hits"] += 1
+                        return results
+                    self.counts[stale] += 1
+                    self.conn.execute("DELETE FROM search_results WHERE cache_key = ?", (disk_key,))
+                    self.conn.commit()
+
+            self.counts["misses"] += 1
+            return None
+
+    def put(self, group_id, query, limit, scope, results, versions=None):
+        """
+        Cache results for this lookup.
+
+        versions should be current_versions(group_id) read before the search
+        was sent: a write that lands during the search then leaves the entry
+        stale instead of hiding behind the version it bumped.
+        """
+        key = (group_id, query, limit, scope)
+        expires_at = time.time() + self.ttl
+        with self.lock:
+            group_version, global_version = versions or self._current_versions(group_id)
+            self._remember(key, (expires_at, group_version, global_version, results))
+            if self.disk:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO search_results VALUES (?, ?, ?, ?, ?, ?)",
+                    (json.dumps(key), group_id, group_version, global_version, expires_at,
+                     json.dumps(results.dict(), default=str))
+                )
+                self.conn.commit()
+
+    def invalidate(self, group_id=ALL_GROUPS):
+        """Drop cached results for a group (or for every group) in all processes sharing the file"""
+        with self.lock:
+            if self.conn is None:
+                self.versions[group_id] = self.versions.get(group_id, 0) + 1
+            else:
+                _bump(self.conn, group_id)
+                self.versions_read.clear()
+
+    def purge_expired(self):
+        """Delete expired rows from the on-disk tier"""
+        if not self.disk:
+            return 0
+        with self.lock:
+            deleted = self.conn.execute("DELETE FROM search_results WHERE expires_at <= ?", (time.time(),)).rowcount
+            self.conn.commit()
+            return deleted
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counts["memory_hits"] + self.counts["disk_hits"] + self.counts["misses"]
+            hits = lookups - self.counts["misses"]
+            return {
+                **self.counts,
+                "lookups": lookups,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+            }
+
+    def close(self):
+        if self.conn is not None:
+            with self.lock:
+                self.conn.close()
+
+    @staticmethod
+    def _stale(entry, versions, now):
+        """Why an entry can't be served ("expired" or "invalidated"), or None if it can"""
+        if entry[0] <= now:
+            return "expired"
+        if (entry[1], entry[2]) != versions:
+            return "invalidated"
+        return None
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+def cached_search(client, cache, group_id, query, limit=10, scope=None, limiter=None):
+    """client.graph.search through the cache; cache may be None, misses go through limiter.call if given"""
+    if cache is not None:
+        results = cache.get(group_id, query, limit, scope)
+        if results is not None:
+            return results
+        versions = cache.current_versions(group_id)
+    kwargs = {"scope": scope} if scope else {}
+    if limiter is not None:
+        results = limiter.call(client.graph.search, group_id=group_id, query=query, limit=limit, **kwargs)
+    else:
+        results = client.graph.search(group_id=group_id, query=query, limit=limit, **kwargs)
+    if cache is not None:
+        cache.put(group_id, query, limit, scope, results, versions)
+    return results
+
+async def cached_search_async(client, cache, group_id, query, limit=10, scope=None, limiter=None):
+    """AsyncZep version of cached_search; misses go through limiter.call_async if one is given"""
+    if cache is not None:
+        results = cache.get(group_id, query, limit, scope)
+        if results is not None:
+            return results
+        versions = cache.current_versions(group_id)
+    kwargs = {"scope": scope} if scope else {}
+    if limiter is not None:
+        results = await limiter.call_async(client.graph.search, group_id=group_id, query=query, limit=limit, **kwargs)
+    else:
+        results = await client.graph.search(group_id=group_id, query=query, limit=limit, **kwargs)
+    if cache is not None:
+        cache.put(group_id, query, limit, scope, results, versions)
+    return results
+
+_last_bumped = {}
+_trailing = {}  # group_id -> Timer for the bump at the end of its throttle window
+_bump_lock = threading.Lock()
+
+def _bump_file(path, group_id):
+    conn = _connect(path)
+    try:
+        _bump(conn, group_id)
+    finally:
+        conn.close()
+
+def _trailing_bump(group_id, path):
+    with _bump_lock:
+        _trailing.pop(group_id, None)
+        _last_bumped[group_id] = time.monotonic()
+        _bump_file(path, group_id)
+
+def note_group_write(group_id=ALL_GROUPS, force=False, path=SEARCH_CACHE_PATH):
+    """
+    Tell search caches that a group's episodes changed.
+
+    Called by the uploaders after each write. Bumps happen at most once per
+    SEARCH_CACHE_INVALIDATE_SECONDS per group: writes inside the window are
+    covered by one more bump when it ends, from a timer thread that also runs
+    if the uploader exits early. force=True bumps immediately. Nothing
+    happens unless a cache file exists, so uploads pay nothing when the cache
+    has never been used.
+    """
+    if not os.path.exists(path):
+        return
+    now = time.monotonic()
+    with _bump_lock:
+        wait = _last_bumped.get(group_id, float("-inf")) + SEARCH_CACHE_INVALIDATE_SECONDS - now
+        if not force and wait > 0:
+            if group_id not in _trailing:
+                timer = threading.Timer(wait, _trailing_bump, (group_id, path))
+                _trailing[group_id] = timer
+                timer.start()
+            return
+        timer = _trailing.pop(group_id, None)
+        if timer is not None:
+            timer.cancel()
+        _last_bumped[group_id] = now
+        _bump_file(path, group_id)
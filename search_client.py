@@ -0,0 +1,116 @@
+"""
+Thin client for search_server.py.
+
+Uses only the standard library (no zep_cloud import), so a lookup costs
+interpreter startup plus the search itself. SearchClient keeps one keep-alive
+connection open, so agents that import it pay no connection setup per query.
+
+Usage:
+    python3 search_client.py 'sleep training' --group_id demo_group --limit 5
+    python3 search_client.py 'sleep training' --socket /tmp/zep_search.sock --json
+    python3 search_client.py --health
+"""
+
+import sys
+import json
+import socket
+import argparse
+import http.client
+from config import DEFAULT_GROUP_ID, SEARCH_SERVER_HOST, SEARCH_SERVER_PORT, ZEP_TIMEOUT_SECONDS
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix socket"""
+
+    def __init__(self, socket_path, timeout=ZEP_TIMEOUT_SECONDS):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class SearchError(Exception):
+    """The server could not run the search"""
+
+class SearchClient:
+    """Keep-alive connection to a search server"""
+
+    def __init__(self, host=SEARCH_SERVER_HOST, port=SEARCH_SERVER_PORT, socket_path=None, timeout=ZEP_TIMEOUT_SECONDS):
+        if socket_path:
+            self.connection = UnixHTTPConnection(socket_path, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        # One retry on a fresh connection, in case the server closed an idle one
+        for attempt in range(2):
+            try:
+                self.connection.request(method, path, body=data, headers=headers)
+                response = self.connection.getresponse()
+                payload = json.loads(response.read() or b"{}")
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.connection.close()
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise SearchError(f"{response.status}: {payload.get('error')}")
+        return payload
+
+    def search(self, query, group_id=DEFAULT_GROUP_ID, limit=10, scope=None):
+        """Return the server's response: query, group_id, results and latency_ms"""
+        return self.request("POST", "/search", {"query": query, "group_id": group_id, "limit": limit, "scope": scope})
+
+    def health(self):
+        return self.request("GET", "/health")
+
+    def close(self):
+        self.connection.close()
+
+def print_results(response):
+    results = response["results"]
+    print(f"\nSearching for: '{response['query']}' in group '{response['group_id']}'...")
+    if not results:
+        print("No results found.")
+        return
+    print(f"\nFound {len(results)} results ({response['latency_ms']:.1f} ms):\n")
+    for i, result in enumerate(results, 1):
+        print(f"\nResult {i} ({result['type']}):")
+        print("-" * 40)
+        print(result["content"])
+        print("-" * 40)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search through a running search_server.py.")
+    parser.add_argument("query", nargs="?", help="The search query")
+    parser.add_argument("--group_id", default=DEFAULT_GROUP_ID, help=f"The group to search (default: {DEFAULT_GROUP_ID})")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum number of results (default: 10)")
+    parser.add_argument("--scope", choices=("edges", "nodes", "episodes"), help="Search scope (default: the API's)")
+    parser.add_argument("--host", default=SEARCH_SERVER_HOST, help=f"Server address (default: {SEARCH_SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SEARCH_SERVER_PORT, help=f"Server port (default: {SEARCH_SERVER_PORT})")
+    parser.add_argument("--socket", help="Connect to the server's Unix socket instead")
+    parser.add_argument("--json", action="store_true", help="Print the raw JSON response")
+    parser.add_argument("--health", action="store_true", help="Print the server's health and cache statistics")
+    args = parser.parse_args()
+
+    if not args.query and not args.health:
+        parser.error("give a query or --health")
+
+    client = SearchClient(args.host, args.port, args.socket)
+    try:
+        if args.health:
+            print(json.dumps(client.health(), indent=2))
+        else:
+            response = client.search(args.query, args.group_id, args.limit, args.scope)
+            if args.json:
+                print(json.dumps(response))
+            else:
+                print_results(response)
+    except (SearchError, OSError) as e:
+        print(f"Error during search: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        client.close()
@@ -1,10 +1,12 @@
 import os
 import sys
-import json
 from dotenv import load_dotenv
 from zep_cloud.client import Zep
 from datetime import datetime
 from config import ZEP_BASE_URL, DEFAULT_GROUP_ID
+from search_cache import SearchCache, cached_search
+from content_metadata import parse_metadata
+from envelope import decode_envelope
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,79 +25,9 @@ def format_timestamp(seconds):
         return "00:00:00"
 
 def extract_metadata(content):
-    """Extract metadata from content string"""
-    try:
-        # Find metadata section
-        if "[YOUTUBE_METADATA]" in content:
-            start = content.find("[YOUTUBE_METADATA]") + len("[YOUTUBE_METADATA]")
-            end = content.find("[CONTENT]", start)
-            if end > start:
-                metadata_str = content[start:end].strip()
-                try:
-                    metadata = json.loads(metadata_str)
-                    return "youtube", metadata
-                except json.JSONDecodeError:
-                    # Try to extract from content if JSON parsing fails
-                    if "youtube.com/watch?v=" in content:
-                        video_id = content.split("youtube.com/watch?v=")[1].split("&")[0]
-                        return "youtube", {
-                            "video_id": video_id,
-                            "title": "YouTube Video",
-                            "start_time": 0
-                        }
-        elif "[METADATA]" in content:
-            start = content.find("[METADATA]") + len("[METADATA]")
-            end = content.find("[CONTENT]", start)
-            if end > start:
-                metadata_str = content[start:end].strip()
-                try:
-                    metadata = json.loads(metadata_str)
-                    return "document", metadata
-                except json.JSONDecodeError:
-                    pass
-        
-        # Try to identify YouTube content without metadata section
-        if "youtube.com/watch?v=" in content:
-            video_id = content.split("youtube.com/watch?v=")[1].split("&")[0]
-            # Try to extract timestamp if available
-            start_time = 0
-            if "&t=" in content:
-                try:
-                    start_time = int(content.split("&t=")[1].split("&")[0])
-                except ValueError:
-                    pass
-            return "youtube", {
-                "video_id": video_id,
-                "title": "YouTube Video",
-                "start_time": start_time
-            }
-        
-        # Extract file path and title from content if available
-        file_path = None
-        for line in content.split('\n'):
-            if line.startswith("files/") or "/files/" in line:
-                file_path = line.strip()
-                break
-        
-        if file_path:
-            return "document", {
-                "file_path": file_path,
-                "title": os.path.basename(file_path),
-                "chunk_number": 0
-            }
-        
-        return "document", {
-            "file_path": "unknown",
-            "title": "",
-            "chunk_number": 0
-        }
-    except Exception as e:
-        print(f"Metadata extraction error: {str(e)}")
-        return "document", {
-            "file_path": "unknown",
-            "title": "",
-            "chunk_number": 0
-        }
+    """Extract (source type, metadata dict) from content string"""
+    metadata = parse_metadata(content)
+    return metadata.source_type, metadata.as_dict()
 
 def parse_timestamp(timestamp_str):
     """Convert HH:MM:SS to seconds"""
@@ -133,6 +65,14 @@ def format_youtube_result(content, metadata):
 def format_document_result(content):
     """Format a document result for display."""
     
+    # Envelopes and [*METADATA] headers carry their metadata separately from the text
+    envelope = decode_envelope(content)
+    if envelope is not None and isinstance(envelope.metadata, dict):
+        if envelope.kind == "youtube":
+            return format_youtube_result(envelope.body, envelope.metadata)
+        title = envelope.metadata.get("title")
+        return f"📄 {title}\n{envelope.body}" if title else f"📄 Content: {envelope.body}"
+    
     # Check if this is a YouTube video URL node
     if content.startswith("YOUTUBE_VIDEO_URL"):
         lines = content.split('\n')
@@ -158,37 +98,53 @@ def format_document_result(content):
     # For regular content, just return as is
     return f"📄 Content: {content}"
 
-def search_documents(query, limit=5):
-    """Search for documents in the graph."""
+def iter_result_contents(results):
+    """Yield the text of every edge (fact), node (summary) and episode (content) in search results"""
+    for edge in results.edges or []:
+        yield edge.fact
+    for node in results.nodes or []:
+        yield node.summary
+    for episode in results.episodes or []:
+        yield episode.content
+
+def result_records(results):
+    """Flatten search results into JSON-ready dicts: type, uuid, content and score"""
+    records = []
+    for kind, items, field in (("edge", results.edges, "fact"), ("node", results.nodes, "summary"), ("episode", results.episodes, "content")):
+        for item in items or []:
+            records.append({"type": kind, "uuid": item.uuid_, "content": getattr(item, field), "score": item.score})
+    return records
+
+def search_documents(query, limit=5, group_id=DEFAULT_GROUP_ID, scope=None, cache=None):
+    """
+    Search for documents in the graph.
+
+    Pass a SearchCache as cache to answer repeated searches locally.
+    """
     api_key = os.getenv('ZEP_API_KEY')
     if not api_key:
         print("Error: ZEP_API_KEY not found in environment variables")
         sys.exit(1)
 
-    client = Zep(
-        api_key=api_key,
-        api_url=ZEP_API_URL
-    )
+    # The SDK reads ZEP_API_URL from the environment when it is set
+    client = Zep(api_key=api_key)
     
-    print(f"\nSearching for: '{query}' in group '{DEFAULT_GROUP_ID}'...")
+    print(f"\nSearching for: '{query}' in group '{group_id}'...")
     
     try:
-        results = client.graph.search(
-            group_id=DEFAULT_GROUP_ID,
-            query=query,
-            limit=limit
-        )
+        results = cached_search(client, cache, group_id, query, limit, scope)
+        contents = [content for content in iter_result_contents(results) if content]
         
-        if not results:
+        if not contents:
             print("No results found.")
             return
             
-        print(f"\nFound {len(results)} results:\n")
+        print(f"\nFound {len(contents)} results:\n")
         
-        for i, result in enumerate(results, 1):
+        for i, content in enumerate(contents, 1):
             print(f"\nResult {i}:")
             print("-" * 40)
-            print(format_document_result(result.content))
+            print(format_document_result(content))
             print("-" * 40)
             
     except Exception as e:
@@ -197,13 +153,17 @@ def search_documents(query, limit=5):
 
 if __name__ == "__main__":
     # Get search query from command line arguments
-    if len(sys.argv) < 2:
-        print("Usage: python3 search_graph.py 'your search query' [limit]")
-        print("Example: python3 search_graph.py 'sleep training' 5")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        print("Usage: python3 search_graph.py 'your search query' [limit] [--cache]")
+        print("Example: python3 search_graph.py 'sleep training' 5 --cache")
         sys.exit(1)
     
     # Get query and optional limit
-    query = sys.argv[1]
-    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    query = args[0]
+    limit = int(args[1]) if len(args) > 1 else 5
+    cache = SearchCache() if "--cache" in sys.argv else None
     
-    search_documents(query, limit) 
\ No newline at end of file
+    search_documents(query, limit, cache=cache)
+    if cache:
+        print(f"\nCache: {cache.stats()}")
@@ -3,11 +3,12 @@ import sys
 import json
 from dotenv import load_dotenv
 from zep_cloud.client import Zep
+from search_cache import SearchCache, cached_search
 
 # Load environment variables from .env file
 load_dotenv()
 
-def search_zep_group(group_id, query, limit=10, detailed=False):
+def search_zep_group(group_id, query, limit=10, detailed=False, cache=None):
     """
     Search for content in a specific Zep group.
     
@@ -16,6 +17,7 @@ def search_zep_group(group_id, query, limit=10, detailed=False):
         query: The search query string
         limit: Maximum number of results to return
         detailed: Whether to show detailed output
+        cache: Optional SearchCache to answer repeated searches locally
     """
     # Get API key from environment variables
     api_key = os.getenv('ZEP_API_KEY')
@@ -35,11 +37,7 @@ def search_zep_group(group_id, query, limit=10, detailed=False):
         client = Zep(api_key=api_key)
         
         # Perform search
-        results = client.graph.search(
-            group_id=group_id,
-            query=query,
-            limit=limit
-        )
+        results = cached_search(client, cache, group_id, query, limit)
         
         # Print results
         print(f"Search Results: {results}")
@@ -77,8 +75,8 @@ def search_zep_group(group_id, query, limit=10, detailed=False):
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python search_group.py <group_id> <search_query> [result_limit] [--detailed]")
-        print("Example: python search_group.py test_group_123 'important information' 20 --detailed")
+        print("Usage: python search_group.py <group_id> <search_query> [result_limit] [--detailed] [--cache]")
+        print("Example: python search_group.py test_group_123 'important information' 20 --detailed --cache")
         sys.exit(1)
     
     group_id = sys.argv[1]
@@ -86,5 +84,9 @@ if __name__ == "__main__":
     
     limit = int(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[3].isdigit() else 10
     detailed = "--detailed" in sys.argv
+    cache = SearchCache() if "--cache" in sys.argv else None
     
-    search_zep_group(group_id, query, limit, detailed) 
\ No newline at end of file
+    search_zep_group(group_id, query, limit, detailed, cache)
+    if cache:
+        print(f"\nCache: {cache.stats()}")
+ 
\ No newline at end of file
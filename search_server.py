@@ -0,0 +1,224 @@
+"""
+Resident search server.
+
+Starting a Python process per search pays for load_dotenv, importing
+zep_cloud, building a client and a cold TLS connection before the search is
+even sent. This server does all of that once and keeps a pool of warm
+keep-alive connections to Zep, so each lookup only pays the search itself.
+search_client.py is the matching thin client; it imports nothing from
+zep_cloud.
+
+Listens on a local TCP port, or on a Unix socket with --socket. With --cache,
+results are answered from the search cache (in memory, plus on disk with
+--disk-cache), which the uploaders invalidate when they write to a group.
+
+API (JSON over HTTP/1.1 keep-alive):
+    POST /search  {"query": ..., "group_id": ..., "limit": 10, "scope": "edges"}
+                  -> {"query", "group_id", "results": [{"type", "uuid", "content", "score"}], "latency_ms"}
+    GET  /health  -> {"status": "ok", "uptime_s", "searches", "failed", "cache"}
+
+Usage:
+    python3 search_server.py --cache
+    python3 search_server.py --socket /tmp/zep_search.sock --cache
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import logging
+import threading
+import httpx
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from dotenv import load_dotenv
+from zep_cloud.client import Zep
+from zep_cloud.core.api_error import ApiError
+from config import (
+    DEFAULT_GROUP_ID,
+    ZEP_TIMEOUT_SECONDS,
+    SEARCH_MAX_REQUESTS_PER_SECOND,
+    SEARCH_SERVER_HOST,
+    SEARCH_SERVER_PORT,
+    SEARCH_SERVER_POOL_SIZE,
+    SEARCH_SERVER_KEEPALIVE_SECONDS,
+)
+from rate_limiter import RateLimiter
+from search_cache import SearchCache, cached_search
+from search_graph import result_records
+from logging_setup import add_logging_arguments, setup_logging
+
+# Load environment variables from .env file
+load_dotenv()
+
+log = logging.getLogger("search_server")
+
+MAX_REQUEST_BYTES = 64 * 1024
+
+class SearchService:
+    """One warm Zep client, rate limiter and optional cache shared by every request"""
+
+    def __init__(self, api_key, cache=None, max_rate=SEARCH_MAX_REQUESTS_PER_SECOND, pool_size=SEARCH_SERVER_POOL_SIZE):
+        self.limiter = RateLimiter(max_rate=max_rate)
+        limits = httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size,
+            keepalive_expiry=SEARCH_SERVER_KEEPALIVE_SECONDS
+        )
+        self.httpx_client = httpx.Client(timeout=ZEP_TIMEOUT_SECONDS, limits=limits, event_hooks=self.limiter.event_hooks())
+        self.client = Zep(api_key=api_key, timeout=ZEP_TIMEOUT_SECONDS, httpx_client=self.httpx_client)
+        self.cache = cache
+        self.started_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.searches = 0
+        self.failed = 0
+
+    def search(self, query, group_id=DEFAULT_GROUP_ID, limit=10, scope=None):
+        started = time.perf_counter()
+        try:
+            results = cached_search(self.client, self.cache, group_id, query, limit, scope, self.limiter)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        with self.lock:
+            self.searches += 1
+        return {
+            "query": query,
+            "group_id": group_id,
+            "results": result_records(results),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    def health(self):
+        with self.lock:
+            return {
+                "status": "ok",
+                "uptime_s": round(time.monotonic() - self.started_at, 1),
+                "searches": self.searches,
+                "failed": self.failed,
+                "cache": self.cache.stats() if self.cache else None,
+            }
+
+    def close(self):
+        self.httpx_client.close()
+        if self.cache:
+            self.cache.close()
+
+class SearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep client connections open between searches
+
+    def setup(self):
+        # TCP_NODELAY only applies to TCP sockets
+        self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+        super().setup()
+
+    def log_message(self, format, *args):
+        log.debug("%s %s", self.requestline, format % args)
+
+    def send_json(self, status, body):
+        data = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, self.server.service.health())
+        else:
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self.send_json(413, {"error": "request too large"})
+            return
+        body = self.rfile.read(length)
+        if self.path != "/search":
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        try:
+            request = json.loads(body or b"{}")
+            query = request["query"]
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"error": "expected a JSON object with a query"})
+            return
+
+        try:
+            response = self.server.service.search(
+                query, request.get("group_id") or DEFAULT_GROUP_ID, request.get("limit", 10), request.get("scope")
+            )
+        except ApiError as e:
+            log.warning("Search failed with status %s: %s", e.status_code, e.body)
+            self.send_json(502, {"error": str(e.body), "status_code": e.status_code})
+            return
+        except Exception as e:
+            log.error("Search failed: %s", e)
+            self.send_json(502, {"error": str(e)})
+            return
+        self.send_json(200, response)
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+def create_server(service, host=SEARCH_SERVER_HOST, port=SEARCH_SERVER_PORT, socket_path=None):
+    """HTTP server for the service on a TCP port, or on a Unix socket if socket_path is given"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, SearchHandler)
+        # Only this user may search through the server
+        os.chmod(socket_path, 0o600)
+    else:
+        server = ThreadingHTTPServer((host, port), SearchHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+def main(host=SEARCH_SERVER_HOST, port=SEARCH_SERVER_PORT, socket_path=None, use_cache=False, disk_cache=False,
+         max_rate=SEARCH_MAX_REQUESTS_PER_SECOND, pool_size=SEARCH_SERVER_POOL_SIZE):
+    api_key = os.getenv("ZEP_API_KEY")
+    if not api_key:
+        raise ValueError("ZEP_API_KEY not found in environment variables.")
+
+    cache = SearchCache(disk=disk_cache) if use_cache else None
+    service = SearchService(api_key, cache, max_rate, pool_size)
+    server = create_server(service, host, port, socket_path)
+    address = socket_path or f"http://{host}:{server.server_address[1]}"
+    log.info("Search server listening on %s (cache %s)", address, "on" if cache else "off")
+    # Shut down cleanly (and remove the socket file) when stopped by a service manager
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        log.info("Search server stopped after %d searches (%d failed)", service.searches, service.failed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve graph searches from a long-lived process with warm connections.")
+    parser.add_argument("--host", default=SEARCH_SERVER_HOST, help=f"Address to listen on (default: {SEARCH_SERVER_HOST})")
+    parser.add_argument("--port", type=int, default=SEARCH_SERVER_PORT, help=f"Port to listen on (default: {SEARCH_SERVER_PORT})")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--cache", action="store_true", help="Answer repeated searches from the in-memory search cache")
+    parser.add_argument("--disk-cache", action="store_true", help="With --cache, also keep results in the on-disk cache")
+    parser.add_argument("--max-rate", type=float, default=SEARCH_MAX_REQUESTS_PER_SECOND, help=f"Highest searches per second sent to Zep (default: {SEARCH_MAX_REQUESTS_PER_SECOND:g})")
+    parser.add_argument("--pool-size", type=int, default=SEARCH_SERVER_POOL_SIZE, help=f"Warm connections to Zep (default: {SEARCH_SERVER_POOL_SIZE})")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(args.log_format, args.log_level)
+
+    if args.disk_cache and not args.cache:
+        parser.error("--disk-cache requires --cache")
+
+    main(args.host, args.port, args.socket, args.cache, args.disk_cache, args.max_rate, args.pool_size)
@@ -1,15 +1,33 @@
 import os
 import argparse
+import asyncio
 import json
+import logging
+import threading
+import httpx
 from dotenv import load_dotenv
 from supabase import create_client
 from zep_cloud import EpisodeData
-from zep_cloud.client import Zep
-from zep_cloud import EpisodeData
+from zep_cloud.client import AsyncZep
+from config import ZEP_TIMEOUT_SECONDS
+from rate_limiter import RateLimiter, create_zep_client
+from supabase_reader import iter_rows
+from supabase_writer import ZepUuidWriter
+from chunker import iter_chunks
+from metrics import METRICS, metrics_run, add_metrics_argument
+from search_cache import note_group_write
+from logging_setup import Progress, add_logging_arguments, setup_logging
 
 # 1. Load environment variables
 load_dotenv()
 
+log = logging.getLogger("supa_zep_add")
+
+TABLE_NAME = "embeddings"  # Change this to your table
+MAX_CONTENT_SIZE = 9500  # Slightly less than the 10000 character limit to be safe
+BATCH_MAX_EPISODES = 20  # Chosen default, not a documented Zep limit; tune with --batch-episodes
+BATCH_MAX_BYTES = 5 * MAX_CONTENT_SIZE  # Episode data per request; no larger than the old five full-size parts
+
 # 2. Connect to Supabase
 def get_supabase_client():
     url = os.getenv("SUPABASE_URL")
@@ -17,125 +35,315 @@ def get_supabase_client():
     return create_client(url, key)
 
 # 3. Connect to Zep
-def get_zep_client():
+def get_zep_client(limiter):
     api_key = os.getenv("ZEP_API_KEY")
-    return Zep(api_key=api_key)
+    return create_zep_client(api_key, limiter)
 
-def main(agent_id, group_id):
-    # Table and group info
-    TABLE_NAME = "embeddings"  # Change this to your table
+def get_async_zep_client(httpx_client):
+    """Create an AsyncZep client that sends every request through the given pooled httpx client"""
+    api_key = os.getenv("ZEP_API_KEY")
+    return AsyncZep(api_key=api_key, timeout=ZEP_TIMEOUT_SECONDS, httpx_client=httpx_client)
 
-    supabase = get_supabase_client()
-    zep = get_zep_client()
-
-    # 4. Fetch rows that haven't been uploaded yet (zep_uuid is null)
-    response = (
-        supabase.table(TABLE_NAME)
-        .select("*")
-        .eq("agent_id", agent_id)
-        .is_("zep_uuid", None)
-        .execute()
-    )
-    rows = response.data
-
-    if not rows:
-        print("No new rows to process for this agent_id.")
-        return
+def iter_episodes(rows, row_part_counts):
+    """
+    Turn Supabase rows into Zep episodes, splitting content that exceeds MAX_CONTENT_SIZE.
 
-    # 5. Prepare episodes for Zep
-    episodes = []
-    row_id_map = []  # To keep track of which row matches which episode
-    row_part_map = []  # To track which parts belong to which row
-    MAX_CONTENT_SIZE = 9500  # Slightly less than the 10000 character limit to be safe
-    
+    Yields (episode, row_id, part_num) where part 0 means the row was not split,
+    and records in row_part_counts how many parts each row was split into.
+    """
     for row in rows:
         if not row.get("content"):
             continue  # Skip empty content
-            
+
         content = row["content"]
         # Check if content exceeds the maximum size
         if len(content) > MAX_CONTENT_SIZE:
-            # Split the content into multiple parts
-            parts = [content[i:i+MAX_CONTENT_SIZE] for i in range(0, len(content), MAX_CONTENT_SIZE)]
-            print(f"Content for row {row['id']} split into {len(parts)} parts due to size ({len(content)} characters)")
-            
+            # Split the content into multiple parts at paragraph/sentence boundaries
+            with METRICS.stage("chunk"):
+                parts = list(iter_chunks(content, MAX_CONTENT_SIZE))
+            log.info("Content for row %s split into %d parts due to size (%d characters)", row['id'], len(parts), len(content))
+            row_part_counts[row["id"]] = len(parts)
+
             # Add each part as a separate episode
             for i, part in enumerate(parts):
                 part_indicator = f" [Part {i+1}/{len(parts)}]" if len(parts) > 1 else ""
-                episodes.append(EpisodeData(
+                episode = EpisodeData(
                     data=part + part_indicator,
                     type="text"
-                ))
-                row_id_map.append(row["id"])
-                row_part_map.append(i+1)  # Part number (1-based)
+                )
+                yield episode, row["id"], i+1  # Part number (1-based)
         else:
             # Content is within size limits, add it normally
-            episodes.append(EpisodeData(
-                data=content,
-                type="text"
-            ))
-            row_id_map.append(row["id"])
-            row_part_map.append(0)  # Not split
-    
-    # 6. Send episodes in smaller batches to Zep
-    # Zep has a limit on the number of episodes per batch
-    BATCH_SIZE = 5  # Adjust this based on Zep's limits
-    total_processed = 0
-    
-    for i in range(0, len(episodes), BATCH_SIZE):
-        batch_episodes = episodes[i:i+BATCH_SIZE]
-        batch_row_ids = row_id_map[i:i+BATCH_SIZE]
-        
-        print(f"Processing batch {i//BATCH_SIZE + 1} with {len(batch_episodes)} episodes")
-        
-        # Send this batch to Zep
-        result = zep.graph.add_batch(
-            episodes=batch_episodes,
-            group_id=group_id
-        )
-        
-        # 7. Collect UUIDs and update Supabase for this batch
-        batch_part_nums = row_part_map[i:i+BATCH_SIZE]
-        
-        # Group UUIDs by row_id to handle split content
-        row_uuid_map = {}
-        for row_id, part_num, episode_result in zip(batch_row_ids, batch_part_nums, result):
-            zep_uuid = episode_result.uuid_
-            
-            if row_id not in row_uuid_map:
-                row_uuid_map[row_id] = []
-            
-            # Store the UUID along with its part number
-            row_uuid_map[row_id].append((part_num, zep_uuid))
-            total_processed += 1
-        
-        # Update Supabase with the UUIDs
-        for row_id, uuid_parts in row_uuid_map.items():
+            row_part_counts[row["id"]] = 1
+            yield EpisodeData(data=content, type="text"), row["id"], 0  # Not split
+
+def episode_bytes(episode):
+    """UTF-8 size of an episode's data"""
+    data = episode.data
+    return len(data) if data.isascii() else len(data.encode("utf-8"))
+
+def iter_batches(episodes, max_episodes=BATCH_MAX_EPISODES, max_bytes=BATCH_MAX_BYTES):
+    """
+    Pack (episode, row_id, part_num) items into batches of at most max_episodes
+    episodes and max_bytes of episode data.
+
+    Packing is greedy in arrival order: a batch is sent as soon as the next
+    episode would not fit. Episodes keep their order, so the parts of a split
+    row stay adjacent, and the stream is never buffered beyond one batch.
+    An episode larger than max_bytes on its own gets a batch to itself.
+    """
+    batch = []
+    batch_bytes = 0
+    for item in episodes:
+        size = episode_bytes(item[0])
+        if batch and (len(batch) == max_episodes or batch_bytes + size > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append(item)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+def describe_batch(batch):
+    """Which row and part is in each slot of a batch, e.g. '12, 13.1, 13.2'"""
+    return ", ".join(f"{row_id}.{part_num}" if part_num else str(row_id) for _, row_id, part_num in batch)
+
+def collect_batch_uuids(batch, result, pending_parts, row_part_counts):
+    """
+    Record the UUIDs Zep returned for one batch and return the rows that are now complete.
+
+    Parts of a split row may land in different batches (and, in concurrent mode, complete
+    out of order), so UUIDs are held in pending_parts until every part of the row is back.
+    Each completed row is returned as (row_id, [(part_num, zep_uuid, num_chars), ...]).
+    """
+    completed = []
+    for (episode, row_id, part_num), episode_result in zip(batch, result):
+        uuid_parts = pending_parts.setdefault(row_id, [])
+        # Store the UUID along with its part number
+        uuid_parts.append((part_num, episode_result.uuid_, len(episode.data)))
+
+        if len(uuid_parts) == row_part_counts[row_id]:
             # Sort by part number to ensure correct order
             uuid_parts.sort()
-            
-            if len(uuid_parts) == 1 and uuid_parts[0][0] == 0:
-                # Single part, not split
-                zep_uuid = uuid_parts[0][1]
-                supabase.table(TABLE_NAME).update({"zep_uuid": zep_uuid}).eq("id", row_id).execute()
-                print(f"Updated row {row_id} with Zep UUID {zep_uuid}")
-            else:
-                # Multiple parts, store as JSON array
-                uuids = [part[1] for part in uuid_parts]
-                uuid_json = json.dumps(uuids)
-                supabase.table(TABLE_NAME).update({"zep_uuid": uuid_json}).eq("id", row_id).execute()
-                print(f"Updated row {row_id} with {len(uuids)} Zep UUIDs: {uuid_json[:50]}{'...' if len(uuid_json) > 50 else ''}")
-                print(f"  Parts: {', '.join([str(part[0]) for part in uuid_parts])}")
-                print(f"  First UUID: {uuids[0]}")
-                print(f"  Last UUID: {uuids[-1]}")
-                print(f"  Total characters: {sum([len(ep.data) for ep in batch_episodes if row_id_map[episodes.index(ep)] == row_id])}")
-                print()
-
-    print("All rows processed and updated.")
+            del row_part_counts[row_id]
+            completed.append((row_id, pending_parts.pop(row_id)))
+    return completed
+
+def count_batch(batch, result):
+    if not METRICS.enabled:
+        return
+    METRICS.count("batches")
+    METRICS.count("episodes", len(result))
+    METRICS.count("bytes", sum(episode_bytes(episode) for episode, _, _ in batch))
+
+def write_row_uuids(writer, completed):
+    """Queue the Zep UUIDs of completed rows for bulk write-back to Supabase"""
+    for row_id, uuid_parts in completed:
+        if len(uuid_parts) == 1 and uuid_parts[0][0] == 0:
+            # Single part, not split
+            zep_uuid = uuid_parts[0][1]
+            writer.add(row_id, zep_uuid)
+            log.debug("Updated row %s with Zep UUID %s", row_id, zep_uuid)
+        else:
+            # Multiple parts, store as JSON array
+            uuids = [part[1] for part in uuid_parts]
+            uuid_json = json.dumps(uuids)
+            writer.add(row_id, uuid_json)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Updated row %s with %d Zep UUIDs: %s%s", row_id, len(uuids), uuid_json[:50], '...' if len(uuid_json) > 50 else '')
+                log.debug("  Parts: %s", ', '.join([str(part[0]) for part in uuid_parts]))
+                log.debug("  First UUID: %s", uuids[0])
+                log.debug("  Last UUID: %s", uuids[-1])
+                log.debug("  Total characters: %d", sum([part[2] for part in uuid_parts]))
+
+def report_pending_parts(pending_parts):
+    """
+    Log the uploaded parts of split rows that never completed.
+
+    Their rows keep a null zep_uuid and are re-uploaded whole on the next
+    run, so these episodes are orphans; reconcile.py --fix --delete-orphans
+    removes them.
+    """
+    for row_id, uuid_parts in pending_parts.items():
+        log.error("Row %s was only partly uploaded; orphaned part episodes: %s",
+                  row_id, ", ".join(zep_uuid for _, zep_uuid, _ in sorted(uuid_parts)))
+
+def upload_batches(zep, limiter, writer, group_id, batches, row_part_counts):
+    """Send batches to Zep one at a time, queueing UUIDs for write-back after each batch"""
+    pending_parts = {}
+    total_processed = 0
+    progress = Progress(log, "Episodes uploaded")
+
+    try:
+        for batch_num, batch in enumerate(batches, 1):
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Processing batch %d with %d episodes (rows: %s)", batch_num, len(batch), describe_batch(batch))
+
+            # Send this batch to Zep
+            with METRICS.stage("zep_add_batch"):
+                result = limiter.call(
+                    zep.graph.add_batch,
+                    episodes=[episode for episode, _, _ in batch],
+                    group_id=group_id
+                )
+            count_batch(batch, result)
+            note_group_write(group_id)
+
+            # 7. Collect UUIDs and update Supabase for this batch
+            completed = collect_batch_uuids(batch, result, pending_parts, row_part_counts)
+            write_row_uuids(writer, completed)
+            total_processed += len(result)
+            progress.update(len(result))
+    finally:
+        report_pending_parts(pending_parts)
+
+    if total_processed:
+        progress.done()
+    return total_processed
+
+def read_batches(batches, queue, loop, stop):
+    """
+    Pull batches (and with them the Supabase pages and chunking behind them)
+    in a thread, queueing each one numbered. Blocks while the queue is full.
+    """
+    for numbered in enumerate(batches, 1):
+        if stop.is_set():
+            return
+        asyncio.run_coroutine_threadsafe(queue.put(numbered), loop).result()
+
+async def upload_batches_async(limiter, writer, group_id, batches, row_part_counts, concurrency):
+    """
+    Send batches to Zep with up to `concurrency` add_batch requests in flight.
+
+    All requests share one AsyncZep client backed by a single httpx connection pool,
+    so connections are reused instead of paying a TLS handshake per batch. Batches
+    are produced by a reader thread into a bounded queue, so fetching pages and
+    chunking rows never blocks the event loop while uploads are in flight.
+
+    After a failure, no new batches are sent, but batches already in flight
+    finish and have their UUIDs written back before the first error is
+    raised. Parts of split rows left incomplete are logged.
+    """
+    pending_parts = {}
+    total_processed = 0
+    progress = Progress(log, "Episodes uploaded")
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    errors = []
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        timeout=ZEP_TIMEOUT_SECONDS, limits=limits, event_hooks=limiter.async_event_hooks()
+    ) as httpx_client:
+        zep = get_async_zep_client(httpx_client)
+
+        async def reader():
+            try:
+                await asyncio.to_thread(read_batches, batches, queue, loop, stop)
+            except Exception as e:
+                log.error("Error reading batches: %s", e)
+                errors.append(e)
+                stop.set()
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def worker():
+            nonlocal total_processed
+            # After a failure, keep draining up to the sentinel without sending
+            while (item := await queue.get()) is not None:
+                if stop.is_set():
+                    continue
+                batch_num, batch = item
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("Processing batch %d with %d episodes (rows: %s)", batch_num, len(batch), describe_batch(batch))
+
+                try:
+                    with METRICS.stage("zep_add_batch"):
+                        result = await limiter.call_async(
+                            zep.graph.add_batch,
+                            episodes=[episode for episode, _, _ in batch],
+                            group_id=group_id
+                        )
+                    count_batch(batch, result)
+                    note_group_write(group_id)
+
+                    completed = collect_batch_uuids(batch, result, pending_parts, row_part_counts)
+                    # A full write-back buffer flushes synchronously; keep it off the event loop
+                    await asyncio.to_thread(write_row_uuids, writer, completed)
+                    total_processed += len(result)
+                    progress.update(len(result))
+                except Exception as e:
+                    log.error("Error uploading batch %d (rows: %s): %s", batch_num, describe_batch(batch), e)
+                    errors.append(e)
+                    stop.set()
+
+        tasks = [asyncio.create_task(reader())]
+        tasks += [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Cancelled or interrupted (upload errors don't get here). Stop the
+            # reader thread: it checks stop between batches, and draining the
+            # queue releases it if it is waiting to put one
+            stop.set()
+            for task in tasks:
+                task.cancel()
+            while not queue.empty():
+                queue.get_nowait()
+            raise
+        finally:
+            report_pending_parts(pending_parts)
+
+    if errors:
+        raise errors[0]
+    if total_processed:
+        progress.done()
+    return total_processed
+
+def main(agent_id, group_id, concurrency=1, max_episodes=BATCH_MAX_EPISODES, max_bytes=BATCH_MAX_BYTES):
+    supabase = get_supabase_client()
+
+    # 4. Stream rows that haven't been uploaded yet (zep_uuid is null)
+    rows = METRICS.timed_iter("supabase_fetch", iter_rows(
+        supabase, TABLE_NAME, "id, content",
+        filters=lambda query: query.eq("agent_id", agent_id).is_("zep_uuid", None)
+    ))
+
+    # 5. Prepare episodes for Zep as rows arrive
+    row_part_counts = {}  # To know when every part of a row has been uploaded
+    batches = iter_batches(iter_episodes(rows, row_part_counts), max_episodes, max_bytes)
+
+    # 6. Send episodes to Zep in batches packed up to the size limits, writing UUIDs back in bulk
+    limiter = RateLimiter()
+    with ZepUuidWriter(supabase, TABLE_NAME) as writer:
+        if concurrency > 1:
+            log.info("Uploading with %d concurrent batches", concurrency)
+            total_processed = asyncio.run(upload_batches_async(
+                limiter, writer, group_id, batches, row_part_counts, concurrency
+            ))
+        else:
+            zep = get_zep_client(limiter)
+            total_processed = upload_batches(zep, limiter, writer, group_id, batches, row_part_counts)
+
+    if not total_processed:
+        log.info("No new rows to process for this agent_id.")
+        return
+
+    note_group_write(group_id, force=True)
+    log.info("All rows processed and updated (%d episodes).", total_processed)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process embeddings for a specific agent_id.")
     parser.add_argument("agent_id", help="The agent_id to process rows for")
     parser.add_argument("--group_id", default="supa_zep_poc", help="The Zep group ID to use (default: supa_zep_poc)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of add_batch requests to keep in flight (default: 1)")
+    parser.add_argument("--batch-episodes", type=int, default=BATCH_MAX_EPISODES, help=f"Most episodes per add_batch request (default: {BATCH_MAX_EPISODES})")
+    parser.add_argument("--batch-bytes", type=int, default=BATCH_MAX_BYTES, help=f"Most bytes of episode data per add_batch request (default: {BATCH_MAX_BYTES})")
+    add_metrics_argument(parser)
+    add_logging_arguments(parser)
     args = parser.parse_args()
-    main(args.agent_id, args.group_id)
\ No newline at end of file
+    setup_logging(args.log_format, args.log_level)
+    with metrics_run(args.metrics, "supa_zep_add"):
+        main(args.agent_id, args.group_id, args.concurrency, args.batch_episodes, args.batch_bytes)
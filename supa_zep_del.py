@@ -1,27 +1,211 @@
+"""
+Delete Zep episodes in bulk.
+
+Episode UUIDs can come from the command line, a file or stdin (one per line),
+every episode of a group, or the zep_uuid column of an agent's embeddings rows
+(including the JSON-array form used for split rows). Deletes run concurrently
+over one pooled client under the shared rate limiter. For --agent_id, each
+row's zep_uuid is cleared in bulk once all of its episodes are gone, so
+supa_zep_add.py will upload it again.
+
+Usage:
+    python3 supa_zep_del.py <uuid> [<uuid> ...]
+    python3 supa_zep_del.py --file uuids.txt        # or --file - for stdin
+    python3 supa_zep_del.py --group_id supa_zep_poc   # asks first; --yes to skip
+    python3 supa_zep_del.py --agent_id agent-1 --concurrency 16
+"""
+
 from dotenv import load_dotenv
 import os
+import sys
+import time
 import argparse
-from zep_cloud.client import Zep
+import logging
+from itertools import chain
+from supabase import create_client
+from rate_limiter import RateLimiter, create_zep_client
+from supabase_reader import iter_rows
+from supabase_writer import ZepUuidWriter
+from zep_episodes import iter_episodes, parse_zep_uuid_value, delete_episodes
+from logging_setup import Progress, add_logging_arguments, setup_logging
 
 # 1. Load environment variables (for your API key)
 load_dotenv()
 
-# 2. Get your Zep API key from the environment
-api_key = os.getenv("ZEP_API_KEY")
-if not api_key:
-    raise ValueError("ZEP_API_KEY not found in environment variables.")
-
-# 3. Parse the UUID from the command line
-parser = argparse.ArgumentParser(description="Delete a Zep episode by UUID.")
-parser.add_argument("uuid", help="The UUID of the episode to delete")
-args = parser.parse_args()
-
-# 4. Create a Zep client
-client = Zep(api_key=api_key)
-
-# 5. Delete the episode
-try:
-    response = client.graph.episode.delete(uuid_=args.uuid)
-    print(f"Episode {args.uuid} deleted. Message: {response.message}")
-except Exception as e:
-    print(f"Error deleting episode {args.uuid}: {e}")
+log = logging.getLogger("supa_zep_del")
+
+TABLE_NAME = "embeddings"
+
+def get_supabase_client():
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+    return create_client(url, key)
+
+def iter_file_uuids(path):
+    """UUIDs from a file or stdin ('-'), one per line; blank lines and # comments are skipped"""
+    file = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+def row_uuids(row):
+    """A row's distinct episode UUIDs, or None (with a warning) if its zep_uuid is malformed"""
+    try:
+        return list(dict.fromkeys(parse_zep_uuid_value(row["zep_uuid"])))
+    except ValueError:
+        log.warning("Skipping row %s with malformed zep_uuid: %s", row["id"], row["zep_uuid"])
+        return None
+
+class RowTracker:
+    """
+    Maps in-flight episode UUIDs back to their embeddings rows and clears a
+    row's zep_uuid once every one of its episodes has been deleted.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.rows_of = {}  # episode UUID -> ids of the rows holding it, only while the delete is pending
+        self.remaining = {}  # row id -> episodes not yet deleted
+        self.failed_rows = set()
+        self.rows_cleared = 0
+
+    def iter_uuids(self, rows):
+        for row in rows:
+            row_id = row["id"]
+            uuids = row_uuids(row)
+            if uuids is None:
+                continue
+            if not uuids:
+                # No episodes to delete (e.g. "[]"); only the column needs clearing
+                self.clear(row_id)
+                continue
+            self.remaining[row_id] = len(uuids)
+            for episode_uuid in uuids:
+                pending = self.rows_of.get(episode_uuid)
+                if pending is not None:
+                    # Another row holds the same episode and its delete is already queued
+                    pending.append(row_id)
+                    continue
+                self.rows_of[episode_uuid] = [row_id]
+                yield episode_uuid
+
+    def on_result(self, episode_uuid, error):
+        for row_id in self.rows_of.pop(episode_uuid):
+            if error is not None:
+                self.failed_rows.add(row_id)
+            self.remaining[row_id] -= 1
+            if self.remaining[row_id] == 0:
+                del self.remaining[row_id]
+                if row_id in self.failed_rows:
+                    self.failed_rows.discard(row_id)
+                else:
+                    self.clear(row_id)
+
+    def clear(self, row_id):
+        self.writer.add(row_id, None)
+        self.rows_cleared += 1
+
+def main(uuids=(), file_path=None, group_id=None, agent_id=None, concurrency=8, dry_run=False, failures_path=None):
+    api_key = os.getenv("ZEP_API_KEY")
+    if not api_key:
+        raise ValueError("ZEP_API_KEY not found in environment variables.")
+
+    limiter = RateLimiter()
+    sources = [iter(uuids)]
+    if file_path:
+        sources.append(iter_file_uuids(file_path))
+    if group_id:
+        sources.append(episode.uuid_ for episode in iter_episodes(create_zep_client(api_key, limiter), group_id))
+
+    supabase = writer = tracker = None
+    if agent_id:
+        supabase = get_supabase_client()
+        rows = iter_rows(
+            supabase, TABLE_NAME, "id, zep_uuid",
+            filters=lambda query: query.eq("agent_id", agent_id).not_.is_("zep_uuid", None)
+        )
+        if not dry_run:
+            writer = ZepUuidWriter(supabase, TABLE_NAME)
+            tracker = RowTracker(writer)
+            sources.append(tracker.iter_uuids(rows))
+        else:
+            sources.append(u for row in rows for u in row_uuids(row) or ())
+
+    targets = chain.from_iterable(sources)
+    if dry_run:
+        count = sum(1 for _ in targets)
+        log.info("Dry run: %d episodes would be deleted", count)
+        return True
+
+    progress = Progress(log, "Delete requests", every=500)
+    failures = open(failures_path, "w", encoding="utf-8") if failures_path else None
+    failed_examples = []
+
+    def on_result(episode_uuid, error):
+        progress.update()
+        if error is not None:
+            log.debug("Error deleting episode %s: %s", episode_uuid, error)
+            if len(failed_examples) < 10:
+                failed_examples.append((episode_uuid, error))
+            if failures:
+                failures.write(episode_uuid + "\n")
+        if tracker and episode_uuid in tracker.rows_of:
+            tracker.on_result(episode_uuid, error)
+
+    started = time.perf_counter()
+    try:
+        stats = delete_episodes(api_key, targets, concurrency, limiter, on_result)
+    finally:
+        if writer:
+            writer.close()
+        if failures:
+            failures.close()
+    elapsed = time.perf_counter() - started
+    progress.done()
+
+    log.info("=== DELETE SUMMARY ===")
+    log.info("Deleted: %d", stats["deleted"])
+    log.info("Already gone: %d", stats["not_found"])
+    log.info("Failed: %d", stats["failed"])
+    if tracker:
+        log.info("Rows with zep_uuid cleared: %d", tracker.rows_cleared)
+    total = sum(stats.values())
+    log.info("%d episodes in %.1fs (%.1f/s)", total, elapsed, total / elapsed if elapsed else 0.0)
+    for episode_uuid, error in failed_examples:
+        log.error("Error deleting episode %s: %s", episode_uuid, error)
+    if failures_path and stats["failed"]:
+        log.info("Failed UUIDs written to %s (retry with --file %s)", failures_path, failures_path)
+    return not stats["failed"]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete Zep episodes in bulk.")
+    parser.add_argument("uuid", nargs="*", help="UUIDs of episodes to delete")
+    parser.add_argument("--file", help="Read UUIDs from this file, one per line ('-' for stdin)")
+    parser.add_argument("--group_id", help="Delete every episode in this group (asks for confirmation)")
+    parser.add_argument("--agent_id", help="Delete the episodes in this agent's zep_uuid column and clear the column")
+    parser.add_argument("--concurrency", type=int, default=8, help="Deletes to keep in flight (default: 8)")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the episodes that would be deleted")
+    parser.add_argument("--failures", help="Write UUIDs that failed to delete to this file")
+    parser.add_argument("--yes", action="store_true", help="Don't ask before deleting a whole --group_id")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    setup_logging(args.log_format, args.log_level)
+
+    if not (args.uuid or args.file or args.group_id or args.agent_id):
+        parser.error("give episode UUIDs, --file, --group_id or --agent_id")
+
+    if args.group_id and not (args.yes or args.dry_run):
+        if args.file == "-" or not sys.stdin.isatty():
+            parser.error("--group_id deletes every episode in the group; pass --yes to confirm")
+        confirm = input(f"Delete every episode in group '{args.group_id}'? (y/n): ")
+        if confirm.strip().lower() != "y":
+            print("Operation cancelled by user.")
+            sys.exit(1)
+
+    if not main(args.uuid, args.file, args.group_id, args.agent_id, args.concurrency, args.dry_run, args.failures):
+        sys.exit(1)
@@ -5,9 +5,14 @@ Script to clear zep_uuid values in the embeddings table for a specific agent_id.
 
 import os
 import argparse
+import logging
 import sys
 from typing import Optional, Dict, Any
 from supabase import create_client, Client
+from reset_zep_uuids import count_uploaded_rows, reset_zep_uuids
+from logging_setup import add_logging_arguments, setup_logging
+
+log = logging.getLogger("supa_zep_deleteuuid")
 
 def get_supabase_client() -> Client:
     """Initialize and return a Supabase client using environment variables."""
@@ -19,13 +24,14 @@ def get_supabase_client() -> Client:
     
     return create_client(supabase_url, supabase_key)
 
-def clear_zep_uuids(agent_id: str, supabase_client: Optional[Client] = None) -> Dict[str, Any]:
+def clear_zep_uuids(agent_id: str, supabase_client: Optional[Client] = None, limit: Optional[int] = None) -> Dict[str, Any]:
     """
     Clear zep_uuid values in the embeddings table for a specific agent_id.
     
     Args:
         agent_id: The agent_id to clear zep_uuids for
         supabase_client: Optional Supabase client (for testing)
+        limit: Clear at most this many rows (all rows if None)
         
     Returns:
         Dict containing operation results
@@ -35,59 +41,46 @@ def clear_zep_uuids(agent_id: str, supabase_client: Optional[Client] = None) ->
         supabase_client = get_supabase_client()
     
     try:
-        # First, count how many rows will be affected
-        count_response = (
-            supabase_client.table("embeddings")
-            .select("*", count='exact')
-            .eq("agent_id", agent_id)
-            .execute()
-        )
-        
-        affected_count = count_response.count if hasattr(count_response, 'count') else 0
+        # Count with a HEAD request; no rows are transferred
+        affected_count = count_uploaded_rows(supabase_client, agent_id)
         
         if affected_count == 0:
-            print(f"No records found for agent_id: {agent_id}")
+            log.info("No records with zep_uuid found for agent_id: %s", agent_id)
             return {"status": "success", "message": "No records found", "count": 0}
             
-        print(f"Found {affected_count} records for agent_id: {agent_id}")
-        print("Proceeding to clear zep_uuids...")
+        log.info("Found %d records with zep_uuid for agent_id: %s", affected_count, agent_id)
+        log.info("Proceeding to clear zep_uuids...")
         
-        # Update all rows where agent_id matches, setting zep_uuid to NULL
-        response = (
-            supabase_client.table("embeddings")
-            .update({"zep_uuid": None})
-            .eq("agent_id", agent_id)
-            .execute()
-        )
+        # One set-based UPDATE (id batches with a limit) that returns no row data
+        updated = reset_zep_uuids(supabase_client, agent_id, limit)
         
         result = {
             "status": "success",
             "message": f"Cleared zep_uuids for agent_id: {agent_id}",
-            "count": affected_count,
-            "data": response.data
+            "count": updated
         }
         
-        print(f"Successfully cleared zep_uuids for agent_id: {agent_id}")
-        print(f"Number of rows updated: {affected_count}")
+        log.info("Successfully cleared zep_uuids for agent_id: %s", agent_id)
+        log.info("Number of rows updated: %d", updated)
         
         return result
         
     except Exception as e:
         error_msg = f"Error clearing zep_uuids: {str(e)}"
-        print(error_msg)
+        log.error(error_msg)
         return {"status": "error", "message": error_msg, "error": str(e)}
 
 
-def test_clear_zep_uuids(agent_id: str) -> None:
+def test_clear_zep_uuids(agent_id: str, limit: Optional[int] = None) -> None:
     """
     Test function to verify the clear_zep_uuids function works.
     This will run in dry-run mode first to show what would be updated.
     """
-    print("\n=== Starting Test ===")
-    print(f"Testing clear_zep_uuids for agent_id: {agent_id}")
+    log.info("=== Starting Test ===")
+    log.info("Testing clear_zep_uuids for agent_id: %s", agent_id)
     
     # First, do a dry run to see what would be updated
-    print("\n[DRY RUN] Checking records that would be updated...")
+    log.info("[DRY RUN] Checking records that would be updated...")
     try:
         supabase = get_supabase_client()
         
@@ -101,44 +94,49 @@ def test_clear_zep_uuids(agent_id: str) -> None:
         )
         
         if not sample.data:
-            print(f"No records found for agent_id: {agent_id}")
+            log.info("No records found for agent_id: %s", agent_id)
             return
             
-        print("\nSample of records to be updated:")
+        log.info("Sample of records to be updated:")
         for i, record in enumerate(sample.data, 1):
-            print(f"  {i}. ID: {record.get('id')}, agent_id: {record.get('agent_id')}, "
-                  f"zep_uuid: {record.get('zep_uuid')}")
+            log.info("  %d. ID: %s, agent_id: %s, zep_uuid: %s",
+                     i, record.get('id'), record.get('agent_id'), record.get('zep_uuid'))
         
         # Ask for confirmation
         confirm = input("\nDo you want to proceed with the update? (y/n): ")
         if confirm.lower() != 'y':
-            print("Operation cancelled by user.")
+            log.info("Operation cancelled by user.")
             return
             
         # Perform the actual update
-        print("\nPerforming update...")
-        result = clear_zep_uuids(agent_id, supabase)
+        log.info("Performing update...")
+        result = clear_zep_uuids(agent_id, supabase, limit)
         
         if result.get("status") == "success":
-            print("\n=== Test Successful ===")
-            print(f"Updated {result.get('count', 0)} records.")
+            log.info("=== Test Successful ===")
+            log.info("Updated %d records.", result.get('count', 0))
         else:
-            print("\n=== Test Failed ===")
-            print(f"Error: {result.get('error', 'Unknown error')}")
+            log.error("=== Test Failed ===")
+            log.error("Error: %s", result.get('error', 'Unknown error'))
             
     except Exception as e:
-        print(f"\n=== Test Failed ===")
-        print(f"Error during test: {str(e)}")
+        log.error("=== Test Failed ===")
+        log.error("Error during test: %s", e)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Clear zep_uuid values for a specific agent_id")
     parser.add_argument("agent_id", help="The agent_id to clear zep_uuids for")
     parser.add_argument("--test", action="store_true", help="Run in test mode (shows what would be updated)")
+    parser.add_argument("--limit", type=int, help="Clear at most this many rows")
+    add_logging_arguments(parser)
     args = parser.parse_args()
+    if args.limit is not None and args.limit < 1:
+        parser.error("--limit must be at least 1")
+    setup_logging(args.log_format, args.log_level)
     
     if args.test:
-        test_clear_zep_uuids(args.agent_id)
+        test_clear_zep_uuids(args.agent_id, args.limit)
     else:
-        result = clear_zep_uuids(args.agent_id)
+        result = clear_zep_uuids(args.agent_id, limit=args.limit)
         if result.get("status") != "success":
             sys.exit(1)
\ No newline at end of file
@@ -1,11 +1,19 @@
 from dotenv import load_dotenv
 import os
+import sys
+import json
+import time
 import argparse
+import logging
 from zep_cloud.client import Zep
+from logging_setup import Progress, add_logging_arguments, setup_logging
+from zep_episodes import group_exists, iter_episode_pages
 
 # 1. Load environment variables (for your API key)
 load_dotenv()
 
+log = logging.getLogger("supa_zep_retrieve")
+
 # 2. Get your Zep API key from the environment
 api_key = os.getenv("ZEP_API_KEY")
 if not api_key:
@@ -14,92 +22,108 @@ if not api_key:
 # 3. Create a Zep client
 client = Zep(api_key=api_key)
 
-def main(group_id):
-    # Retrieve all episodes from the group
-    all_episodes = []
-    page_token = None
-    page_num = 1
-    
-    print(f"\n=== Retrieving episodes for group_id: {group_id} ===\n")
-    print(f"Using Zep client with available methods: {[m for m in dir(client) if not m.startswith('_')]}")
-    print(f"Graph methods: {[m for m in dir(client.graph) if not m.startswith('_')]}")
-    
-    if hasattr(client.graph, 'episode'):
-        print(f"Episode methods: {[m for m in dir(client.graph.episode) if not m.startswith('_')]}")
-    
-    # First, check if the group exists by trying to add it (will fail with 'already exists' if it does)
-    try:
-        print(f"\nChecking if group exists: {group_id}")
-        client.group.add(
-            group_id=group_id,
-            description=f"Test group {group_id}",
-            name=f"Test group {group_id}"
+# Columns of the Parquet export, in order
+PARQUET_COLUMNS = ("uuid", "created_at", "content", "source", "source_description", "processed", "session_id", "role", "role_type")
+
+def episode_record(episode):
+    """Plain dict of an episode, keyed by the API field names"""
+    return episode.dict()
+
+class JsonlExporter:
+    """Writes one JSON object per episode"""
+
+    def __init__(self, path):
+        self.file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def write_page(self, episodes):
+        self.file.write("".join(json.dumps(episode_record(e), default=str) + "\n" for e in episodes))
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+class ParquetExporter:
+    """Writes each page as one Parquet row group (needs pyarrow)"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema(
+            [(name, pa.bool_() if name == "processed" else pa.string()) for name in PARQUET_COLUMNS]
         )
-        print("Warning: Group did not exist and was created now. This might explain why no episodes were found.")
-    except Exception as e:
-        if "already exists" in str(e).lower():
-            print(f"Group exists: {group_id}")
-        else:
-            print(f"Error checking group: {e}")
-    
-    # Try different methods to retrieve episodes
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_page(self, episodes):
+        records = [episode_record(e) for e in episodes]
+        columns = {
+            name: [r.get(name) if name == "processed" else _as_text(r.get(name)) for r in records]
+            for name in PARQUET_COLUMNS
+        }
+        self.writer.write_table(self.pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+def _as_text(value):
+    return None if value is None else str(value)
+
+def export_episodes(group_id, output, output_format="jsonl", lastn=None):
+    """
+    Write a group's episodes to a JSONL or Parquet file page by page.
+
+    The API returns the group in one response (see zep_episodes), so that
+    response is held in memory; the output is written incrementally.
+    """
+    exporter = ParquetExporter(output) if output_format == "parquet" else JsonlExporter(output)
+    progress = Progress(log, "Episodes exported", every=10000)
+    started = time.perf_counter()
     try:
-        while True:
-            print(f"\nRetrieving episodes for group_id: {group_id} (page {page_num})")
-            
-            # Check if we have pagination parameters
-            if page_token:
-                print(f"Using page token: {page_token}")
-                response = client.graph.episode.get_by_group_id(group_id=group_id, page_token=page_token)
-            else:
-                response = client.graph.episode.get_by_group_id(group_id=group_id)
-            
-            print(f"Response type: {type(response)}")
-            print(f"Response attributes: {[attr for attr in dir(response) if not attr.startswith('_')]}")
-            
-            # Get episodes from response
-            episodes = response.episodes if hasattr(response, 'episodes') else []
-            print(f"Found {len(episodes)} episodes in this page")
-            all_episodes.extend(episodes)
-            
-            # Print response metadata if available
-            if hasattr(response, 'metadata'):
-                print(f"Response metadata: {response.metadata}")
-            
-            # Check if there are more pages
-            if hasattr(response, 'next_page_token') and response.next_page_token:
-                print(f"Next page token: {response.next_page_token}")
-                page_token = response.next_page_token
-                page_num += 1
-            else:
-                break
-        
-        # Print all UUIDs from the response for comparison
-        if all_episodes:
-            print("\nAll episode UUIDs:")
-            for ep in all_episodes:
-                print(f"  {ep.uuid_}")
-    except Exception as e:
-        print(f"Error retrieving episodes: {e}")
-        print(f"Exception type: {type(e)}")
-        import traceback
-        traceback.print_exc()
-    
-    episodes = all_episodes
-
-    # 6. Print out the results
-    print(f"Found {len(episodes)} episodes in group '{group_id}'")
-    if episodes:
-        print(dir(episodes[0]))
-        for i, episode in enumerate(episodes, 1):
-            # Print some details about each episode
-            print(f"Episode {i}:")
-            print(f"  uuid: {episode.uuid_}")
-            print(f"  content: {episode.content[:100]}...")  # Print first 100 chars of content
-            print()
+        for page in iter_episode_pages(client, group_id, lastn):
+            exporter.write_page(page)
+            progress.update(len(page))
+    finally:
+        exporter.close()
+    progress.done()
+    log.info("Exported %d episodes from group '%s' to %s in %.1fs",
+             progress.count, group_id, output, time.perf_counter() - started)
+
+def main(group_id, output=None, output_format="jsonl", lastn=None):
+    log.info("=== Retrieving episodes for group_id: %s ===", group_id)
+
+    # Check the group without creating it as a side effect
+    if not group_exists(client, group_id):
+        log.error("Group does not exist: %s", group_id)
+        return False
+    log.info("Group exists: %s", group_id)
+
+    if output:
+        export_episodes(group_id, output, output_format, lastn)
+        return True
+
+    # No output file: print a short preview of each episode
+    count = 0
+    for page in iter_episode_pages(client, group_id, lastn):
+        for episode in page:
+            count += 1
+            log.info("Episode %d: uuid=%s content=%s...", count, episode.uuid_, (episode.content or "")[:100])  # First 100 chars of content
+    log.info("Found %d episodes in group '%s'", count, group_id)
+    return True
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Retrieve episodes from a Zep group.")
     parser.add_argument("--group_id", default="supa_zep_poc", help="The Zep group ID to retrieve episodes from (default: supa_zep_poc)")
+    parser.add_argument("--output", help="Export episodes to this file instead of printing them ('-' for stdout)")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), help="Export format (default: from the --output extension, else jsonl)")
+    parser.add_argument("--lastn", type=int, help="Only retrieve the most recent N episodes")
+    add_logging_arguments(parser)
     args = parser.parse_args()
-    main(args.group_id)
+    # Keep stdout clean for the export when it is written there
+    setup_logging(args.log_format, args.log_level, stream=sys.stderr if args.output == "-" else None)
+
+    output_format = args.format or ("parquet" if args.output and args.output.endswith(".parquet") else "jsonl")
+    if not main(args.group_id, args.output, output_format, args.lastn):
+        sys.exit(1)
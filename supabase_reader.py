@@ -0,0 +1,85 @@
+"""
+Streaming, keyset-paginated reader for Supabase tables.
+
+select("*").execute() pulls a whole table into one response, which PostgREST
+silently truncates at its max-rows limit. iter_rows instead pages through the
+table with `WHERE key > last_key ORDER BY key LIMIT page_size`, selecting only
+the columns the caller needs, and fetches the next page in the background while
+the caller works through the current one.
+
+Keyset pagination (unlike offsets) stays correct when the caller updates rows
+it has already read, e.g. filling in zep_uuid while iterating `zep_uuid IS NULL`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from config import SUPABASE_PAGE_SIZE
+
+def _quote(value):
+    """Quote a value for use inside a PostgREST logical filter"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+def keyset_filter(key_columns, last_values):
+    """
+    Build a PostgREST or-filter matching rows that sort after last_values.
+
+    (a, b) > (x, y) becomes `a > x OR (a = x AND b > y)`. Postgres sorts NULLs
+    last in ascending order, so NULL counts as greater than any value and
+    nothing is greater than NULL.
+    """
+    clauses = []
+    for i, column in enumerate(key_columns):
+        value = last_values[i]
+        if value is None:
+            continue
+        terms = [
+            f"{c}.is.null" if v is None else f"{c}.eq.{_quote(v)}"
+            for c, v in zip(key_columns[:i], last_values[:i])
+        ]
+        terms.append(f"or({column}.gt.{_quote(value)},{column}.is.null)")
+        clauses.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return ",".join(clauses)
+
+def iter_rows(supabase, table_name, columns, filters=None, order_by=("id",), page_size=SUPABASE_PAGE_SIZE):
+    """
+    Yield rows from a Supabase table one page at a time.
+
+    Args:
+        supabase: Supabase client
+        table_name: Table to read
+        columns: Comma-separated columns to select (must include the order_by columns)
+        filters: Optional function that adds filters to the query, e.g.
+            lambda q: q.eq("agent_id", agent_id)
+        order_by: Columns that define the row order; together they must be unique
+        page_size: Rows fetched per request
+    """
+    selected = {c.strip() for c in columns.split(",")}
+    missing = [c for c in order_by if c not in selected]
+    if missing:
+        raise ValueError(f"order_by columns {missing} must be included in the selected columns")
+
+    def fetch_page(last_row):
+        query = supabase.table(table_name).select(columns)
+        if filters:
+            query = filters(query)
+        if last_row is not None:
+            if len(order_by) == 1:
+                query = query.gt(order_by[0], last_row[order_by[0]])
+            else:
+                query = query.or_(keyset_filter(order_by, [last_row[c] for c in order_by]))
+        for column in order_by:
+            query = query.order(column)
+        return query.limit(page_size).execute().data
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        next_page = executor.submit(fetch_page, None)
+        while True:
+            rows = next_page.result()
+            # A short page does not mean the end: PostgREST may cap page_size
+            if not rows:
+                return
+            # Prefetch the next page while the caller consumes this one
+            next_page = executor.submit(fetch_page, rows[-1])
+            yield from rows
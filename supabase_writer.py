@@ -0,0 +1,138 @@
+"""
+Buffered bulk write-back of zep_uuid values to Supabase.
+
+Updating one row per request costs an HTTPS round trip per row. ZepUuidWriter
+collects (id, zep_uuid) pairs and flushes them every `batch_size` rows or every
+`flush_interval` seconds, whichever comes first:
+
+- when every pending row gets the same value (e.g. clearing to NULL) it sends a
+  single `UPDATE ... WHERE id IN (...)`
+- otherwise it calls the bulk_set_zep_uuids Postgres function (see
+  bulk_set_zep_uuids.sql); there is no upsert fallback, since an upsert of
+  only id and zep_uuid breaks the table's other NOT NULL columns
+
+Updates stay pending until they are written, so a failed flush is retried by
+the next one (at the latest on close) instead of losing the row -> UUID
+mapping and letting the next run upload those rows again. The background
+flusher logs a failure and keeps retrying with exponential backoff; a flush
+that add() or close() runs itself raises to the caller.
+
+Usage:
+    with ZepUuidWriter(supabase, "embeddings") as writer:
+        writer.add(row_id, zep_uuid)
+"""
+
+import logging
+import threading
+from metrics import METRICS
+from config import (
+    WRITEBACK_BATCH_SIZE,
+    WRITEBACK_FLUSH_SECONDS,
+    WRITEBACK_RPC_NAME,
+    WRITEBACK_RPC_TABLE,
+    WRITEBACK_RETRY_MAX_SECONDS,
+)
+
+log = logging.getLogger("supabase_writer")
+
+class ZepUuidWriter:
+    """
+    Collects zep_uuid updates and writes them to Supabase in bulk.
+
+    Args:
+        supabase: Supabase client
+        table_name: Table holding the zep_uuid column
+        batch_size: Flush once this many rows are pending
+        flush_interval: Flush pending rows at least this often, in seconds
+        rpc_name: Postgres function used for mixed values. It only updates
+            WRITEBACK_RPC_TABLE, so that is the only table accepted.
+    """
+
+    def __init__(self, supabase, table_name, batch_size=WRITEBACK_BATCH_SIZE,
+                 flush_interval=WRITEBACK_FLUSH_SECONDS, rpc_name=WRITEBACK_RPC_NAME):
+        if table_name != WRITEBACK_RPC_TABLE:
+            raise ValueError(f"{rpc_name} only updates the {WRITEBACK_RPC_TABLE} table, not {table_name}")
+        self.supabase = supabase
+        self.table_name = table_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rpc_name = rpc_name
+
+        self.pending = []
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.rows_written = 0
+        self.requests = 0
+
+        self.flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self.flusher.start()
+
+    def add(self, row_id, zep_uuid):
+        """Queue a zep_uuid update for one row"""
+        with self.lock:
+            self.pending.append((row_id, zep_uuid))
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write all pending updates now"""
+        with self.lock:
+            updates, self.pending = self.pending, []
+        sent = 0
+        try:
+            for i in range(0, len(updates), self.batch_size):
+                self._send(updates[i:i+self.batch_size])
+                sent = i + self.batch_size
+        except Exception:
+            # Keep the unsent updates, ahead of any added since, for the next flush
+            with self.lock:
+                self.pending[:0] = updates[sent:]
+            raise
+
+    def close(self):
+        """Stop the background flusher and write anything still pending"""
+        self.closed.set()
+        self.flusher.join()
+        # Also retries whatever a failed background flush left pending
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _send(self, updates):
+        with METRICS.stage("supabase_update"):
+            self._write(updates)
+        with self.lock:
+            self.rows_written += len(updates)
+            self.requests += 1
+        METRICS.count("rows_written_back", len(updates))
+
+    def _write(self, updates):
+        values = {zep_uuid for _, zep_uuid in updates}
+        if len(values) == 1:
+            # Same value for every row: one set-based UPDATE
+            (zep_uuid,) = values
+            (
+                self.supabase.table(self.table_name)
+                .update({"zep_uuid": zep_uuid}, returning="minimal")
+                .in_("id", [row_id for row_id, _ in updates])
+                .execute()
+            )
+        else:
+            params = {"updates": [{"id": row_id, "zep_uuid": zep_uuid} for row_id, zep_uuid in updates]}
+            self.supabase.rpc(self.rpc_name, params).execute()
+
+    def _flush_periodically(self):
+        delay = self.flush_interval
+        while not self.closed.wait(delay):
+            try:
+                self.flush()
+                delay = self.flush_interval
+            except Exception as e:
+                # The updates stay pending; back off and try again
+                delay = min(delay * 2, WRITEBACK_RETRY_MAX_SECONDS)
+                log.warning("Background write-back failed, retrying in %.1fs: %s", delay, e)
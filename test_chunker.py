@@ -0,0 +1,46 @@
+"""
+Tests for chunker.py's boundaries: chunks never exceed the limit, cuts prefer
+paragraphs, then sentences, then whitespace, and streamed input chunks the
+same as a single string.
+
+Run with: python -m pytest test_chunker.py
+"""
+
+import pytest
+from chunker import _is_abbreviation, chunk_text, iter_chunks
+
+def test_prefers_paragraph_breaks_over_sentences():
+    text = "First sentence. " * 3 + "\n\n" + "Second paragraph words. " * 4
+    chunks = chunk_text(text, chunk_size=80, overlap=0)
+    assert chunks[0] == ("First sentence. " * 3).strip()
+    assert all(len(chunk) <= 80 for chunk in chunks)
+
+def test_cuts_after_sentences_not_abbreviations():
+    text = "We met Dr. Smith at noon and talked at length. Then we left the building quietly."
+    chunks = chunk_text(text, chunk_size=60, overlap=0)
+    assert chunks[0] == "We met Dr. Smith at noon and talked at length."
+
+def test_hard_cuts_unbroken_text():
+    chunks = chunk_text("x" * 250, chunk_size=100, overlap=0)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+
+def test_blocks_chunk_like_one_string():
+    text = "".join(f"Sentence number {i} is here. " + ("\n\n" if i % 7 == 0 else "") for i in range(300))
+    blocks = [text[i:i + 37] for i in range(0, len(text), 37)]
+    assert list(iter_chunks(blocks, 200, 20)) == chunk_text(text, 200, 20)
+
+def test_overlap_repeats_the_previous_tail():
+    chunks = chunk_text(" ".join(f"w{i}" for i in range(100)), chunk_size=50, overlap=10)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.split()[-1] in chunk.split()[:3]
+
+def test_rejects_overlap_of_half_the_chunk():
+    with pytest.raises(ValueError):
+        chunk_text("text", chunk_size=100, overlap=50)
+
+def test_abbreviation_lookback_stays_in_its_window():
+    assert _is_abbreviation("see e.g. this", 7)
+    assert _is_abbreviation("by J. Doe", 4)
+    assert not _is_abbreviation("the end. Next", 7)
+    # No space within the window: only the last 16 characters are considered
+    assert not _is_abbreviation("x" * 100 + "dr.", 102)
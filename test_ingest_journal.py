@@ -0,0 +1,94 @@
+"""
+Tests for the dedup index: envelope round trips, stable_hash's equivalence
+with the old header layout, and the ingest journal itself.
+
+Run with: python -m pytest test_ingest_journal.py
+"""
+
+import json
+import pytest
+from add_from_supabase import format_content_with_metadata
+from add_from_youtube import format_youtube_content
+from envelope import Envelope, decode_envelope, encode_envelope, format_timestamp, legacy_payload, youtube_urls
+from ingest_journal import IngestJournal, stable_hash
+
+YOUTUBE_CHUNK = {
+    "id": 7, "video_id": "abc123", "chunk_number": 3, "title": "Talk", "summary": "Ünïcode summary",
+    "start_time": 61.5, "end_time": 125.0, "metadata": {"lang": "en"}, "content": "  Spoken words.  ",
+}
+DOCUMENT_CHUNK = {
+    "id": 9, "batch_name": "handbook", "chunk_number": 2, "title": "Handbook", "summary": None,
+    "content": "Section two.\n",
+}
+
+def old_youtube_payload(chunk):
+    """What add_from_youtube sent before envelopes"""
+    urls = youtube_urls(chunk["video_id"], chunk["start_time"], chunk["end_time"])
+    metadata = {
+        "video_id": chunk["video_id"], "chunk_number": chunk["chunk_number"], "title": chunk["title"],
+        "summary": chunk["summary"], "start_time": chunk["start_time"], "end_time": chunk["end_time"],
+        "chunk_id": chunk["id"], "urls": urls, "original_metadata": chunk["metadata"],
+    }
+    return (
+        f"[YOUTUBE_METADATA]\n{json.dumps(metadata, indent=2)}\n[CONTENT]\n{chunk['content'].strip()}"
+        f"\n[TIMESTAMP] {format_timestamp(chunk['start_time'])} - {format_timestamp(chunk['end_time'])}\n"
+        f"[URL] {urls['timestamped_url']}"
+    )
+
+def old_document_payload(chunk):
+    """What add_from_supabase sent before envelopes"""
+    metadata = {
+        "batch_name": chunk["batch_name"], "chunk_number": chunk["chunk_number"], "title": chunk["title"],
+        "summary": chunk["summary"], "document_id": chunk["id"],
+    }
+    return f"[METADATA]\n{json.dumps(metadata, indent=2)}\n[CONTENT]\n{chunk['content'].strip()}"
+
+def test_envelope_round_trip_rebuilds_urls():
+    payload = format_youtube_content(YOUTUBE_CHUNK)
+    assert payload.startswith("[ZEP/1 youtube]{") and "urls" not in payload
+
+    envelope = decode_envelope(payload)
+    assert envelope.kind == "youtube"
+    assert envelope.body == "Spoken words."
+    assert envelope.metadata["summary"] == "Ünïcode summary"
+    assert envelope.metadata["urls"] == youtube_urls("abc123", 61.5, 125.0)
+
+def test_decode_reads_old_headers():
+    envelope = decode_envelope(old_document_payload(DOCUMENT_CHUNK))
+    assert (envelope.kind, envelope.version, envelope.body) == ("document", 0, "Section two.")
+    assert envelope.metadata["batch_name"] == "handbook"
+
+def test_decode_rejects_newer_versions_and_bad_metadata():
+    assert decode_envelope('[ZEP/2 document]{"a":1}\nbody') is None
+    assert decode_envelope('[ZEP/1 document]{"a":\nbody') is None
+    assert decode_envelope("[METADATA]\n{}\nno content marker") is None
+    assert decode_envelope("plain text") is None
+
+def test_stable_hash_matches_old_layout():
+    assert stable_hash(format_youtube_content(YOUTUBE_CHUNK)) == stable_hash(old_youtube_payload(YOUTUBE_CHUNK))
+    assert stable_hash(format_content_with_metadata(DOCUMENT_CHUNK)) == stable_hash(old_document_payload(DOCUMENT_CHUNK))
+
+def test_stable_hash_ignores_timestamps_but_not_content():
+    first = encode_envelope("document", {"file_path": "a.md", "timestamp": "2024-01-01T00:00:00Z"}, "text")
+    later = encode_envelope("document", {"file_path": "a.md", "timestamp": "2025-06-01T00:00:00Z"}, "text")
+    changed = encode_envelope("document", {"file_path": "a.md", "timestamp": "2024-01-01T00:00:00Z"}, "text!")
+    assert stable_hash(first) == stable_hash(later)
+    assert stable_hash(first) != stable_hash(changed)
+
+def test_unknown_envelope_kind_is_a_clear_error():
+    with pytest.raises(ValueError, match="audio"):
+        stable_hash('[ZEP/1 audio]{"a":1}\nbody')
+    with pytest.raises(ValueError, match="audio"):
+        legacy_payload(Envelope("audio", {}, "body"))
+
+def test_journal_records_hashes_per_group(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    with IngestJournal(path) as journal:
+        journal.record("g1", "h1", "table:1", "uuid-1")
+        journal.record("g1", "h1", "table:1", "uuid-1b")  # Re-recording is not an error
+        journal.record("g2", "h2", "table:2", "uuid-2")
+
+    with IngestJournal(path) as journal:
+        assert journal.completed_hashes("g1") == {"h1"}
+        assert journal.completed_hashes("g2") == {"h2"}
+        assert journal.completed_hashes("g3") == set()
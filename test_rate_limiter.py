@@ -0,0 +1,135 @@
+"""
+Tests for rate_limiter.py against a local fake Zep server that throttles requests.
+
+Run with: python -m pytest test_rate_limiter.py
+"""
+
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+from zep_cloud.client import AsyncZep
+from zep_cloud.core.api_error import ApiError
+from rate_limiter import RateLimiter, create_zep_client, parse_retry_after
+
+class FakeZepHandler(BaseHTTPRequestHandler):
+    """Answers graph writes with `throttle_count` throttling responses before succeeding"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            throttle = server.requests <= server.throttle_count
+
+        if throttle:
+            self.send_response(server.throttle_status)
+            if server.retry_after is not None:
+                self.send_header("Retry-After", str(server.retry_after))
+            payload = {"message": "rate limit exceeded"}
+        else:
+            self.send_response(200)
+            if self.path.endswith("/graph-batch"):
+                payload = [self.episode(e["data"]) for e in body["episodes"]]
+            else:
+                payload = self.episode(body["data"])
+
+        data = json.dumps(payload).encode()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def episode(self, content):
+        return {"uuid": str(uuid.uuid4()), "content": content, "created_at": "2024-01-01T00:00:00Z"}
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_zep(throttle_count, throttle_status=429, retry_after=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeZepHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.throttle_count = throttle_count
+    server.throttle_status = throttle_status
+    server.retry_after = retry_after
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/v2"
+
+def test_parse_retry_after():
+    assert parse_retry_after(httpx.Headers({"Retry-After": "3"})) == 3.0
+    assert parse_retry_after(httpx.Headers({"Retry-After-Ms": "250"})) == 0.25
+    assert parse_retry_after(httpx.Headers({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert parse_retry_after(httpx.Headers({})) is None
+
+def test_retries_throttled_requests_and_lowers_rate():
+    server, base_url = start_fake_zep(throttle_count=3)
+    try:
+        limiter = RateLimiter(max_rate=50, min_rate=1)
+        client = create_zep_client("test-key", limiter, base_url=base_url)
+
+        episode = limiter.call(client.graph.add, group_id="g", data="hello", type="text")
+
+        assert episode.content == "hello"
+        assert server.requests == 4
+        assert limiter.throttled == 3
+        assert limiter.rate < 50
+    finally:
+        server.shutdown()
+
+def test_honours_retry_after_header():
+    server, base_url = start_fake_zep(throttle_count=1, throttle_status=503, retry_after=1)
+    try:
+        limiter = RateLimiter(max_rate=50)
+        client = create_zep_client("test-key", limiter, base_url=base_url)
+
+        started = time.monotonic()
+        limiter.call(client.graph.add, group_id="g", data="hello", type="text")
+
+        assert time.monotonic() - started >= 1
+        assert server.requests == 2
+    finally:
+        server.shutdown()
+
+def test_gives_up_after_max_retries():
+    server, base_url = start_fake_zep(throttle_count=100)
+    try:
+        limiter = RateLimiter(max_rate=100, min_rate=50, max_retries=2)
+        client = create_zep_client("test-key", limiter, base_url=base_url)
+
+        try:
+            limiter.call(client.graph.add, group_id="g", data="hello", type="text")
+            assert False, "expected ApiError"
+        except ApiError as e:
+            assert e.status_code == 429
+        assert server.requests == 3
+    finally:
+        server.shutdown()
+
+def test_async_batches_share_limiter():
+    server, base_url = start_fake_zep(throttle_count=2)
+    try:
+        limiter = RateLimiter(max_rate=50, min_rate=1)
+
+        async def upload():
+            async with httpx.AsyncClient(event_hooks=limiter.async_event_hooks()) as httpx_client:
+                client = AsyncZep(api_key="test-key", base_url=base_url, timeout=10, httpx_client=httpx_client)
+                return await asyncio.gather(*(
+                    limiter.call_async(
+                        client.graph.add_batch,
+                        group_id="g",
+                        episodes=[{"data": f"batch {i}", "type": "text"}]
+                    )
+                    for i in range(5)
+                ))
+
+        results = asyncio.run(upload())
+
+        assert [r[0].content for r in results] == [f"batch {i}" for i in range(5)]
+        assert server.requests == 7
+        assert limiter.throttled == 2
+    finally:
+        server.shutdown()
@@ -0,0 +1,81 @@
+"""
+Tests for reconcile.py against the mock Zep + Supabase server: drift is
+found, --fix repairs it without leaving duplicate episodes behind, and the
+return value says whether drift remains.
+
+Run with: python -m pytest test_reconcile.py
+"""
+
+import json
+import pytest
+from zep_cloud.client import Zep
+import reconcile
+from mock_server import MockServer
+
+@pytest.fixture
+def mock(monkeypatch):
+    with MockServer() as server:
+        for name, value in server.environ().items():
+            monkeypatch.setenv(name, value)
+        yield server
+
+@pytest.fixture
+def drifted(mock):
+    """
+    A group with 6 rows uploaded, then broken: row 1's episode is gone, one of
+    split row 2's three episodes is gone, row 3's zep_uuid is malformed, and
+    two episodes belong to no row.
+    """
+    zep = Zep(api_key="test-key")
+    zep.group.add(group_id="g")
+
+    def add(data):
+        return zep.graph.add(group_id="g", data=data, type="text").uuid_
+
+    rows = mock.seed_embeddings(6, agent_id="a1")
+    for row in rows:
+        row["zep_uuid"] = add(row["content"])
+    rows[1]["zep_uuid"] = json.dumps([add(f"part {i}") for i in range(3)])
+
+    zep.graph.episode.delete(rows[0]["zep_uuid"])
+    zep.graph.episode.delete(json.loads(rows[1]["zep_uuid"])[1])
+    rows[2]["zep_uuid"] = "[not json"
+    orphans = {add("stray one"), add("stray two")}
+    return rows, orphans
+
+def test_report_finds_each_kind_of_drift(mock, drifted, tmp_path):
+    rows, orphans = drifted
+    report_path = tmp_path / "drift.jsonl"
+
+    assert reconcile.main("a1", "g", report_path=str(report_path)) is False
+
+    findings = [json.loads(line) for line in report_path.read_text().splitlines()]
+    kinds = {}
+    for finding in findings:
+        kinds.setdefault(finding["kind"], []).append(finding)
+    assert sorted(f["row_id"] for f in kinds["missing"]) == [1, 2]
+    assert [f["row_id"] for f in kinds["malformed"]] == [3]
+    survivors = {u for i, u in enumerate(json.loads(rows[1]["zep_uuid"])) if i != 1}
+    # The unparsable row's episode is orphaned too
+    assert orphans | survivors < {f["episode_uuid"] for f in kinds["orphan"]}
+    assert all(row["zep_uuid"] for row in rows)  # Nothing changed without --fix
+
+def test_fix_deletes_survivors_before_clearing_and_reports_remaining_orphans(mock, drifted):
+    rows, orphans = drifted
+    survivors = [u for i, u in enumerate(json.loads(rows[1]["zep_uuid"])) if i != 1]
+
+    # Orphans are left without --delete-orphans, so drift remains
+    assert reconcile.main("a1", "g", fix=True) is False
+
+    assert [row["zep_uuid"] for row in rows[:3]] == [None, None, None]
+    assert all(row["zep_uuid"] for row in rows[3:])
+    remaining = {e["uuid"] for e in mock.episodes("g")}
+    assert not remaining & set(survivors)
+    assert orphans < remaining
+
+    assert reconcile.main("a1", "g", fix=True, delete_orphans=True) is True
+    assert {e["uuid"] for e in mock.episodes("g")} == {row["zep_uuid"] for row in rows[3:]}
+    assert reconcile.main("a1", "g") is True
+
+def test_missing_group_fails(mock):
+    assert reconcile.main("a1", "no-such-group") is False
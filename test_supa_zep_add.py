@@ -0,0 +1,118 @@
+"""
+Tests for supa_zep_add.py's batching and UUID write-back: every episode's UUID
+has to land on the row (and part) it came from, whichever batch carried it.
+
+Run with: python -m pytest test_supa_zep_add.py
+"""
+
+import asyncio
+import json
+import types
+import pytest
+from zep_cloud import EpisodeData
+import supa_zep_add
+from mock_server import MockServer
+from rate_limiter import RateLimiter
+from supa_zep_add import collect_batch_uuids, iter_batches, iter_episodes, upload_batches_async, write_row_uuids
+
+def episodes_for(sizes):
+    """(episode, row_id, 0) items whose data is `size` characters long"""
+    return [(EpisodeData(data="x" * size, type="text"), row_id, 0) for row_id, size in enumerate(sizes, 1)]
+
+def uuids_for(batch):
+    """A fake add_batch result naming each slot after its row and part"""
+    return [types.SimpleNamespace(uuid_=f"{row_id}.{part_num}") for _, row_id, part_num in batch]
+
+class Writer:
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, row_id, zep_uuid):
+        self.rows[row_id] = zep_uuid
+
+@pytest.fixture
+def mock(monkeypatch):
+    with MockServer() as server:
+        for name, value in server.environ().items():
+            monkeypatch.setenv(name, value)
+        yield server
+
+def test_batches_respect_episode_and_byte_limits():
+    batches = list(iter_batches(episodes_for([10] * 7), max_episodes=3, max_bytes=1000))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+
+    batches = list(iter_batches(episodes_for([40, 40, 30, 100, 5]), max_episodes=20, max_bytes=100))
+    assert [[row_id for _, row_id, _ in batch] for batch in batches] == [[1, 2], [3], [4], [5]]
+
+def test_split_rows_keep_their_parts_in_order():
+    rows = [{"id": 1, "content": "short"}, {"id": 2, "content": "A sentence here. " * 1500}, {"id": 3, "content": ""}]
+    counts = {}
+    items = list(iter_episodes(rows, counts))
+
+    parts = [part_num for _, row_id, part_num in items if row_id == 2]
+    assert counts == {1: 1, 2: len(parts)}
+    assert parts == list(range(1, len(parts) + 1))
+    assert items[0][2] == 0  # An unsplit row is part 0
+
+def test_uuids_map_back_to_rows_across_batches_out_of_order():
+    rows = [{"id": 1, "content": "one"}, {"id": 2, "content": "A sentence here. " * 1500}, {"id": 3, "content": "three"}]
+    counts = {}
+    batches = list(iter_batches(iter_episodes(rows, counts), max_episodes=2))
+    assert len(batches) > 2
+
+    pending, writer = {}, Writer()
+    # Complete the batches in reverse, as concurrent uploads may
+    for batch in reversed(batches):
+        write_row_uuids(writer, collect_batch_uuids(batch, uuids_for(batch), pending, counts))
+
+    parts = sum(1 for batch in batches for _, row_id, _ in batch if row_id == 2)
+    assert writer.rows[1] == "1.0"
+    assert writer.rows[3] == "3.0"
+    assert json.loads(writer.rows[2]) == [f"2.{i}" for i in range(1, parts + 1)]
+    assert pending == {} and counts == {}
+
+def test_incomplete_split_rows_stay_pending():
+    rows = [{"id": 1, "content": "A sentence here. " * 1500}]
+    counts = {}
+    first = next(iter_batches(iter_episodes(rows, counts), max_episodes=1))
+
+    pending, writer = {}, Writer()
+    write_row_uuids(writer, collect_batch_uuids(first, uuids_for(first), pending, counts))
+    assert writer.rows == {}
+    assert pending == {1: [(1, "1.1", len(first[0][0].data))]}
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_upload_writes_every_uuid_back(mock, concurrency):
+    rows = mock.seed_embeddings(60, agent_id="a1")
+    rows[5]["content"] = "A sentence here. " * 1500
+
+    supa_zep_add.main("a1", "g", concurrency=concurrency, max_episodes=4)
+
+    episodes = {e["uuid"]: e["content"] for e in mock.episodes("g")}
+    referenced = []
+    for row in rows:
+        if row["zep_uuid"].startswith("["):
+            uuids = json.loads(row["zep_uuid"])
+            assert [episodes[u].rsplit(" [Part ", 1)[1] for u in uuids] == [f"{i}/{len(uuids)}]" for i in range(1, len(uuids) + 1)]
+        else:
+            uuids = [row["zep_uuid"]]
+            assert episodes[uuids[0]] == row["content"]
+        referenced += uuids
+    assert sorted(referenced) == sorted(episodes)
+
+def test_failed_batch_keeps_in_flight_write_backs(monkeypatch):
+    class Graph:
+        async def add_batch(self, episodes, group_id, **kwargs):
+            if any(e.data == "fail" for e in episodes):
+                raise ValueError("boom")
+            return [types.SimpleNamespace(uuid_=f"u-{e.data}") for e in episodes]
+
+    monkeypatch.setattr(supa_zep_add, "get_async_zep_client", lambda httpx_client: types.SimpleNamespace(graph=Graph()))
+    rows = [{"id": i, "content": f"row{i}"} for i in range(1, 9)]
+    rows[4]["content"] = "fail"
+    counts, writer = {}, Writer()
+    batches = iter_batches(iter_episodes(rows, counts), max_episodes=2)
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(upload_batches_async(RateLimiter(), writer, "g", batches, counts, concurrency=1))
+    assert writer.rows == {1: "u-row1", 2: "u-row2", 3: "u-row3", 4: "u-row4"}
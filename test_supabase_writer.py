@@ -0,0 +1,90 @@
+"""
+Tests for ZepUuidWriter against the mock PostgREST server: bulk writes land
+on the right rows, and a failed flush keeps its updates for the next one.
+
+Run with: python -m pytest test_supabase_writer.py
+"""
+
+import time
+import pytest
+from supabase import create_client
+from mock_server import MockServer
+from supabase_writer import ZepUuidWriter
+
+@pytest.fixture
+def mock():
+    with MockServer() as server:
+        server.seed_embeddings(10)
+        yield server
+
+def supabase_for(mock):
+    env = mock.environ()
+    return create_client(env["SUPABASE_URL"], env["SUPABASE_KEY"])
+
+class FailingSupabase:
+    """Wraps a client so its next `failures` writes raise"""
+
+    def __init__(self, supabase, failures):
+        self.supabase = supabase
+        self.failures = failures
+
+    def rpc(self, name, params):
+        self.fail()
+        return self.supabase.rpc(name, params)
+
+    def table(self, name):
+        self.fail()
+        return self.supabase.table(name)
+
+    def fail(self):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("supabase unavailable")
+
+def zep_uuids(mock):
+    return {row["id"]: row["zep_uuid"] for row in mock.table("embeddings")}
+
+def test_mixed_and_uniform_values_are_written(mock):
+    with ZepUuidWriter(supabase_for(mock), "embeddings", batch_size=4, flush_interval=60) as writer:
+        for row_id in range(1, 7):
+            writer.add(row_id, f"uuid-{row_id}")
+    assert zep_uuids(mock) == {i: f"uuid-{i}" if i <= 6 else None for i in range(1, 11)}
+    assert (writer.rows_written, writer.requests) == (6, 2)
+
+    with ZepUuidWriter(supabase_for(mock), "embeddings", flush_interval=60) as writer:
+        for row_id in (2, 3):
+            writer.add(row_id, None)
+    assert [row_id for row_id, value in zep_uuids(mock).items() if value] == [1, 4, 5, 6]
+    assert mock.stats.get("supabase PATCH embeddings")
+
+def test_failed_flush_keeps_updates_in_order(mock):
+    supabase = FailingSupabase(supabase_for(mock), failures=1)
+    writer = ZepUuidWriter(supabase, "embeddings", batch_size=2, flush_interval=60)
+    writer.add(1, "a")
+    with pytest.raises(ConnectionError):
+        writer.add(2, "b")
+    assert writer.pending == [(1, "a"), (2, "b")]
+
+    writer.add(3, "c")  # The retried updates go out ahead of the new one
+    writer.close()
+    assert [zep_uuids(mock)[i] for i in (1, 2, 3)] == ["a", "b", "c"]
+    assert writer.rows_written == 3
+
+def test_background_flusher_retries_after_failures(mock):
+    supabase = FailingSupabase(supabase_for(mock), failures=2)
+    writer = ZepUuidWriter(supabase, "embeddings", flush_interval=0.02)
+    try:
+        writer.add(1, "a")
+        writer.add(2, "b")
+        deadline = time.monotonic() + 5
+        while writer.rows_written < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert supabase.failures == 0
+        assert writer.pending == []
+        assert [zep_uuids(mock)[i] for i in (1, 2)] == ["a", "b"]
+    finally:
+        writer.close()
+
+def test_rejects_tables_the_rpc_does_not_update(mock):
+    with pytest.raises(ValueError, match="embeddings"):
+        ZepUuidWriter(supabase_for(mock), "youtube_video_chunks")
@@ -0,0 +1,116 @@
+"""
+Streaming access to the episodes of a Zep group.
+
+iter_episode_pages lists a group's episodes. In the SDK this repo uses,
+graph.episode.get_by_group_id takes only lastn and returns no page token, so
+the whole group (or its lastn most recent episodes) comes back in a single
+response that is held in memory while it is decoded. It is yielded as one
+page, so callers process it page-wise and need no change if the API gains
+real paging; until then, use lastn to bound the size of very large groups.
+
+group_exists checks a group with group.get_group instead of trying to create it.
+
+delete_episodes removes many episodes concurrently over one pooled AsyncZep
+client, under the shared rate limiter. An episode's group is not known from
+its UUID, so a delete invalidates every cached search (see search_cache.py).
+"""
+
+import asyncio
+import json
+import httpx
+from zep_cloud.client import AsyncZep
+from zep_cloud.core.api_error import ApiError
+from config import ZEP_TIMEOUT_SECONDS
+from rate_limiter import RateLimiter
+from search_cache import note_group_write
+
+def group_exists(client, group_id):
+    """True if the group exists; never creates it"""
+    try:
+        client.group.get_group(group_id)
+        return True
+    except ApiError as e:
+        if e.status_code == 404:
+            return False
+        raise
+
+def parse_zep_uuid_value(value):
+    """
+    Return the episode UUIDs stored in an embeddings.zep_uuid value.
+
+    supa_zep_add.py stores a single UUID, or a JSON array of UUIDs for rows
+    that were split into several episodes.
+    """
+    if not value:
+        return []
+    value = value.strip()
+    if value.startswith("["):
+        return [str(u) for u in json.loads(value)]
+    return [value]
+
+def iter_episode_pages(client, group_id, lastn=None):
+    """
+    Yield lists of episodes for a group. The API has no paging, so this is
+    one request and one list (see the module docstring).
+
+    Args:
+        client: Zep client
+        group_id: Group to list
+        lastn: Only list the most recent lastn episodes
+    """
+    response = client.graph.episode.get_by_group_id(group_id, lastn=lastn)
+    yield response.episodes or []
+
+def iter_episodes(client, group_id, lastn=None):
+    """Yield every episode of a group"""
+    for page in iter_episode_pages(client, group_id, lastn):
+        yield from page
+
+async def delete_episodes_async(api_key, uuids, concurrency=8, limiter=None, on_result=None):
+    """
+    Delete episodes with up to `concurrency` requests in flight.
+
+    uuids may be any iterable (including a generator); it is consumed lazily.
+    on_result(uuid, error) is called after each delete, with error None on
+    success. Episodes that are already gone (404) count as deleted.
+
+    Returns a dict of counts: deleted, not_found, failed.
+    """
+    limiter = limiter or RateLimiter()
+    stats = {"deleted": 0, "not_found": 0, "failed": 0}
+    uuid_iter = iter(uuids)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        timeout=ZEP_TIMEOUT_SECONDS, limits=limits, event_hooks=limiter.async_event_hooks()
+    ) as httpx_client:
+        client = AsyncZep(api_key=api_key, timeout=ZEP_TIMEOUT_SECONDS, httpx_client=httpx_client)
+
+        async def worker():
+            # Workers share one iterator, so each UUID is deleted once
+            for episode_uuid in uuid_iter:
+                error = None
+                try:
+                    await limiter.call_async(client.graph.episode.delete, episode_uuid)
+                    stats["deleted"] += 1
+                except ApiError as e:
+                    if e.status_code == 404:
+                        stats["not_found"] += 1
+                    else:
+                        stats["failed"] += 1
+                        error = e
+                except Exception as e:
+                    stats["failed"] += 1
+                    error = e
+                if on_result:
+                    on_result(episode_uuid, error)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    if stats["deleted"]:
+        note_group_write(force=True)
+    return stats
+
+def delete_episodes(api_key, uuids, concurrency=8, limiter=None, on_result=None):
+    """Blocking wrapper around delete_episodes_async"""
+    return asyncio.run(delete_episodes_async(api_key, uuids, concurrency, limiter, on_result))